@@ -0,0 +1,62 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.Connection
+    ~~~~~~~~~~~~~~~~~~~~~
+    Client construction time for cold vs. warm sessions.
+
+    Usage: python -m benchmarks.bench_connection [rounds]
+'''
+import sys
+import timeit
+
+import botocore.session
+
+from cloudify_awssdk.common.connection import get_session
+
+SERVICES = ['ec2', 'elb', 'autoscaling', 'rds', 'iam']
+CLIENT_KWARGS = {
+    'region_name': 'us-east-1',
+    'endpoint_url': 'http://127.0.0.1:1',
+    'aws_access_key_id': 'stub',
+    'aws_secret_access_key': 'stub'
+}
+
+
+def cold():
+    '''A new session (and data loader) for every client'''
+    for service_name in SERVICES:
+        botocore.session.get_session().create_client(
+            service_name, **CLIENT_KWARGS)
+
+
+def warm():
+    '''Every client is built from the process-wide session'''
+    session = get_session()
+    for service_name in SERVICES:
+        session.create_client(service_name, **CLIENT_KWARGS)
+
+
+def main(rounds=10):
+    # Load the service models once before measuring the warm session
+    warm()
+    for name, func in [('cold', cold), ('warm', warm)]:
+        elapsed = timeit.timeit(func, number=rounds)
+        print('{0}: {1:.1f} ms per client'.format(
+            name, elapsed * 1000 / (rounds * len(SERVICES))))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,116 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.JsonCleanuper
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+    Conversion time of describe_instances like responses of 1 to 5 MB,
+    comparing the previous recursive converter with JsonCleanuper.
+
+    Usage: python -m benchmarks.bench_json_cleanuper [repeat]
+'''
+import copy
+import json
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from cloudify_awssdk.common import utils
+
+
+def recursive_cleanup(resource):
+    '''The converter JsonCleanuper used to be'''
+    items = enumerate(resource) if isinstance(resource, list) \
+        else resource.items()
+    for k, v in items:
+        if not v:
+            continue
+        if isinstance(v, (list, dict)):
+            recursive_cleanup(v)
+        elif (not isinstance(v, int) and
+              not isinstance(v, str) and
+              not isinstance(v, unicode)):
+            resource[k] = str(v)
+    return resource
+
+
+def instance(index):
+    launch_time = datetime(2017, 1, 1, 12, 0, index % 60)
+    return {
+        'InstanceId': 'i-%017x' % index,
+        'ImageId': 'ami-0123456789abcdef0',
+        'InstanceType': 't2.micro',
+        'LaunchTime': launch_time,
+        'State': {'Code': 16, 'Name': 'running'},
+        'PrivateIpAddress': '10.0.%d.%d' % (index // 256 % 256, index % 256),
+        'Placement': {'AvailabilityZone': 'us-east-1a', 'Tenancy': 'default'},
+        'Monitoring': {'State': 'disabled'},
+        'CpuOptions': {'CoreCount': 1, 'ThreadsPerCore': 1},
+        'BlockDeviceMappings': [{
+            'DeviceName': '/dev/sda%d' % device,
+            'Ebs': {'AttachTime': launch_time,
+                    'DeleteOnTermination': True,
+                    'Status': 'attached',
+                    'VolumeId': 'vol-%017x' % (index * 8 + device)}}
+            for device in range(4)],
+        'NetworkInterfaces': [{
+            'NetworkInterfaceId': 'eni-%017x' % index,
+            'Attachment': {'AttachTime': launch_time, 'DeviceIndex': 0,
+                           'Status': 'attached'},
+            'Groups': [{'GroupId': 'sg-%08x' % group,
+                        'GroupName': 'group-%d' % group}
+                       for group in range(3)],
+            'PrivateIpAddresses': [{'Primary': True,
+                                    'PrivateIpAddress': '10.0.0.1'}]}],
+        'Tags': [{'Key': 'tag-%d' % tag, 'Value': 'value-%d' % tag}
+                 for tag in range(10)],
+        'SpotPrice': Decimal('0.0116'),
+    }
+
+
+def response(size):
+    '''A describe_instances like response of about `size` bytes of JSON'''
+    instances = []
+    result = {'Reservations': [{'Instances': instances}]}
+    one = len(json.dumps(recursive_cleanup(instance(0))))
+    for index in range(size // one):
+        instances.append(instance(index))
+    return result
+
+
+def measure(convert, payload, repeat):
+    best = None
+    for _ in range(repeat):
+        data = copy.deepcopy(payload)
+        start = time.time()
+        convert(data)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(repeat=5):
+    for megabytes in [1, 2, 5]:
+        payload = response(megabytes * 1024 * 1024)
+        before = measure(recursive_cleanup, payload, repeat)
+        after = measure(lambda data: utils.JsonCleanuper(data).to_dict(),
+                        payload, repeat)
+        print('{0} MB: recursive {1:.1f} ms, JsonCleanuper {2:.1f} ms '
+              '({3:.1f}x)'.format(megabytes, before * 1000, after * 1000,
+                                  before / after))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,118 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.Relationships
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+    Relationship lookups of a node instance with many relationships,
+    such as an ELB with hundreds of instance associations, comparing
+    linear scans with the relationship index.
+
+    Usage: python -m benchmarks.bench_relationships [relationships] [ops]
+'''
+import sys
+import time
+
+from cloudify_awssdk.common import utils
+
+NODE_TYPES = [
+    'cloudify.nodes.aws.ec2.Instances',
+    'cloudify.nodes.aws.ec2.SecurityGroup',
+    'cloudify.nodes.aws.ec2.Subnet',
+    'cloudify.nodes.aws.ec2.Interface',
+    'cloudify.nodes.aws.ec2.Keypair',
+    'cloudify.nodes.aws.ec2.Vpc',
+]
+REL_TYPES = [
+    'cloudify.relationships.depends_on',
+    'cloudify.relationships.connected_to',
+    'cloudify.relationships.contained_in',
+]
+
+
+class Entity(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Node(Entity):
+    '''Like cloudify.context.NodeContext, checks if fetched on access'''
+    def _get_node_if_needed(self):
+        if self._node is None:
+            self._node = Entity(type_hierarchy=self._hierarchy)
+
+    @property
+    def type_hierarchy(self):
+        self._get_node_if_needed()
+        return self._node.type_hierarchy
+
+
+def relationship(index, node_type):
+    node = Node(id='node_%d' % index, _node=None,
+                _hierarchy=['cloudify.nodes.Root',
+                            'cloudify.nodes.Compute', node_type])
+    target = Entity(node=node, instance=Entity(
+        runtime_properties={'aws_resource_id': 'id-%d' % index}))
+    return Entity(target=target, type_hierarchy=[
+        'cloudify.relationships.depends_on',
+        'cloudify.relationships.connected_to'])
+
+
+def node_instance(count):
+    '''An instance related to `count` EC2 instances, and a few others'''
+    relationships = [relationship(index, NODE_TYPES[0])
+                     for index in range(count)]
+    relationships.extend(relationship(count + index, node_type)
+                         for index, node_type in enumerate(NODE_TYPES[1:]))
+    return Entity(relationships=relationships)
+
+
+def linear_by_type(inst, rel_type):
+    return [x for x in inst.relationships if rel_type in x.type_hierarchy]
+
+
+def linear_by_node_type(inst, node_type):
+    return [x for x in inst.relationships
+            if node_type in x.target.node.type_hierarchy]
+
+
+def operation(inst, by_type, by_node_type):
+    '''The lookups made by an operation like ec2 instances create'''
+    for rel_type in REL_TYPES:
+        by_type(inst, rel_type)
+    for node_type in NODE_TYPES:
+        by_node_type(inst, node_type)
+        by_node_type(inst, node_type)
+
+
+def measure(ops, count, by_type, by_node_type):
+    # A new node instance context for every operation
+    instances = [node_instance(count) for _ in range(ops)]
+    start = time.time()
+    for inst in instances:
+        operation(inst, by_type, by_node_type)
+    return (time.time() - start) / ops
+
+
+def main(count=300, ops=200):
+    linear = measure(ops, count, linear_by_type, linear_by_node_type)
+    indexed = measure(ops, count, utils.find_rels_by_type,
+                      utils.find_rels_by_node_type)
+    print('{0} relationships: linear {1:.3f} ms, indexed {2:.3f} ms per '
+          'operation ({3:.1f}x)'.format(count, linear * 1000,
+                                        indexed * 1000, linear / indexed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,119 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.S3Empty
+    ~~~~~~~~~~~~~~~~~~
+    Emptying a bucket through an in-memory S3 stand-in with a fixed
+    latency per API call, comparing one delete_object call per key with
+    S3Bucket.delete_objects.
+
+    Usage: python -m benchmarks.bench_s3_empty [objects] [latency_ms]
+'''
+import logging
+import sys
+import threading
+import time
+
+from cloudify_awssdk.s3.resources.bucket import S3Bucket
+
+
+class StubS3(object):
+    '''A single bucket S3 client, every call takes `latency` seconds'''
+    def __init__(self, objects, latency):
+        self.keys = set('logs/%08d' % i for i in range(objects))
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def _list(self, start_after, max_keys):
+        self._call()
+        with self.lock:
+            keys = sorted(k for k in self.keys if k > start_after)
+        return [dict(Key=key) for key in keys[:max_keys]]
+
+    def list_objects(self, Bucket):
+        return dict(Contents=self._list('', 1000))
+
+    def get_bucket_versioning(self, Bucket):
+        self._call()
+        return dict()
+
+    def get_paginator(self, name):
+        stub = self
+
+        class Paginator(object):
+            def paginate(self, Bucket, PaginationConfig):
+                last = ''
+                while True:
+                    contents = stub._list(last, PaginationConfig['PageSize'])
+                    if not contents:
+                        return
+                    yield dict(Contents=contents)
+                    last = contents[-1]['Key']
+        return Paginator()
+
+    def delete_object(self, Bucket, Key):
+        self._call()
+        with self.lock:
+            self.keys.discard(Key)
+        return dict()
+
+    def delete_objects(self, Bucket, Delete):
+        self._call()
+        with self.lock:
+            for item in Delete['Objects']:
+                self.keys.discard(item['Key'])
+        return dict()
+
+
+def per_key(client):
+    '''What delete_objects used to do'''
+    for item in client.list_objects(Bucket='bucket').get('Contents', []):
+        client.delete_object(Bucket='bucket', Key=item['Key'])
+
+
+def measure(objects, latency, empty):
+    client = StubS3(objects, latency)
+    start = time.time()
+    empty(client)
+    return time.time() - start, client
+
+
+def main(objects=100000, latency_ms=20):
+    latency = latency_ms / 1000.0
+    logger = logging.getLogger('bench')
+    elapsed, client = measure(objects, latency, per_key)
+    print('{0} objects, {1} ms per call'.format(objects, latency_ms))
+    print('  per key: {0:.1f}s, {1} calls, {2} objects left '
+          '({3:.0f} objects/s)'.format(
+              elapsed, client.calls, len(client.keys),
+              (objects - len(client.keys)) / elapsed))
+    elapsed, client = measure(
+        objects, latency,
+        lambda client: S3Bucket(None, client=client, logger=logger)
+        .delete_objects('bucket'))
+    print('  batched: {0:.1f}s, {1} calls, {2} objects left '
+          '({3:.0f} objects/s)'.format(
+              elapsed, client.calls, len(client.keys),
+              (objects - len(client.keys)) / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
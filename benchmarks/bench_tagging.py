@@ -0,0 +1,94 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.Tagging
+    ~~~~~~~~~~~~~~~~~~
+    Tagging the instances of a large deployment from concurrent
+    operations through an EC2 stand-in with a fixed latency per API
+    call, comparing one create_tags call per instance with TagBatcher.
+    The operations share a process, as under "cfy local". A manager
+    runs every operation in its own process, where nothing is batched.
+
+    Usage: python -m benchmarks.bench_tagging [instances] [threads]
+        [latency_ms]
+'''
+import sys
+import threading
+import time
+
+from cloudify_awssdk.ec2.tagging import TagBatcher
+
+TAGS = [{'Key': 'Owner', 'Value': 'bench'}]
+
+
+class StubEC2(object):
+    '''An EC2 client of which every call takes `latency` seconds'''
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.tagged = 0
+        self.lock = threading.Lock()
+
+    def create_tags(self, Resources, Tags):
+        with self.lock:
+            self.calls += 1
+            self.tagged += len(Resources)
+        time.sleep(self.latency)
+        return dict()
+
+
+def measure(instances, threads, latency, tag):
+    '''Runs `instances` tag operations on `threads` workers'''
+    client = StubEC2(latency)
+    queue = list('i-%08d' % i for i in range(instances))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                instance_id = queue.pop()
+            tag(client, instance_id)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.time() - start, client
+
+
+def main(instances=500, threads=20, latency_ms=100):
+    latency = latency_ms / 1000.0
+    print('{0} instances, {1} concurrent operations, {2} ms per '
+          'call'.format(instances, threads, latency_ms))
+    elapsed, client = measure(
+        instances, threads, latency,
+        lambda client, instance_id: client.create_tags(
+            Resources=[instance_id], Tags=TAGS))
+    print('  per instance: {0:.1f}s, {1} calls, {2} tagged'.format(
+        elapsed, client.calls, client.tagged))
+    batcher = TagBatcher('create_tags')
+    elapsed, client = measure(
+        instances, threads, latency,
+        lambda client, instance_id: batcher.submit(
+            client, [instance_id], TAGS))
+    print('  batched: {0:.1f}s, {1} calls, {2} tagged'.format(
+        elapsed, client.calls, client.tagged))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
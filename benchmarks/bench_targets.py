@@ -0,0 +1,122 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.Targets
+    ~~~~~~~~~~~~~~~~~~
+    Registering the instances of a fleet with a target group from
+    concurrent relationship operations, through an ELBv2 stand-in with a
+    fixed latency per API call where targets become healthy some time
+    after they are registered. Compares one register_targets call and
+    health poll per target with TargetRegistrar, for operations sharing
+    a process as under "cfy local" (not a manager, which runs every
+    operation in its own process).
+
+    Usage: python -m benchmarks.bench_targets [targets] [threads]
+        [latency_ms] [healthy_ms]
+'''
+import sys
+import threading
+import time
+
+from cloudify_awssdk.elb.registration import TargetRegistrar
+
+DELAY = 0.5
+
+
+class StubELBv2(object):
+    '''An ELBv2 client of which every call takes `latency` seconds'''
+    def __init__(self, latency, healthy_after):
+        self.latency = latency
+        self.healthy_after = healthy_after
+        self.calls = 0
+        self.registered = dict()
+        self.lock = threading.Lock()
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def register_targets(self, TargetGroupArn, Targets):
+        self._call()
+        with self.lock:
+            for target in Targets:
+                self.registered.setdefault(target['Id'], time.time())
+        return dict()
+
+    def describe_target_health(self, TargetGroupArn, Targets):
+        self._call()
+        now = time.time()
+        with self.lock:
+            return dict(TargetHealthDescriptions=[dict(
+                Target=dict(target, Port=80), TargetHealth=dict(
+                    State='healthy' if now - self.registered[target['Id']] >=
+                    self.healthy_after else 'initial'))
+                for target in Targets])
+
+
+def per_target(client, target_id):
+    '''One registration and health poll per relationship operation'''
+    client.register_targets(TargetGroupArn='tg', Targets=[dict(Id=target_id)])
+    while True:
+        health = client.describe_target_health(
+            TargetGroupArn='tg', Targets=[dict(Id=target_id)])
+        if health['TargetHealthDescriptions'][0]['TargetHealth'][
+                'State'] == 'healthy':
+            return
+        time.sleep(DELAY)
+
+
+def measure(targets, threads, client, register):
+    '''Runs `targets` registrations on `threads` workers'''
+    queue = list('i-%08d' % i for i in range(targets))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                target_id = queue.pop()
+            register(client, target_id)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.time() - start
+
+
+def main(targets=200, threads=50, latency_ms=50, healthy_ms=2000):
+    latency = latency_ms / 1000.0
+    healthy_after = healthy_ms / 1000.0
+    print('{0} targets, {1} concurrent operations, {2} ms per call, '
+          'healthy after {3} ms'.format(
+              targets, threads, latency_ms, healthy_ms))
+    client = StubELBv2(latency, healthy_after)
+    elapsed = measure(targets, threads, client, per_target)
+    print('  per target: {0:.1f}s, {1} calls'.format(elapsed, client.calls))
+    registrar = TargetRegistrar(delay=DELAY)
+    client = StubELBv2(latency, healthy_after)
+    elapsed = measure(
+        targets, threads, client,
+        lambda client, target_id: registrar.submit(
+            client, 'tg', [(target_id, None)]))
+    print('  batched: {0:.1f}s, {1} calls'.format(elapsed, client.calls))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
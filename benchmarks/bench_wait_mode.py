@@ -0,0 +1,107 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Benchmarks.WaitMode
+    ~~~~~~~~~~~~~~~~~~~
+    End-to-end create latency and task count of the "retry" and
+    "inline" wait modes, against a stub resource on a simulated clock.
+
+    Usage: python -m benchmarks.bench_wait_mode [ready_after] [retry_interval]
+'''
+import sys
+
+from mock import patch
+from cloudify.exceptions import OperationRetry
+from cloudify.mocks import MockCloudifyContext
+
+from cloudify_awssdk.common import AWSResourceBase, decorators
+
+# Seconds spent by the task queue and the decorator stack (including
+# building the resource interface) for every task
+TASK_OVERHEAD = 1.0
+
+
+class Clock(object):
+    '''Simulated clock'''
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StubResource(AWSResourceBase):
+    '''A resource that becomes available after `ready_after` seconds'''
+    type_name = 'Stub'
+
+    def __init__(self, clock, ready_after, stats):
+        AWSResourceBase.__init__(self, None, resource_id='stub')
+        self.clock = clock
+        self.ready_after = ready_after
+        self.stats = stats
+
+    @property
+    def properties(self):
+        self.stats['describe'] += 1
+        return {'Status': 'available' if self.clock.now >= self.ready_after
+                else 'creating'}
+
+    @property
+    def status(self):
+        return self.properties['Status']
+
+
+def run(wait_mode, ready_after, retry_interval):
+    clock = Clock()
+    stats = {'tasks': 0, 'describe': 0}
+    ctx = MockCloudifyContext(
+        node_id='stub', runtime_properties={},
+        operation={'name': 'cloudify.interfaces.lifecycle.create',
+                   'retry_number': 0})
+
+    @decorators.wait_for_status(status_good=['available'],
+                                status_pending=['creating'])
+    def create(**_):
+        ctx.instance.runtime_properties['aws_resource_id'] = 'stub'
+
+    with patch('time.time', clock.time), patch('time.sleep', clock.sleep):
+        while True:
+            stats['tasks'] += 1
+            clock.sleep(TASK_OVERHEAD)
+            try:
+                create(ctx=ctx, wait_mode=wait_mode,
+                       iface=StubResource(clock, ready_after, stats))
+                break
+            except OperationRetry:
+                ctx.operation._operation_context['retry_number'] += 1
+                clock.sleep(retry_interval)
+    return clock.now, stats
+
+
+def main(ready_after=600, retry_interval=30):
+    print('Resource ready after {0}s, retry interval {1}s'.format(
+        ready_after, retry_interval))
+    for wait_mode in ['retry', 'inline']:
+        latency, stats = run(wait_mode, ready_after, retry_interval)
+        print('{0:>6}: {1:.0f}s end-to-end, {2} tasks, {3} describe '
+              'calls'.format(wait_mode, latency, stats['tasks'],
+                             stats['describe']))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -22,8 +22,9 @@
 from re import sub
 
 # Cloudify
-from cloudify.exceptions import OperationRetry
+from cloudify.exceptions import OperationRetry, RecoverableError
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.backoff import get_retry_after
 from cloudify_awssdk.autoscaling import AutoscalingBase
 # Boto
 from botocore.exceptions import ClientError
@@ -42,6 +43,8 @@ INSTANCES = 'Instances'
 SUBNET_LIST = 'VPCZoneIdentifier'
 SUBNET_TYPE = 'cloudify.nodes.aws.ec2.Subnet'
 SUBNET_TYPE_DEPRECATED = 'cloudify.aws.nodes.Subnet'
+# Maximum number of instances of a detach_instances call
+DETACH_MAX_INSTANCES = 20
 
 
 class AutoscalingGroup(AutoscalingBase):
@@ -104,13 +107,22 @@ class AutoscalingGroup(AutoscalingBase):
         """
         self.logger.debug('Removing %s with parameters: %s'
                           % (self.type_name, params))
+        # Calls of at most DETACH_MAX_INSTANCES instances, made at once
+        instance_ids = params.get(INSTANCE_IDS) or []
+        calls = [
+            dict(params, **{
+                INSTANCE_IDS: instance_ids[i:i + DETACH_MAX_INSTANCES]})
+            for i in range(0, len(instance_ids), DETACH_MAX_INSTANCES)] \
+            or [params]
         try:
-            res = self.client.detach_instances(**params)
-        except ClientError:
+            responses = self.make_client_calls(
+                'detach_instances', calls, fatal_handled_exceptions=())
+        except (ClientError, RecoverableError):
             pass
         else:
-            self.logger.debug('Response: %s' % res)
-            return res
+            return dict(Activities=[
+                activity for res in responses
+                for activity in (res or dict()).get('Activities', [])])
 
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
@@ -190,7 +202,8 @@ def create(ctx, iface, resource_config, **_):
 
 
 @decorators.aws_resource(AutoscalingGroup, RESOURCE_TYPE)
-def stop(iface,
+def stop(ctx,
+         iface,
          resource_config,
          **_):
     """Stops all instances associated with Autoscaling group."""
@@ -213,13 +226,15 @@ def stop(iface,
         iface.update(stop_parameters)
         raise OperationRetry(
             'Updating %s ID# "%s" parameters before deletion.'
-            % (iface.type_name, iface.resource_id))
+            % (iface.type_name, iface.resource_id),
+            retry_after=get_retry_after(ctx))
 
     # Retry until there are no instances.
     if len(instances) > 0:
         raise OperationRetry(
             '%s ID# "%s" is deleting associated instances.'
-            % (iface.type_name, iface.resource_id))
+            % (iface.type_name, iface.resource_id),
+            retry_after=get_retry_after(ctx))
 
 
 @decorators.aws_resource(AutoscalingGroup, RESOURCE_TYPE,
@@ -262,6 +262,32 @@ class TestAutoscalingGroup(TestBase):
 
         self.assertEqual(test_instance.remove_instances({}), None)
 
+    def test_AutoscalingGroup_remove_instances_chunks(self):
+        test_instance = autoscaling_group.AutoscalingGroup(
+            "ctx_node", resource_id='group_id', client=self.fake_client,
+            logger=None
+        )
+        self.fake_client.detach_instances = MagicMock(
+            side_effect=lambda **kwargs: {'Activities': [
+                {'Description': instance_id}
+                for instance_id in kwargs['InstanceIds']]}
+        )
+        instance_ids = ['i-{0}'.format(i) for i in range(25)]
+
+        res = test_instance.remove_instances({
+            'AutoScalingGroupName': 'group_id',
+            'InstanceIds': instance_ids,
+            'ShouldDecrementDesiredCapacity': False})
+
+        self.assertEqual(self.fake_client.detach_instances.call_count, 2)
+        self.assertEqual(
+            sorted(len(call[1]['InstanceIds']) for call in
+                   self.fake_client.detach_instances.call_args_list),
+            [5, 20])
+        self.assertEqual(
+            [activity['Description'] for activity in res['Activities']],
+            instance_ids)
+
 
 if __name__ == '__main__':
     unittest.main()
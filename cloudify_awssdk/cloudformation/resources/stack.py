@@ -19,11 +19,12 @@
 """
 # Cloudify
 from cloudify_awssdk.common import decorators, utils
-from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
+from cloudify_awssdk.common.constants import (
+    DESCRIBE_CACHE_TTL,
+    EXTERNAL_RESOURCE_ID)
 from cloudify_awssdk.cloudformation import AWSCloudFormationBase
 # Boto
 from botocore.exceptions import ClientError
-from datetime import datetime
 import json
 
 RESOURCE_TYPE = 'CloudFormation Stack'
@@ -32,12 +33,15 @@ RESOURCE_NAMES = 'StackNames'
 STACKS = 'Stacks'
 TEMPLATEBODY = 'TemplateBody'
 STATUS = 'StackStatus'
+OUTPUTS = 'Outputs'
 
 
 class CloudFormationStack(AWSCloudFormationBase):
     """
         AWS CloudFormation Stack interface
     """
+    describe_cache_ttl = DESCRIBE_CACHE_TTL
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         AWSCloudFormationBase.__init__(self, ctx_node, resource_id, client,
                                        logger)
@@ -120,29 +124,15 @@ def create(ctx, iface, resource_config, **_):
 def start(ctx, iface, **_):
     """Update Runtime Properties an AWS CloudFormation Stack"""
 
-    def test(_value):
-        if isinstance(_value, datetime):
-            return str(_value)
-        elif isinstance(_value, list):
-            for _value_item in _value:
-                i = _value.index(_value_item)
-                _value[i] = test(_value_item)
-            return _value
-        elif isinstance(_value, dict):
-            for _value_key, _value_item in _value.items():
-                _value[_value_key] = test(_value_item)
-            return _value
-        else:
-            return _value
-
     if not iface.resource_id:
         iface.update_resource_id(
             ctx.instance.runtime_properties[EXTERNAL_RESOURCE_ID])
 
-    props = iface.properties
-    for key, value in props.items():
-        tested_value = test(value)
-        ctx.instance.runtime_properties[key] = tested_value
+    # Outputs are read by other nodes, they are kept whatever their size
+    props = utils.budget_response(
+        ctx.node, iface.properties, ctx.logger, keep=[OUTPUTS])
+    for key, value in (props or dict()).items():
+        ctx.instance.runtime_properties[key] = value
 
 
 @decorators.aws_resource(CloudFormationStack, RESOURCE_TYPE,
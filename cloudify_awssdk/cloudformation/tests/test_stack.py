@@ -116,6 +116,31 @@ class TestCloudFormationStack(TestBase):
         self.assertEqual(_ctx.instance.runtime_properties,
                          updated_runtime_prop)
 
+    def test_start_keeps_outputs(self):
+        properties = dict(NODE_PROPERTIES,
+                          response_budget={'max_size': 200})
+        _ctx = self.get_mock_ctx(
+            'test_start', test_properties=properties,
+            test_runtime_properties=RUNTIMEPROP_AFTER_CREATE,
+            type_hierarchy=STACK_TH,
+            ctx_operation_name='cloudify.interfaces.lifecycle.start')
+
+        current_ctx.set(_ctx)
+        outputs = [{'OutputKey': 'Key{0}'.format(i), 'OutputValue': 'a' * 50}
+                   for i in range(3)]
+        self.fake_client.describe_stacks = MagicMock(return_value={
+            'Stacks': [{'StackName': 'Stack',
+                        'StackStatus': 'CREATE_COMPLETE',
+                        'Outputs': outputs}]
+        })
+
+        stack.start(ctx=_ctx, resource_config=None, iface=None)
+
+        # Outputs exceed the budget on their own, other keys are dropped
+        self.assertEqual(_ctx.instance.runtime_properties['Outputs'],
+                         outputs)
+        self.assertNotIn('StackStatus', _ctx.instance.runtime_properties)
+
     def test_delete(self):
         _ctx = \
             self.get_mock_ctx('test_delete',
@@ -18,6 +18,9 @@
     AWS common interfaces
 '''
 import sys
+import time
+from copy import deepcopy
+from functools import partial
 from logging import NullHandler
 
 # Boto
@@ -28,23 +31,113 @@ from cloudify.exceptions import NonRecoverableError
 from cloudify.logs import init_cloudify_logger
 from cloudify.utils import exception_to_error_cause
 
+# Local
+from cloudify_awssdk.common.constants import (
+    FANOUT_CALL_TIMEOUT,
+    FANOUT_MAX_WORKERS)
+from cloudify_awssdk.common.executor import fan_out
+
 FATAL_EXCEPTIONS = (ClientError, ParamValidationError)
+READ_ONLY_PREFIXES = ('describe_', 'get_', 'list_', 'head_')
+NOT_CACHED_METHODS = ['get_paginator', 'get_waiter', 'can_paginate',
+                      'generate_presigned_url', 'generate_presigned_post']
+
+
+class MemoizedClient(object):
+    '''
+        Wraps a Boto3 client and memoizes the responses of read-only
+        calls (describe_*, get_*, list_*, head_*) for a short time.
+        Any other call is considered mutating and drops all the
+        memoized responses.
+
+    :param client: A Boto3 client
+    :param int ttl: Number of seconds a response is reused
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, client, ttl, clock=time.time):
+        self._client = client
+        self._ttl = ttl
+        self._clock = clock
+        self._responses = dict()
+
+    @property
+    def client(self):
+        '''The wrapped Boto3 client'''
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or name in NOT_CACHED_METHODS or \
+                not callable(attr):
+            return attr
+        if name.startswith(READ_ONLY_PREFIXES):
+            return self._memoized(name, attr)
+        return self._invalidating(attr)
+
+    def _memoized(self, name, method):
+        def wrapper(*args, **kwargs):
+            key = (name, repr(args), repr(sorted(kwargs.items())))
+            now = self._clock()
+            cached = self._responses.get(key)
+            if cached and now - cached[0] < self._ttl:
+                return deepcopy(cached[1])
+            res = method(*args, **kwargs)
+            self._responses[key] = (now, res)
+            return deepcopy(res)
+        return wrapper
+
+    def _invalidating(self, method):
+        def wrapper(*args, **kwargs):
+            self.invalidate()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                # Reads made while the call was running may be stale
+                self.invalidate()
+        return wrapper
+
+    def invalidate(self):
+        '''Drops all the memoized responses'''
+        self._responses.clear()
 
 
 class AWSResourceBase(object):
     '''
         AWS base interface
+
+        Subclasses opt in to describe-call memoization by setting
+        `describe_cache_ttl`. Read-only calls made within that many
+        seconds (typically the `properties` and `status` checks of a
+        single operation) then share one AWS round-trip.
+
+        Independent calls of an operation are made concurrently with
+        `make_client_calls`, at most `fanout_max_workers` at once.
+
+        Subclasses whose create call takes an idempotency token set
+        `idempotency_token` to the name of its parameter. Those whose
+        create call fails, instead of returning the existing resource,
+        when a token is reused implement `find_by_token`.
     '''
+    describe_cache_ttl = 0
+    fanout_max_workers = FANOUT_MAX_WORKERS
+    idempotency_token = None
+
     def __init__(self, client, resource_id=None, logger=None):
         self.logger = logger or init_cloudify_logger(NullHandler(),
                                                      'AWSResourceBase')
-        self.client = client
+        self.client = MemoizedClient(client, self.describe_cache_ttl) \
+            if self.describe_cache_ttl else client
         self.resource_id = str(resource_id) if resource_id else None
 
     def update_resource_id(self, resource_id):
         '''Updates the resource_id value'''
         self.resource_id = resource_id
 
+    def refresh(self):
+        '''Drops cached responses so that the next read goes to AWS'''
+        if isinstance(self.client, MemoizedClient):
+            self.client.invalidate()
+
     @property
     def properties(self):
         '''Gets the properties of an external resource'''
@@ -59,6 +152,10 @@ class AWSResourceBase(object):
         '''Creates a resource'''
         raise NotImplementedError()
 
+    def find_by_token(self, token):
+        '''Gets the ID of the live resource created with a token'''
+        return None
+
     def make_client_call(self,
                          client_method_name,
                          client_method_args=None,
@@ -71,6 +168,9 @@ class AWSResourceBase(object):
         :param log_response: Whether to log API response.
         :param fatal_handled_exceptions: exceptions to fail on.
         :return: Either Exception class or successful response content.
+
+        Mutating calls made on a `MemoizedClient` drop its memoized
+        describe responses.
         """
 
         type_name = getattr(self, 'type_name')
@@ -100,6 +200,37 @@ class AWSResourceBase(object):
                 self.logger.debug('Response: {0}'.format(res))
         return res
 
+    def make_client_calls(self,
+                          client_method_name,
+                          client_method_args_list,
+                          log_response=True,
+                          fatal_handled_exceptions=FATAL_EXCEPTIONS,
+                          timeout=FANOUT_CALL_TIMEOUT):
+        """
+
+        :param client_method_name: A method on self.client.
+        :param client_method_args_list: Args of every call, see
+            `make_client_call`.
+        :param log_response: Whether to log API responses.
+        :param fatal_handled_exceptions: exceptions to fail on.
+        :param timeout: Maximum number of seconds of every call.
+        :return: List of the responses, in the order of the args.
+
+        Independent calls are made concurrently, within the connection
+        pool of the client. The errors of several failed calls are
+        aggregated, see `cloudify_awssdk.common.executor.fan_out`.
+        """
+        max_workers = self.fanout_max_workers
+        config = getattr(getattr(self.client, 'meta', None), 'config', None)
+        pool_size = getattr(config, 'max_pool_connections', None)
+        if isinstance(pool_size, int):
+            max_workers = min(max_workers, pool_size)
+        return fan_out(
+            [partial(self.make_client_call, client_method_name, args,
+                     log_response, fatal_handled_exceptions)
+             for args in client_method_args_list],
+            max_workers=max_workers, timeout=timeout)
+
     def delete(self, params=None):
         '''Deletes a resource'''
         raise NotImplementedError()
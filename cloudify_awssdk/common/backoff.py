@@ -0,0 +1,124 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Common.Backoff
+    ~~~~~~~~~~~~~~
+    Operation retry backoff
+'''
+# Standard imports
+import math
+import random
+
+# Cloudify
+from cloudify.exceptions import NonRecoverableError
+from cloudify_awssdk.common.constants import (
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_CAP,
+    RETRY_BACKOFF_NODE_TYPES,
+    RETRY_BACKOFF_PROPERTY)
+
+
+class BackoffPolicy(object):
+    '''
+        Exponential backoff with decorrelated jitter, where every delay
+        is drawn between `base` and three times the previous delay, and
+        capped by `cap`.
+
+        Operations are retried as new tasks, so the previous delays are
+        not kept. Instead, the delays are replayed from a random generator
+        seeded per node instance, which gives every retry of a node
+        instance the same delay and spreads the retries of many node
+        instances apart.
+
+    :param int base: Minimum number of seconds before a retry
+    :param int cap: Maximum number of seconds before a retry
+    :param callable rng: Builds a `random.Random` like generator
+        from a seed
+    '''
+    def __init__(self, base=RETRY_BACKOFF_BASE, cap=RETRY_BACKOFF_CAP,
+                 rng=random.Random):
+        if base <= 0 or cap < base:
+            raise NonRecoverableError(
+                '{0} is invalid: "base" must be greater than 0 and "cap" '
+                'must not be lower than "base"'.format(
+                    RETRY_BACKOFF_PROPERTY))
+        self.base = base
+        self.cap = cap
+        self.rng = rng
+
+    def retry_after(self, retry_number, seed=None):
+        '''
+            Gets the number of seconds to wait before a retry
+
+        :param int retry_number: Number of retries made so far
+        :param seed: Seed of the jitter, such as the node instance ID
+        :returns: Number of seconds
+        '''
+        rng = self.rng(seed)
+        delay = self.base
+        for _ in range(retry_number + 1):
+            delay = min(self.cap, rng.uniform(self.base, delay * 3))
+        return int(math.ceil(delay))
+
+
+def get_defaults(node):
+    '''
+        Gets the default base and cap of a node, those of its most
+        specific type in `RETRY_BACKOFF_NODE_TYPES` if any
+
+    :param `cloudify.context.NodeContext` node: Cloudify node
+    :returns: Tuple of the base and cap
+    '''
+    hierarchy = getattr(node, 'type_hierarchy', None) or \
+        [getattr(node, 'type', None)]
+    for node_type in reversed(list(hierarchy)):
+        if isinstance(node_type, basestring) and \
+                node_type in RETRY_BACKOFF_NODE_TYPES:
+            return RETRY_BACKOFF_NODE_TYPES[node_type]
+    return RETRY_BACKOFF_BASE, RETRY_BACKOFF_CAP
+
+
+def get_policy(node, status=None):
+    '''
+        Builds the backoff policy of a node from its "retry_backoff"
+        property, applying the overrides of the observed status if any.
+        Values left out default to those of the node type.
+
+    :param `cloudify.context.NodeContext` node: Cloudify node
+    :param status: Observed status of the resource
+    :returns: A `BackoffPolicy`
+    '''
+    config = dict(node.properties.get(RETRY_BACKOFF_PROPERTY) or dict())
+    statuses = config.pop('statuses', None) or dict()
+    if status is not None and str(status) in statuses:
+        config.update(statuses[str(status)])
+    base, cap = get_defaults(node)
+    base = config.get('base') or base
+    # A base set above the default cap raises the cap along
+    return BackoffPolicy(base=base,
+                         cap=config.get('cap') or max(cap, base))
+
+
+def get_retry_after(ctx, status=None):
+    '''
+        Gets the number of seconds to wait before the current operation
+        is retried
+
+    :param ctx: Cloudify operation context
+    :param status: Observed status of the resource
+    :returns: Number of seconds
+    '''
+    return get_policy(ctx.node, status).retry_after(
+        ctx.operation.retry_number, seed=ctx.instance.id)
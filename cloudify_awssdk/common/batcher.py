@@ -0,0 +1,189 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Common.Batcher
+    ~~~~~~~~~~~~~~
+    AWS calls shared by the requests of concurrent operations
+'''
+# Standard imports
+import threading
+import time
+
+# Cloudify imports
+from cloudify.state import current_ctx
+
+# Local imports
+from cloudify_awssdk.common import MemoizedClient
+
+
+def single_operation():
+    '''
+        Checks if this process runs a single operation. A manager runs
+        every operation in its own process, the task of which has a
+        target, only "cfy local" runs the operations of a workflow as
+        threads of one process.
+    '''
+    try:
+        return bool(current_ctx.get_ctx().task_target)
+    except RuntimeError:
+        return False
+
+
+def shared_client(client):
+    '''
+        The client a batch is keyed by. Memoizing wrappers are per
+        operation, the client they wrap is shared.
+    '''
+    if isinstance(client, MemoizedClient):
+        return client.client
+    return client
+
+
+class Batch(object):
+    '''
+        Requests waiting to be sent together. The results and errors
+        of the requests are keyed by their index.
+
+    :param key: Hashable key of the batch
+    '''
+    def __init__(self, key):
+        self.key = key
+        self.requests = list()
+        self.closed = False
+        self.added = None
+        self.done = threading.Event()
+        self.results = dict()
+        self.errors = dict()
+
+    def add(self, request, now):
+        '''Adds a request, returns its index'''
+        self.requests.append(request)
+        self.added = now
+        return len(self.requests) - 1
+
+
+class Batcher(object):
+    '''
+        Groups the requests of concurrent operations into batches, sent
+        with as few calls as possible. The first request of a batch
+        waits for others with the same key, until the batch is full, no
+        request joined it for `linger` seconds, or `window` seconds after
+        it was opened, whichever comes first, then it flushes the batch.
+        Every request blocks until its batch was flushed.
+
+        Batches only group the requests of one process: the operations
+        of a workflow run by "cfy local", or the threads of an operation.
+        A process running a single operation, as a manager runs them,
+        flushes its batches without waiting for other requests.
+
+        Subclasses implement `_flush`, which sends the requests of a batch
+        and sets their results (or errors), and may override `_new_batch`,
+        `_fits` and `_is_full`.
+
+    :param float window: Maximum number of seconds a batch waits
+        for requests
+    :param float linger: Number of seconds a batch waits for
+        another request
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, window, linger, clock=time.time):
+        self.window = window
+        self.linger = linger
+        self.clock = clock
+        self.calls = 0
+        self._pending = dict()
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+
+    def _new_batch(self, key, **options):
+        '''Opens a batch, with the options of its first request'''
+        return Batch(key)
+
+    def _fits(self, batch, request):
+        '''Checks if a request can join an open batch'''
+        return True
+
+    def _is_full(self, batch):
+        '''Checks if a batch is sent without waiting for more requests'''
+        return False
+
+    def _flush(self, batch):
+        '''Sends a batch, sets the results or errors of its requests'''
+        raise NotImplementedError()
+
+    def _close(self, batch):
+        '''Closes a batch, later requests start a new one'''
+        batch.closed = True
+        if self._pending.get(batch.key) is batch:
+            del self._pending[batch.key]
+        self._full.notify_all()
+
+    def _submit(self, key, request, window=None, **options):
+        '''
+            Adds a request to the open batch of its key, or opens one,
+            and waits until the batch was flushed
+
+        :param key: Hashable key, only requests with the same key
+            are batched together
+        :param request: The request
+        :param float window: Overrides the window of the batcher for
+            a batch this request opens
+        :returns: The result of the request
+        '''
+        window = self.window if window is None else window
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is not None and not self._fits(batch, request):
+                self._close(batch)
+                batch = None
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = self._new_batch(key, **options)
+            index = batch.add(request, self.clock())
+            if self._is_full(batch):
+                self._close(batch)
+            if leader and not single_operation():
+                deadline = batch.added + window
+                while not batch.closed:
+                    remaining = min(deadline,
+                                    batch.added + self.linger) - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._full.wait(remaining)
+            if leader and not batch.closed:
+                self._close(batch)
+        if leader:
+            try:
+                self._flush(batch)
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        if index in batch.errors:
+            raise batch.errors[index]
+        return batch.results.get(index)
+
+    def _send_apart(self, batch, send):
+        '''
+            Sends the requests of a failed batch on their own, so that
+            only the requests which cannot be sent fail
+
+        :param callable send: Called with a request, returns its result
+        '''
+        for index, request in enumerate(batch.requests):
+            try:
+                batch.results[index] = send(request)
+            except Exception as error:
+                batch.errors[index] = error
@@ -17,15 +17,194 @@
     ~~~~~~~~~~
     AWS connection
 """
+# Standard imports
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
 
 # Boto
 import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError
 
 # Cloudify
-from cloudify_awssdk.common.constants import AWS_CONFIG_PROPERTY
+from cloudify.exceptions import NonRecoverableError
+from cloudify_awssdk.common.constants import (
+    AWS_CONFIG_PROPERTY,
+    CLIENT_CACHE_MAX_SIZE,
+    CLIENT_CACHE_TTL,
+    CLIENT_CONFIG_OPTIONS,
+    CLIENT_CONFIG_PROPERTY,
+    CLIENT_RETRIES_OPTIONS,
+    CLIENT_RETRY_MODES)
+from cloudify_awssdk.common.profiler import instrument
 
 # pylint: disable=R0903
 
+CREDENTIAL_KEYS = ['aws_access_key_id', 'aws_secret_access_key']
+
+
+class ClientCache(object):
+    '''
+        Bounded, thread-safe cache of Boto3 clients. Entries expire after
+        `ttl` seconds and the least recently used entry is evicted once
+        `max_size` clients are cached.
+
+    :param int max_size: Maximum number of cached clients
+    :param int ttl: Number of seconds a cached client stays valid
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, max_size=CLIENT_CACHE_MAX_SIZE, ttl=CLIENT_CACHE_TTL,
+                 clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def get(self, key, factory):
+        '''
+            Gets a cached client, building (and caching) a new one
+            if there is no valid entry for the key
+
+        :param tuple key: Hashable cache key
+        :param callable factory: Builds a new client
+        :returns: An AWS service Boto3 client
+        '''
+        with self._lock:
+            now = self.clock()
+            entry = self._clients.pop(key, None)
+            if entry and now - entry[0] < self.ttl:
+                # Re-insert to mark the entry as the most recently used
+                self._clients[key] = entry
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            # Clients are built while holding the lock since the
+            # underlying botocore session is not thread-safe
+            client = factory()
+            self._clients[key] = (now, client)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+            return client
+
+    def clear(self):
+        '''Removes all cached clients and resets the counters'''
+        with self._lock:
+            self._clients.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+CLIENT_CACHE = ClientCache()
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    '''
+        Gets the process-wide botocore session, creating it on first use.
+        The session data loader, endpoint resolver and retry configuration
+        are loaded upfront, and the session is installed as the Boto3
+        default session so that every client is built from it.
+
+    :returns: A `botocore.session.Session`
+    '''
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = botocore.session.get_session()
+            session.get_component('data_loader').load_data('_retry')
+            session.get_component('endpoint_resolver')
+            _SESSION = session
+        if boto3.DEFAULT_SESSION is None or \
+                boto3.DEFAULT_SESSION._session is not _SESSION:
+            boto3.setup_default_session(botocore_session=_SESSION)
+        return _SESSION
+
+
+def _validate_options(options, allowed, name):
+    '''Checks a dict against a map of option names to allowed types'''
+    if not isinstance(options, dict):
+        raise NonRecoverableError(
+            '{0} is invalid type: {1}, it must be valid dict type'.format(
+                name, type(options)))
+    for key, value in options.iteritems():
+        if key not in allowed:
+            raise NonRecoverableError(
+                '{0} has an unknown option "{1}", valid options are: '
+                '{2}'.format(name, key, sorted(allowed)))
+        if value is not None and (not isinstance(value, allowed[key]) or
+                                  isinstance(value, bool)):
+            raise NonRecoverableError(
+                '{0} option "{1}" is invalid type: {2}'.format(
+                    name, key, type(value)))
+
+
+def validate_client_config(client_config):
+    '''
+        Validates the "client_config" block of the connection
+        configuration (botocore client options)
+
+    :param dict client_config: botocore client options
+    :returns: The options that are set, as a dict
+    :raises: :exc:`cloudify.exceptions.NonRecoverableError`
+    '''
+    _validate_options(client_config, CLIENT_CONFIG_OPTIONS,
+                      CLIENT_CONFIG_PROPERTY)
+    options = {k: v for k, v in client_config.iteritems() if v is not None}
+    for key in ['max_pool_connections', 'connect_timeout', 'read_timeout']:
+        if key in options and options[key] <= 0:
+            raise NonRecoverableError(
+                '{0} option "{1}" must be greater than 0'.format(
+                    CLIENT_CONFIG_PROPERTY, key))
+    if 'retries' in options:
+        _validate_options(options['retries'], CLIENT_RETRIES_OPTIONS,
+                          'retries')
+        retries = {k: v for k, v in options['retries'].iteritems()
+                   if v is not None}
+        if retries.get('max_attempts', 0) < 0:
+            raise NonRecoverableError(
+                'retries option "max_attempts" must not be negative')
+        if 'mode' in retries and retries['mode'] not in CLIENT_RETRY_MODES:
+            raise NonRecoverableError(
+                'retries option "mode" must be one of: {0}'.format(
+                    CLIENT_RETRY_MODES))
+        options['retries'] = retries
+    return options
+
+
+def build_client_config(client_config):
+    '''
+        Translates validated botocore client options into a botocore Config
+
+    :param dict client_config: Validated botocore client options
+    :returns: A `botocore.config.Config`
+    :raises: :exc:`cloudify.exceptions.NonRecoverableError`
+    '''
+    options = dict(client_config)
+    if 'retries' in options:
+        retries = dict(options['retries'])
+        # "legacy" is the botocore default and the only mode older
+        # botocore versions know about
+        if retries.get('mode') == 'legacy':
+            del retries['mode']
+        options['retries'] = retries
+    try:
+        return Config(**options)
+    except (BotoCoreError, TypeError) as error:
+        raise NonRecoverableError(
+            'Invalid {0}: {1}'.format(CLIENT_CONFIG_PROPERTY, error))
+
 
 class Boto3Connection(object):
     '''
@@ -42,6 +221,10 @@ class Boto3Connection(object):
         if aws_config:
             self.aws_config.update(aws_config)
 
+        # botocore client options are passed as a Config object
+        self.client_config = validate_client_config(
+            self.aws_config.get(CLIENT_CONFIG_PROPERTY) or dict())
+
         # Prepare region name for Boto
         self.aws_config['region_name'] = self.aws_config.get('region_name')
 
@@ -55,11 +238,41 @@ class Boto3Connection(object):
 
     def client(self, service_name):
         '''
-            Builds an AWS connection client
+            Builds an AWS connection client, or reuses a cached one
 
         :param str service_name: A Boto3 service name
         :returns: An AWS service Boto3 client
         :raises: :exc:`cloudify.exceptions.NonRecoverableError`
         '''
-        resource = boto3.client(service_name, **self.aws_config)
-        return resource
+        return CLIENT_CACHE.get(
+            self.cache_key(service_name),
+            lambda: self._build_client(service_name))
+
+    def _build_client(self, service_name):
+        '''
+            Builds a new client from the process-wide session, recording
+            its calls in the profile of the operation making them
+        '''
+        get_session()
+        if self.client_config:
+            return instrument(boto3.client(
+                service_name,
+                config=build_client_config(self.client_config),
+                **self.aws_config))
+        return instrument(boto3.client(service_name, **self.aws_config))
+
+    def cache_key(self, service_name):
+        '''
+            Builds the client cache key. Credentials are hashed so that
+            they are never kept in plain text as part of the key.
+
+        :param str service_name: A Boto3 service name
+        :returns: A hashable key for `ClientCache`
+        '''
+        credentials = hashlib.sha256(':'.join(
+            [self.aws_config.get(key) or '' for key in CREDENTIAL_KEYS]
+        ).encode('utf-8')).hexdigest()
+        return (service_name, credentials,
+                json.dumps(self.client_config, sort_keys=True)) + \
+            tuple(sorted((k, v) for k, v in self.aws_config.iteritems()
+                         if k not in CREDENTIAL_KEYS))
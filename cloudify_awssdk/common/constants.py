@@ -19,6 +19,7 @@
 '''
 
 AWS_CONFIG_PROPERTY = 'client_config'
+CLIENT_CONFIG_PROPERTY = 'client_config'
 EXTERNAL_RESOURCE_ID = 'aws_resource_id'
 EXTERNAL_RESOURCE_ARN = 'aws_resource_arn'
 REL_CONTAINED_IN = 'cloudify.relationships.contained_in'
@@ -29,3 +30,146 @@ SWIFT_ERROR_TOKEN_CODE = 'SignatureDoesNotMatch'
 
 
 MAX_AWS_NAME = 255
+
+DESCRIBE_CACHE_TTL = 5
+
+# Projection and size budget of responses kept in runtime properties
+RESPONSE_BUDGET_PROPERTY = 'response_budget'
+# No size limit unless the node sets one
+RESPONSE_MAX_SIZE = 0
+
+RETRY_BACKOFF_PROPERTY = 'retry_backoff'
+RETRY_BACKOFF_BASE = 5
+RETRY_BACKOFF_CAP = 60
+# Default (base, cap) of the node types which take much longer, or much
+# less, than most resources to become ready
+RETRY_BACKOFF_NODE_TYPES = {
+    'cloudify.nodes.aws.CloudFormation.Stack': (15, 300),
+    'cloudify.nodes.aws.rds.Instance': (30, 300),
+    'cloudify.nodes.aws.rds.InstanceReadReplica': (30, 300),
+    'cloudify.nodes.aws.autoscaling.Group': (10, 60),
+    'cloudify.nodes.aws.ec2.NATGateway': (10, 120),
+    'cloudify.nodes.aws.ec2.VPNConnection': (15, 300),
+    'cloudify.nodes.aws.ec2.VPNGateway': (10, 120),
+    'cloudify.nodes.aws.elb.LoadBalancer': (10, 120),
+    'cloudify.nodes.aws.ec2.Vpc': (2, 15),
+    'cloudify.nodes.aws.ec2.Subnet': (2, 15)
+}
+
+# wait_for_status / wait_for_delete modes: "retry" raises OperationRetry
+# while the resource is pending, "inline" polls within the operation
+WAIT_MODE_RETRY = 'retry'
+WAIT_MODE_INLINE = 'inline'
+WAIT_INLINE_BUDGET = 300
+WAIT_INLINE_DELAY = 5
+WAIT_INLINE_MAX_DELAY = 30
+
+BATCH_POLL_TTL = 10
+BATCH_POLL_WATCH_TTL = 300
+# Maximum number of values of a describe call filter
+EC2_FILTER_MAX_VALUES = 200
+RDS_FILTER_MAX_VALUES = 100
+# Tagging EC2 resources: resource IDs per create_tags/delete_tags call,
+# and seconds a batch of tag requests waits for other requests with the
+# same tags, at most and since the last request
+EC2_TAG_BATCH_SIZE = 1000
+EC2_TAG_BATCH_WINDOW = 0.5
+EC2_TAG_BATCH_LINGER = 0.05
+# Fleet mode of EC2 instances: instances per run_instances call, and
+# seconds a launch waits for other node instances, at most and since
+# the last one joined
+EC2_FLEET_MAX_SIZE = 100
+EC2_FLEET_WINDOW = 10
+EC2_FLEET_LINGER = 1
+# Route53 record set changes: weight of the changes of one call (every
+# record counts, twice for an UPSERT), seconds a batch of changes waits
+# for other changes, at most and since the last one, and polling of the
+# change until it is INSYNC
+ROUTE53_MAX_CHANGES = 1000
+ROUTE53_CHANGE_WINDOW = 2
+ROUTE53_CHANGE_LINGER = 0.5
+ROUTE53_SYNC_DELAY = 5
+ROUTE53_SYNC_BUDGET = 180
+# Route53 record set listings: records per page of full scans and of
+# seeks to a record, and the number of UPSERTs of a batch above which the
+# hosted zone is scanned, instead of seeking to every record, to find the
+# UPSERTs which would not change anything
+ROUTE53_LIST_PAGE_SIZE = 300
+ROUTE53_SEEK_PAGE_SIZE = 10
+ROUTE53_SEEK_MAX_UPSERTS = 50
+# Registering load balancer members: members per call, and seconds a
+# batch of registrations waits for other registrations with the same
+# load balancer, at most and since the last one
+ELB_REGISTRATION_BATCH_SIZE = 100
+ELB_REGISTRATION_WINDOW = 1
+ELB_REGISTRATION_LINGER = 0.1
+# Polling the health of registered (or deregistered) ELBv2 targets:
+# seconds between polls, and seconds spent per batch before retrying
+ELB_TARGET_HEALTH_DELAY = 5
+ELB_TARGET_HEALTH_BUDGET = 60
+
+# Emptying S3 buckets: objects per delete_objects call, concurrent calls,
+# and seconds spent per operation before it is retried
+S3_DELETE_BATCH_SIZE = 1000
+S3_DELETE_THREADS = 8
+S3_EMPTY_BUDGET = 600
+# Uploading S3 objects: part size (objects smaller than one part are
+# uploaded with a single call), concurrent part uploads, and the size of
+# reads from the source
+S3_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+S3_MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MULTIPART_CONCURRENCY = 4
+S3_READ_BUFFER_SIZE = 1024 * 1024
+# Lambda deployment packages: the largest package sent inline in
+# create_function, larger ones must be staged in S3
+LAMBDA_ZIPFILE_MAX_SIZE = 50 * 1024 * 1024
+
+# Independent calls of an operation run concurrently: maximum number of
+# concurrent calls (within the connection pool of a botocore client, 10
+# by default), and seconds a call may take
+FANOUT_MAX_WORKERS = 8
+FANOUT_CALL_TIMEOUT = 120
+
+# Idempotency tokens of create calls are UUIDs derived, in this namespace,
+# from the deployment, node instance and operation. The generation, kept
+# in a runtime property, changes once a create succeeded, so that the next
+# install creates a new resource.
+IDEMPOTENCY_NAMESPACE = 'b3c1c9a4-6a7e-4d51-9a43-5f0c27b1d8e2'
+IDEMPOTENCY_GENERATION = '__idempotency_generation'
+
+# Profiling the AWS calls of operations: node property enabling it (and
+# runtime property keeping the profiles), upper bounds in seconds of the
+# latency histogram buckets, and error codes of throttled calls
+PROFILE_PROPERTY = 'api_profile'
+PROFILE_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+THROTTLING_ERROR_CODES = [
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException'
+]
+
+CLIENT_CACHE_MAX_SIZE = 64
+CLIENT_CACHE_TTL = 900
+
+# botocore client options allowed in the "client_config" block of the
+# connection configuration, with their expected types
+CLIENT_CONFIG_OPTIONS = {
+    'max_pool_connections': (int, long),
+    'connect_timeout': (int, long, float),
+    'read_timeout': (int, long, float),
+    'retries': dict
+}
+CLIENT_RETRIES_OPTIONS = {
+    'max_attempts': (int, long),
+    'mode': basestring
+}
+CLIENT_RETRY_MODES = ['legacy', 'standard', 'adaptive']
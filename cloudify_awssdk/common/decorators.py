@@ -21,6 +21,7 @@
 
 # Standard Imports
 import sys
+import time
 
 # Third party imports
 from cloudify.exceptions import (OperationRetry, NonRecoverableError)
@@ -28,12 +29,19 @@ from cloudify.utils import exception_to_error_cause
 from botocore.exceptions import ClientError
 
 # Local imports
-from cloudify_awssdk.common import utils
+from cloudify_awssdk.common import profiler, utils
+from cloudify_awssdk.common.backoff import get_retry_after
 from cloudify_awssdk.common.constants import (
     EXTERNAL_RESOURCE_ARN as EXT_RES_ARN,
     EXTERNAL_RESOURCE_ID as EXT_RES_ID,
+    IDEMPOTENCY_GENERATION,
     SWIFT_NODE_PREFIX,
-    SWIFT_ERROR_TOKEN_CODE)
+    SWIFT_ERROR_TOKEN_CODE,
+    WAIT_INLINE_BUDGET,
+    WAIT_INLINE_DELAY,
+    WAIT_INLINE_MAX_DELAY,
+    WAIT_MODE_INLINE,
+    WAIT_MODE_RETRY)
 
 
 def aws_relationship(class_decl=None,
@@ -95,7 +103,13 @@ def aws_resource(class_decl=None,
     def wrapper_outer(function):
         '''Outer function'''
         def wrapper_inner(**kwargs):
-            '''Inner, worker function'''
+            '''Inner, profiled function'''
+            with profiler.profile_operation(kwargs['ctx']):
+                return wrapper_resource(**kwargs)
+
+        def wrapper_resource(**kwargs):
+            '''Worker function'''
+            started = time.time()
             ctx = kwargs['ctx']
             _, _, _, operation_name = ctx.operation.name.split('.')
             props = ctx.node.properties
@@ -203,15 +217,65 @@ def aws_resource(class_decl=None,
                     return
                 ctx.logger.warn('%s ID# "%s" has force_operation set.'
                                 % (resource_type, resource_id))
+            profiler.add_stage('aws_resource', started)
             return function(**kwargs)
         return wrapper_inner
     return wrapper_outer
 
 
+def _get_wait_mode(kwargs, wait_mode, wait_budget):
+    '''Gets the wait mode and budget, operation inputs take precedence'''
+    wait_mode = kwargs.get('wait_mode') or wait_mode
+    if wait_mode not in [WAIT_MODE_RETRY, WAIT_MODE_INLINE]:
+        raise NonRecoverableError(
+            'wait_mode "{0}" is invalid, it must be "{1}" or "{2}"'.format(
+                wait_mode, WAIT_MODE_RETRY, WAIT_MODE_INLINE))
+    wait_budget = kwargs.get('wait_budget') or wait_budget
+    return wait_mode, wait_budget
+
+
+def _wait_inline(ctx, iface, resource_type, status, status_pending, budget):
+    '''
+        Polls the resource status, with an exponential backoff, until it
+        leaves the pending states or the budget (in seconds) is exhausted
+    :returns: The last status
+    '''
+    started = time.time()
+    waited = 0
+    delay = WAIT_INLINE_DELAY
+    while status in status_pending:
+        # Account for the slept time too, in case the clock is off
+        remaining = budget - max(time.time() - started, waited)
+        if remaining <= 0:
+            ctx.logger.debug('%s ID# "%s" wait budget of %s seconds is '
+                             'exhausted.' % (resource_type,
+                                             iface.resource_id, budget))
+            break
+        delay = min(delay, remaining)
+        time.sleep(delay)
+        waited += delay
+        delay = min(delay * 2, WAIT_INLINE_MAX_DELAY)
+        iface.refresh()
+        status = iface.status
+        ctx.logger.debug('%s ID# "%s" reported status: %s'
+                         % (resource_type, iface.resource_id, status))
+    return status
+
+
 def wait_for_status(status_good=None,
                     status_pending=None,
-                    fail_on_missing=True):
-    '''AWS resource decorator'''
+                    fail_on_missing=True,
+                    wait_mode=WAIT_MODE_RETRY,
+                    wait_budget=WAIT_INLINE_BUDGET):
+    '''
+        AWS resource decorator
+
+        With the "retry" wait mode, an OperationRetry is raised while the
+        resource is pending. With the "inline" wait mode, the status is
+        polled within the operation for up to `wait_budget` seconds before
+        falling back to an OperationRetry. The "wait_mode" and "wait_budget"
+        operation inputs override the decorator arguments.
+    '''
     def wrapper_outer(function):
         '''Outer function'''
         def wrapper_inner(**kwargs):
@@ -220,9 +284,16 @@ def wait_for_status(status_good=None,
             _, _, _, operation_name = ctx.operation.name.split('.')
             resource_type = kwargs.get('resource_type', 'AWS Resource')
             iface = kwargs['iface']
-            # Run the operation if this is the first pass
-            if ctx.operation.retry_number == 0:
-                function(**kwargs)
+            mode, budget = _get_wait_mode(kwargs, wait_mode, wait_budget)
+            # Run the operation if this is the first pass, or if an
+            # idempotent create failed before its resource was recorded
+            idempotent = isinstance(
+                getattr(iface, 'idempotency_token', None), basestring)
+            if ctx.operation.retry_number == 0 or (
+                    idempotent and
+                    not ctx.instance.runtime_properties.get(EXT_RES_ID)):
+                with profiler.stage(operation_name):
+                    function(**kwargs)
                 # issue 128 and issue 129
                 # by updating iface object with actual details from the
                 # AWS response assuming that actual state is available
@@ -245,18 +316,23 @@ def wait_for_status(status_good=None,
                         del ctx.instance.runtime_properties['__deleted']
 
             # Get a resource interface and query for the status
-            status = iface.status
+            with profiler.stage('status'):
+                status = iface.status
             ctx.logger.debug('%s ID# "%s" reported status: %s'
                              % (resource_type, iface.resource_id, status))
+            if status_pending and mode == WAIT_MODE_INLINE:
+                with profiler.stage('wait_inline'):
+                    status = _wait_inline(ctx, iface, resource_type, status,
+                                          status_pending, budget)
             if status_pending and status in status_pending:
                 raise OperationRetry(
                     '%s ID# "%s" is still in a pending state.'
-                    % (resource_type, iface.resource_id))
+                    % (resource_type, iface.resource_id),
+                    retry_after=get_retry_after(ctx, status))
 
             elif status_good and status in status_good:
                 if operation_name in ['create', 'configure']:
-                    ctx.instance.runtime_properties['create_response'] = \
-                        utils.JsonCleanuper(iface.properties).to_dict()
+                    utils.update_create_response(ctx, iface.properties)
 
             elif not status and fail_on_missing:
                 raise NonRecoverableError(
@@ -270,8 +346,15 @@ def wait_for_status(status_good=None,
     return wrapper_outer
 
 
-def wait_for_delete(status_deleted=None, status_pending=None):
-    '''AWS resource decorator'''
+def wait_for_delete(status_deleted=None,
+                    status_pending=None,
+                    wait_mode=WAIT_MODE_RETRY,
+                    wait_budget=WAIT_INLINE_BUDGET):
+    '''
+        AWS resource decorator
+
+        See `wait_for_status` for the wait modes.
+    '''
     def wrapper_outer(function):
         '''Outer function'''
         def wrapper_inner(**kwargs):
@@ -279,14 +362,21 @@ def wait_for_delete(status_deleted=None, status_pending=None):
             ctx = kwargs['ctx']
             resource_type = kwargs.get('resource_type', 'AWS Resource')
             iface = kwargs['iface']
+            mode, budget = _get_wait_mode(kwargs, wait_mode, wait_budget)
             # Run the operation if this is the first pass
             if not ctx.instance.runtime_properties.get('__deleted', False):
-                function(**kwargs)
+                with profiler.stage('delete'):
+                    function(**kwargs)
                 ctx.instance.runtime_properties['__deleted'] = True
             # Get a resource interface and query for the status
-            status = iface.status
+            with profiler.stage('status'):
+                status = iface.status
             ctx.logger.debug('%s ID# "%s" reported status: %s'
                              % (resource_type, iface.resource_id, status))
+            if status and status_pending and mode == WAIT_MODE_INLINE:
+                with profiler.stage('wait_inline'):
+                    status = _wait_inline(ctx, iface, resource_type, status,
+                                          status_pending, budget)
             if not status or (status_deleted and status in status_deleted):
                 for key in [EXT_RES_ARN, EXT_RES_ID, 'resource_config']:
                     if key in ctx.instance.runtime_properties:
@@ -295,7 +385,8 @@ def wait_for_delete(status_deleted=None, status_pending=None):
             elif status_pending and status in status_pending:
                 raise OperationRetry(
                     '%s ID# "%s" is still in a pending state.'
-                    % (resource_type, iface.resource_id))
+                    % (resource_type, iface.resource_id),
+                    retry_after=get_retry_after(ctx, status))
             raise NonRecoverableError(
                 '%s ID# "%s" reported an unexpected status: "%s"'
                 % (resource_type, iface.resource_id, status))
@@ -359,6 +450,8 @@ def check_swift_resource(func):
                         ' and endpoint url for swift connection',
                         retry_after=10,
                         causes=[exception_to_error_cause(error, tb)])
+            except OperationRetry:
+                raise
             except Exception as error:
                 error_traceback = utils.get_traceback_exception()
                 raise NonRecoverableError('{0}'.format(str(error)),
@@ -371,16 +464,26 @@ def check_swift_resource(func):
 
 def tag_resources(fn):
     def wrapper(**kwargs):
-        result = fn(**kwargs)
         ctx = kwargs.get('ctx')
         iface = kwargs.get('iface')
-        resource_id = utils.get_resource_id(
-            node=ctx.node,
-            instance=ctx.instance)
         tags = utils.get_tags_list(
             ctx.node.properties.get('Tags'),
             ctx.instance.runtime_properties.get('Tags'),
             kwargs.get('Tags'))
+        # Tag in the create call itself when it supports TagSpecifications
+        tags_type = getattr(iface, 'tag_specifications_type', None)
+        if tags and isinstance(tags_type, basestring):
+            kwargs['resource_config'] = utils.add_tag_specifications(
+                kwargs.get('resource_config'), tags_type, tags)
+            return fn(**kwargs)
+        result = fn(**kwargs)
+        resource_id = utils.get_resource_id(
+            node=ctx.node,
+            instance=ctx.instance)
+        if iface and tags and resource_id:
+            # Skip the tags the resource already has, when they are known
+            tags = utils.missing_tags(
+                tags, getattr(iface, 'current_tags', None))
         if iface and tags and resource_id:
             iface.tag({
                 'Tags': tags,
@@ -400,9 +503,51 @@ def untag_resources(fn):
             ctx.node.properties.get('Tags'),
             ctx.instance.runtime_properties.get('Tags'),
             kwargs.get('Tags'))
+        if iface and tags and resource_id:
+            tags = utils.present_tags(
+                tags, getattr(iface, 'current_tags', None))
         if iface and tags and resource_id:
             iface.untag({
                 'Tags': tags,
                 'Resources': [resource_id]})
         return fn(**kwargs)
     return wrapper
+
+
+def idempotent_create(fn):
+    '''
+        Makes the create call of resources which take an idempotency
+        token safe to retry. A token derived from the deployment, node
+        instance and operation is added to the create parameters, unless
+        one is given. A resource created with that token by an earlier
+        attempt, which failed before recording it, is adopted instead of
+        creating another one.
+    '''
+    def wrapper(**kwargs):
+        ctx = kwargs.get('ctx')
+        iface = kwargs.get('iface')
+        token_name = getattr(iface, 'idempotency_token', None)
+        if not isinstance(token_name, basestring):
+            return fn(**kwargs)
+        params = dict(kwargs.get('resource_config') or dict())
+        generation = \
+            ctx.instance.runtime_properties.get(IDEMPOTENCY_GENERATION, 0)
+        token = params.get(token_name) or \
+            utils.get_idempotency_token(ctx, generation)
+        resource_id = iface.find_by_token(token)
+        if resource_id:
+            ctx.logger.info('%s ID# "%s" was created by an earlier attempt.'
+                            % (kwargs.get('resource_type', 'AWS Resource'),
+                               resource_id))
+            iface.update_resource_id(resource_id)
+            utils.update_resource_id(ctx.instance, resource_id)
+            result = None
+        else:
+            params[token_name] = token
+            kwargs['resource_config'] = params
+            result = fn(**kwargs)
+        # The next install creates a new resource
+        ctx.instance.runtime_properties[IDEMPOTENCY_GENERATION] = \
+            generation + 1
+        return result
+    return wrapper
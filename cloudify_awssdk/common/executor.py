@@ -0,0 +1,141 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Common.Executor
+    ~~~~~~~~~~~~~~~
+    Concurrent, independent AWS calls of an operation
+'''
+# Standard imports
+import sys
+import time
+from concurrent import futures
+
+# Third party imports
+import six
+
+# Cloudify imports
+from cloudify.exceptions import (
+    NonRecoverableError,
+    RecoverableError,
+    TimeoutException)
+from cloudify.utils import exception_to_error_cause
+
+# Local imports
+from cloudify_awssdk.common import profiler
+from cloudify_awssdk.common.constants import (
+    FANOUT_CALL_TIMEOUT,
+    FANOUT_MAX_WORKERS)
+
+
+class _Call(object):
+    '''A call of a fan-out, keeping its error with its traceback'''
+    def __init__(self, call):
+        self.call = call
+        self.started = None
+        self.error = None
+        self.traceback = None
+
+    def __call__(self):
+        self.started = time.time()
+        try:
+            return self.call()
+        except Exception as error:
+            _, _, self.traceback = sys.exc_info()
+            self.error = error
+
+
+def _raise(failed, total):
+    '''Raises the errors of the failed calls of a fan-out'''
+    if len(failed) == 1:
+        only = failed[0]
+        six.reraise(type(only.error), only.error, only.traceback)
+    causes = [exception_to_error_cause(call.error, call.traceback)
+              for call in failed]
+    message = '{0} of {1} calls failed: {2}'.format(
+        len(failed), total, '; '.join(cause['message'] for cause in causes))
+    if any(isinstance(call.error, NonRecoverableError) for call in failed):
+        raise NonRecoverableError(message, causes=causes)
+    raise RecoverableError(message, causes=causes)
+
+
+def fan_out(calls, max_workers=FANOUT_MAX_WORKERS,
+            timeout=FANOUT_CALL_TIMEOUT):
+    '''
+        Runs independent calls concurrently, on at most `max_workers`
+        threads. All the calls are run, even when some of them fail.
+
+    :param list calls: Callables, without arguments
+    :param int max_workers: Maximum number of concurrent calls
+    :param float timeout: Maximum number of seconds of every call, None
+        for no limit. Calls which time out are left running, and fail
+        the fan-out.
+    :returns: List of the results of the calls, in the order of `calls`
+    :raises: The error of a single failed call as is. The errors of
+        several failed calls are aggregated in a NonRecoverableError if
+        any of them is not recoverable, or in a RecoverableError, with the
+        errors as causes.
+    '''
+    # Calls are recorded in the profile of the operation
+    calls = [_Call(profiler.bind(call)) for call in calls]
+    if len(calls) <= 1 or max_workers <= 1:
+        results = [call() for call in calls]
+        failed = [call for call in calls if call.error]
+        if failed:
+            _raise(failed, len(calls))
+        return results
+    workers = min(max_workers, len(calls))
+    executor = futures.ThreadPoolExecutor(max_workers=workers)
+    pending = dict((executor.submit(call), call) for call in calls)
+    results = dict()
+    abandoned = 0
+    try:
+        while pending:
+            wait = timeout
+            if timeout is not None:
+                started = [call.started for call in pending.values()
+                           if call.started is not None]
+                if started:
+                    wait = max(min(started) + timeout - time.time(), 0)
+            done, _ = futures.wait(
+                list(pending), timeout=wait,
+                return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+            if timeout is None:
+                continue
+            now = time.time()
+            for future, call in list(pending.items()):
+                if call.started is not None and \
+                        call.started + timeout <= now:
+                    # Threads cannot be stopped, only given up on
+                    call.error = TimeoutException(
+                        'Call timed out after {0} seconds.'.format(timeout))
+                    results[pending.pop(future)] = None
+                    abandoned += 1
+            if abandoned >= workers and not any(
+                    call.started for call in pending.values()):
+                # Every worker is stuck, the other calls would never start
+                for future, call in list(pending.items()):
+                    future.cancel()
+                    call.error = TimeoutException(
+                        'Call not started, {0} calls timed out.'.format(
+                            abandoned))
+                    results[pending.pop(future)] = None
+    finally:
+        executor.shutdown(wait=not abandoned)
+    failed = [call for call in calls if call.error]
+    if failed:
+        _raise(failed, len(calls))
+    return [results[call] for call in calls]
@@ -0,0 +1,143 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Common.Poller
+    ~~~~~~~~~~~~~
+    Batched status polling
+'''
+# Standard imports
+import threading
+import time
+import weakref
+
+# Boto
+from botocore.exceptions import ClientError
+
+# Cloudify
+from cloudify_awssdk.common.batcher import shared_client
+from cloudify_awssdk.common.constants import (
+    BATCH_POLL_TTL,
+    BATCH_POLL_WATCH_TTL)
+
+
+class _PollerState(object):
+    '''Per-client state of a BatchPoller'''
+    def __init__(self):
+        self.lock = threading.Lock()
+        # resource ID -> (fetch time, properties or None)
+        self.entries = dict()
+        # resource ID -> last time it was requested
+        self.watched = dict()
+
+
+class BatchPoller(object):
+    '''
+        Coalesces the status queries of many resources of one kind into
+        batched describe calls. Every resource that was queried recently
+        is "watched", and a single describe call refreshes all watched
+        resources whose properties are older than `ttl` seconds. Results
+        are shared by every node instance using the same client (clients
+        are cached per service, region and credentials) in this process.
+        Only "cfy local" runs many operations in a process, on a manager
+        every operation has its own and only watches its resource.
+
+    :param callable describe: Called as `describe(client, resource_ids)`,
+        returns a dict of resource ID to resource properties. Resources
+        which were not found are left out.
+    :param int batch_size: Maximum number of IDs per describe call
+    :param int ttl: Number of seconds fetched properties are reused
+    :param int watch_ttl: Number of seconds a resource stays watched
+        after it was last queried
+    :param callable normalize: Maps a resource ID to the key used
+        in the dict returned by `describe`
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, describe, batch_size, ttl=BATCH_POLL_TTL,
+                 watch_ttl=BATCH_POLL_WATCH_TTL, normalize=None,
+                 clock=time.time):
+        self.describe = describe
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.watch_ttl = watch_ttl
+        self.normalize = normalize or (lambda resource_id: resource_id)
+        self.clock = clock
+        self.calls = 0
+        self._states = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _state(self, client):
+        client = shared_client(client)
+        with self._lock:
+            state = self._states.get(client)
+            if state is None:
+                state = self._states[client] = _PollerState()
+            return state
+
+    def get(self, client, resource_id):
+        '''
+            Gets the properties of a resource, refreshing all stale
+            watched resources of the client if needed
+
+        :param client: A Boto3 client
+        :param str resource_id: ID of the resource
+        :returns: Resource properties or None if not found
+        '''
+        if not resource_id:
+            return None
+        key = self.normalize(resource_id)
+        state = self._state(client)
+        with state.lock:
+            now = self.clock()
+            state.watched[key] = now
+            entry = state.entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+            for watched_key, last in state.watched.items():
+                if now - last >= self.watch_ttl:
+                    del state.watched[watched_key]
+                    state.entries.pop(watched_key, None)
+            stale = [k for k in state.watched
+                     if k == key or k not in state.entries or
+                     now - state.entries[k][0] >= self.ttl]
+            # The requested resource goes in the first batch
+            stale.sort(key=lambda k: k != key)
+            for i in range(0, len(stale), self.batch_size):
+                batch = stale[i:i + self.batch_size]
+                try:
+                    found = self.describe(client, batch)
+                except ClientError:
+                    # Keep the previous results, report missing
+                    return None
+                finally:
+                    self.calls += 1
+                found = dict((self.normalize(k), v)
+                             for k, v in found.iteritems())
+                for batch_key in batch:
+                    state.entries[batch_key] = (now, found.get(batch_key))
+            return state.entries[key][1]
+
+    def invalidate(self, client, resource_ids):
+        '''
+            Drops the fetched properties of resources, typically
+            after a call that changes their state
+
+        :param client: A Boto3 client
+        :param list resource_ids: IDs of the resources
+        '''
+        state = self._state(client)
+        with state.lock:
+            for resource_id in resource_ids or []:
+                if resource_id:
+                    state.entries.pop(self.normalize(resource_id), None)
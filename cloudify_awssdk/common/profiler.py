@@ -0,0 +1,321 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    Common.Profiler
+    ~~~~~~~~~~~~~~~
+    AWS API calls and decorator stages of operations
+'''
+# Standard imports
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Third party imports
+import six
+from six.moves.urllib.parse import urlencode
+
+# Local imports
+from cloudify_awssdk.common.constants import (
+    PROFILE_LATENCY_BUCKETS,
+    PROFILE_PROPERTY,
+    THROTTLING_ERROR_CODES)
+
+HANDLER_ID = 'cloudify-awssdk-profiler'
+# Keys of the botocore request context
+CALL_STARTED = HANDLER_ID + '-started'
+CALL_ATTEMPTS = HANDLER_ID + '-attempts'
+
+_ACTIVE = threading.local()
+_FILE_LOCK = threading.Lock()
+
+
+def _body_size(body):
+    '''Size in bytes of a serialized request body, 0 for streams'''
+    if isinstance(body, six.binary_type):
+        return len(body)
+    if isinstance(body, six.text_type):
+        return len(body.encode('utf-8'))
+    if isinstance(body, dict):
+        # Query protocol bodies are encoded when sent
+        return len(urlencode(body, True))
+    return 0
+
+
+def _throttled(response):
+    '''Whether an attempt was throttled, from its (http, parsed) response'''
+    if not response:
+        return False
+    http_response, parsed = response
+    if getattr(http_response, 'status_code', None) == 429:
+        return True
+    return (parsed or dict()).get('Error', dict()).get('Code') in \
+        THROTTLING_ERROR_CODES
+
+
+class CallStats(object):
+    '''Calls of one AWS API operation'''
+    def __init__(self):
+        self.count = 0
+        self.completed = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.histogram = [0] * (len(PROFILE_LATENCY_BUCKETS) + 1)
+
+    def add_latency(self, seconds):
+        self.completed += 1
+        self.latency += seconds
+        self.max_latency = max(self.max_latency, seconds)
+        self.histogram[
+            bisect.bisect_left(PROFILE_LATENCY_BUCKETS, seconds)] += 1
+
+    def to_dict(self):
+        labels = ['<={0}'.format(bound) for bound in PROFILE_LATENCY_BUCKETS]
+        labels.append('>{0}'.format(PROFILE_LATENCY_BUCKETS[-1]))
+        return {
+            'count': self.count,
+            'completed': self.completed,
+            'errors': self.errors,
+            'retries': self.retries,
+            'throttles': self.throttles,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency': {
+                'total': round(self.latency, 6),
+                'max': round(self.max_latency, 6),
+                'histogram': dict(zip(labels, self.histogram))
+            }
+        }
+
+
+class OperationProfile(object):
+    '''
+        AWS API calls, per service and API operation, and decorator
+        stages of an operation. Calls are recorded from the botocore
+        events of instrumented clients, on any thread the profile
+        is active on.
+
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = clock()
+        self.duration = None
+        self.calls = dict()
+        self.stages = dict()
+        self._lock = threading.Lock()
+
+    def _stats(self, model):
+        key = '{0}.{1}'.format(model.service_model.service_name, model.name)
+        stats = self.calls.get(key)
+        if stats is None:
+            stats = self.calls[key] = CallStats()
+        return stats
+
+    def before_call(self, model, params, context):
+        with self._lock:
+            stats = self._stats(model)
+            stats.count += 1
+            stats.request_bytes += _body_size((params or dict()).get('body'))
+        context[CALL_STARTED] = self.clock()
+
+    def needs_retry(self, model, response, attempts, context):
+        # Emitted after every attempt, the last one included
+        context[CALL_ATTEMPTS] = attempts
+        if _throttled(response):
+            with self._lock:
+                self._stats(model).throttles += 1
+
+    def after_call(self, model, http_response, parsed, context):
+        started = context.get(CALL_STARTED)
+        latency = self.clock() - started if started is not None else 0
+        with self._lock:
+            stats = self._stats(model)
+            stats.add_latency(latency)
+            stats.retries += max(context.get(CALL_ATTEMPTS, 1) - 1, 0)
+            if getattr(http_response, 'status_code', 200) >= 300:
+                stats.errors += 1
+            headers = getattr(http_response, 'headers', None) or dict()
+            # The body of streamed responses is not read yet
+            stats.response_bytes += int(headers.get('content-length') or 0)
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def stop(self):
+        self.duration = self.clock() - self.started
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'duration': round(self.duration or 0, 6),
+                'calls': dict((key, stats.to_dict())
+                              for key, stats in self.calls.items()),
+                'stages': dict((name, round(seconds, 6))
+                               for name, seconds in self.stages.items())
+            }
+
+
+def current():
+    '''Gets the profile active on this thread, if any'''
+    return getattr(_ACTIVE, 'profile', None)
+
+
+@contextmanager
+def activate(profile):
+    '''Makes a profile active on this thread'''
+    previous = current()
+    _ACTIVE.profile = profile
+    try:
+        yield profile
+    finally:
+        _ACTIVE.profile = previous
+
+
+def bind(call):
+    '''
+        Makes the profile active on this thread active for a callable
+        run by another thread
+    '''
+    profile = current()
+    if profile is None:
+        return call
+
+    def bound():
+        with activate(profile):
+            return call()
+    return bound
+
+
+@contextmanager
+def stage(name):
+    '''Times a stage of the operation, when it is profiled'''
+    profile = current()
+    if profile is None:
+        yield
+        return
+    started = profile.clock()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, profile.clock() - started)
+
+
+def add_stage(name, started):
+    '''Adds a stage which started at `started`, when profiled'''
+    profile = current()
+    if profile is not None:
+        profile.add_stage(name, profile.clock() - started)
+
+
+def _before_call(model=None, params=None, context=None, **_):
+    profile = current()
+    if profile is not None and context is not None:
+        profile.before_call(model, params, context)
+
+
+def _needs_retry(operation=None, response=None, attempts=1,
+                 request_dict=None, **_):
+    profile = current()
+    context = (request_dict or dict()).get('context')
+    if profile is not None and context is not None:
+        profile.needs_retry(operation, response, attempts, context)
+
+
+def _after_call(model=None, http_response=None, parsed=None, context=None,
+                **_):
+    profile = current()
+    if profile is not None and context is not None:
+        profile.after_call(model, http_response, parsed, context)
+
+
+def instrument(client):
+    '''
+        Records the calls of a Boto3 client in the profile active on the
+        calling thread. Calls made while no profile is active only cost
+        a thread-local lookup.
+
+    :param client: A Boto3 client
+    :returns: The client
+    '''
+    events = client.meta.events
+    events.register('before-call', _before_call,
+                    unique_id=HANDLER_ID + '-before-call')
+    events.register('needs-retry', _needs_retry,
+                    unique_id=HANDLER_ID + '-needs-retry')
+    events.register('after-call', _after_call,
+                    unique_id=HANDLER_ID + '-after-call')
+    return client
+
+
+def _write(path, record):
+    '''Appends a record to a JSON lines file'''
+    line = json.dumps(record, sort_keys=True)
+    with _FILE_LOCK:
+        with open(path, 'a') as output:
+            output.write(line + '\n')
+
+
+@contextmanager
+def profile_operation(_ctx, clock=time.time):
+    '''
+        Profiles an operation when the "api_profile" property of its
+        node enables it. The profile is kept in the "api_profile"
+        runtime property, keyed by operation, and appended to the
+        "file" of the property as a JSON line.
+
+    :param _ctx: Cloudify node instance operation context
+    :param callable clock: Returns the current time in seconds
+    :returns: The active `OperationProfile`, or None
+    '''
+    config = _ctx.node.properties.get(PROFILE_PROPERTY)
+    if not isinstance(config, dict) or not config.get('enabled'):
+        yield None
+        return
+    profile = OperationProfile(clock=clock)
+    try:
+        with activate(profile):
+            yield profile
+    finally:
+        profile.stop()
+        record = profile.to_dict()
+        record.update({
+            'deployment_id': _ctx.deployment.id,
+            'node_instance_id': _ctx.instance.id,
+            'operation': _ctx.operation.name,
+            'retry_number': _ctx.operation.retry_number
+        })
+        _ctx.logger.debug('API profile: {0}'.format(record))
+        if config.get('runtime_property', True):
+            profiles = dict(
+                _ctx.instance.runtime_properties.get(PROFILE_PROPERTY) or
+                dict())
+            profiles[_ctx.operation.name] = record
+            _ctx.instance.runtime_properties[PROFILE_PROPERTY] = profiles
+        if config.get('file'):
+            try:
+                _write(config['file'], record)
+            except (IOError, OSError) as error:
+                # Profiling never fails an operation
+                _ctx.logger.warn('Failed to write the API profile to '
+                                 '{0}: {1}'.format(config['file'], error))
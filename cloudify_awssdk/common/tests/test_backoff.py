@@ -0,0 +1,152 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import os
+import unittest
+from mock import MagicMock
+
+import yaml
+
+from cloudify.exceptions import NonRecoverableError
+
+from cloudify_awssdk.common import backoff
+from cloudify_awssdk.common.constants import (
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_CAP)
+
+
+PLUGIN_YAML = os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'plugin.yaml')
+
+
+def _default_properties(plugin, node_type):
+    '''Properties of a node left to the defaults of its type'''
+    properties = dict()
+    specs = plugin['node_types'][node_type].get('properties') or dict()
+    for name, spec in specs.items():
+        if 'default' in spec:
+            properties[name] = spec['default']
+        elif spec.get('type') in plugin['data_types']:
+            # Values of a data type default to those of its fields
+            fields = plugin['data_types'][spec['type']]['properties']
+            properties[name] = dict(
+                (field, field_spec['default'])
+                for field, field_spec in fields.items()
+                if 'default' in field_spec)
+    return properties
+
+
+class UpperBoundRandom(object):
+    '''Always draws the upper bound'''
+    def __init__(self, seed=None):
+        self.seed = seed
+
+    def uniform(self, low, high):
+        return high
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_retry_after_grows_to_cap(self):
+        policy = backoff.BackoffPolicy(base=2, cap=50, rng=UpperBoundRandom)
+        self.assertEqual(
+            [policy.retry_after(retry) for retry in range(5)],
+            [6, 18, 50, 50, 50])
+
+    def test_retry_after_bounds(self):
+        policy = backoff.BackoffPolicy(base=5, cap=60)
+        for retry in range(20):
+            for seed in ['node_a', 'node_b', 'node_c']:
+                delay = policy.retry_after(retry, seed=seed)
+                self.assertGreaterEqual(delay, 5)
+                self.assertLessEqual(delay, 60)
+
+    def test_retry_after_seed(self):
+        policy = backoff.BackoffPolicy(base=5, cap=600)
+        # Replaying the same seed gives the same delay
+        self.assertEqual(policy.retry_after(3, seed='node_a'),
+                         policy.retry_after(3, seed='node_a'))
+        # Different node instances are spread apart
+        self.assertGreater(
+            len(set(policy.retry_after(3, seed='node_%d' % i)
+                    for i in range(10))), 1)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(NonRecoverableError):
+            backoff.BackoffPolicy(base=0, cap=10)
+        with self.assertRaises(NonRecoverableError):
+            backoff.BackoffPolicy(base=10, cap=5)
+
+    def test_get_policy(self):
+        node = MagicMock(properties={})
+        policy = backoff.get_policy(node)
+        self.assertEqual(policy.base, RETRY_BACKOFF_BASE)
+        self.assertEqual(policy.cap, RETRY_BACKOFF_CAP)
+
+        node = MagicMock(properties={'retry_backoff': {
+            'base': 10, 'cap': 100,
+            'statuses': {'backing-up': {'base': 30, 'cap': 300}}}})
+        policy = backoff.get_policy(node, 'available')
+        self.assertEqual((policy.base, policy.cap), (10, 100))
+        policy = backoff.get_policy(node, 'backing-up')
+        self.assertEqual((policy.base, policy.cap), (30, 300))
+
+    def test_get_policy_node_type(self):
+        node = MagicMock(properties={}, type_hierarchy=[
+            'cloudify.nodes.Root', 'cloudify.nodes.aws.rds.Instance'])
+        policy = backoff.get_policy(node)
+        self.assertEqual((policy.base, policy.cap), (30, 300))
+
+        node = MagicMock(properties={}, type_hierarchy=None,
+                         type='cloudify.nodes.aws.ec2.Vpc')
+        policy = backoff.get_policy(node)
+        self.assertEqual((policy.base, policy.cap), (2, 15))
+
+        # The property overrides the defaults of the node type
+        node.properties = {'retry_backoff': {'cap': 30}}
+        policy = backoff.get_policy(node)
+        self.assertEqual((policy.base, policy.cap), (2, 30))
+        node.properties = {'retry_backoff': {'base': 20}}
+        policy = backoff.get_policy(node)
+        self.assertEqual((policy.base, policy.cap), (20, 20))
+
+    def test_get_policy_plugin_defaults(self):
+        with open(PLUGIN_YAML) as plugin_yaml:
+            plugin = yaml.safe_load(plugin_yaml)
+        node = MagicMock(
+            properties=_default_properties(
+                plugin, 'cloudify.nodes.aws.rds.Instance'),
+            type_hierarchy=['cloudify.nodes.Root',
+                            'cloudify.nodes.aws.rds.Instance'])
+        policy = backoff.get_policy(node)
+        self.assertEqual((policy.base, policy.cap), (30, 300))
+
+        # No node type overrides the defaults of the node types table
+        for node_type in plugin['node_types']:
+            properties = _default_properties(plugin, node_type)
+            self.assertFalse(
+                set(properties.get('retry_backoff') or dict()) &
+                set(['base', 'cap']), node_type)
+
+    def test_get_retry_after(self):
+        ctx = MagicMock()
+        ctx.node.properties = {'retry_backoff': {'base': 1, 'cap': 1000}}
+        ctx.operation.retry_number = 2
+        ctx.instance.id = 'node_a'
+        self.assertEqual(
+            backoff.get_retry_after(ctx),
+            backoff.BackoffPolicy(1, 1000).retry_after(2, seed='node_a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,7 @@
 #    * limitations under the License.
 
 from mock import MagicMock, patch
+import threading
 import unittest
 import copy
 from functools import wraps
@@ -23,7 +24,8 @@ from cloudify.manager import DirtyTrackingDict
 from botocore.exceptions import UnknownServiceError
 from botocore.exceptions import ClientError
 
-from cloudify_awssdk.common import AWSResourceBase
+from cloudify_awssdk.common import AWSResourceBase, MemoizedClient
+from cloudify_awssdk.common.connection import CLIENT_CACHE
 
 CLIENT_CONFIG = {
     'aws_access_key_id': 'xxx',
@@ -66,6 +68,27 @@ def mock_decorator(*args, **kwargs):
     return decorator
 
 
+def run_concurrently(calls):
+    '''
+        Runs calls on their own threads, as concurrent operations do,
+        returns their results (or errors) by index
+    '''
+    results = dict()
+
+    def run(index, call):
+        try:
+            results[index] = call()
+        except Exception as error:
+            results[index] = error
+    threads = [threading.Thread(target=run, args=(index, call))
+               for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
 class TestBase(unittest.TestCase):
 
     sleep_mock = None
@@ -75,6 +98,9 @@ class TestBase(unittest.TestCase):
         mock_sleep = MagicMock()
         self.sleep_mock = patch('time.sleep', mock_sleep)
         self.sleep_mock.start()
+        # Clients are cached per process, drop the ones built by
+        # previous tests (with other mocks)
+        CLIENT_CACHE.clear()
 
     def tearDown(self):
         if self.sleep_mock:
@@ -306,6 +332,10 @@ class TestBase(unittest.TestCase):
             "list_queues"
         )
 
+        fake_client.get_queue_url = self._gen_client_error(
+            "get_queue_url"
+        )
+
         fake_client.delete_queue = self._get_unknowservice(client_type)
 
     def _fake_rds(self, fake_client, client_type):
@@ -552,3 +582,66 @@ class TestAWSResourceBase(TestServiceBase):
         super(TestAWSResourceBase, self).setUp()
         self.base = AWSResourceBase("ctx_node", resource_id=True,
                                     logger=None)
+
+
+class TestMemoizedClient(unittest.TestCase):
+
+    def setUp(self):
+        super(TestMemoizedClient, self).setUp()
+        self.now = 0
+        self.fake_client = MagicMock()
+        self.fake_client.describe_things = MagicMock(
+            return_value={'Things': [{'State': 'pending'}]})
+        self.client = MemoizedClient(self.fake_client, 5,
+                                     clock=lambda: self.now)
+
+    def test_read_calls_memoized(self):
+        first = self.client.describe_things(Ids=['a'])
+        # Callers may change the response, the memoized copy is kept
+        first['Things'][0]['State'] = 'changed'
+        self.assertEqual(self.client.describe_things(Ids=['a']),
+                         {'Things': [{'State': 'pending'}]})
+        self.assertEqual(self.fake_client.describe_things.call_count, 1)
+
+        # Other arguments are another call
+        self.client.describe_things(Ids=['b'])
+        self.assertEqual(self.fake_client.describe_things.call_count, 2)
+
+        # Expired
+        self.now = 5
+        self.client.describe_things(Ids=['a'])
+        self.assertEqual(self.fake_client.describe_things.call_count, 3)
+
+    def test_mutating_calls_invalidate(self):
+        self.client.describe_things(Ids=['a'])
+        self.client.start_things(Ids=['a'])
+        self.client.describe_things(Ids=['a'])
+        self.assertEqual(self.fake_client.describe_things.call_count, 2)
+        self.fake_client.start_things.assert_called_once_with(Ids=['a'])
+
+    def test_helpers_not_memoized(self):
+        self.client.get_paginator('describe_things')
+        self.client.get_paginator('describe_things')
+        self.assertEqual(self.fake_client.get_paginator.call_count, 2)
+
+    def test_make_client_call_invalidates(self):
+        class Things(AWSResourceBase):
+            describe_cache_ttl = 5
+            type_name = 'Things'
+
+            @property
+            def properties(self):
+                return self.client.describe_things(Ids=['a'])
+
+            @property
+            def status(self):
+                return self.properties['Things'][0]['State']
+
+        iface = Things(self.fake_client, resource_id='a')
+        self.assertEqual(iface.status, 'pending')
+        self.assertEqual(iface.properties['Things'][0]['State'], 'pending')
+        self.assertEqual(self.fake_client.describe_things.call_count, 1)
+
+        iface.make_client_call('start_things', {'Ids': ['a']})
+        self.assertEqual(iface.status, 'pending')
+        self.assertEqual(self.fake_client.describe_things.call_count, 2)
@@ -0,0 +1,129 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+from functools import partial
+from mock import MagicMock
+
+from cloudify.context import CloudifyContext
+from cloudify.state import current_ctx
+
+from cloudify_awssdk.common import MemoizedClient
+from cloudify_awssdk.common.batcher import (
+    Batcher,
+    shared_client,
+    single_operation)
+from cloudify_awssdk.common.tests.test_base import run_concurrently
+
+
+class _Summer(Batcher):
+    '''Sums numbers, at most `limit` per batch'''
+    def __init__(self, limit=10, **kwargs):
+        Batcher.__init__(self, **kwargs)
+        self.limit = limit
+        self.flushed = list()
+
+    def _fits(self, batch, request):
+        return sum(batch.requests) + request <= self.limit
+
+    def _is_full(self, batch):
+        return sum(batch.requests) == self.limit
+
+    def _flush(self, batch):
+        self.calls += 1
+        self.flushed.append(sorted(batch.requests))
+        if any(request < 0 for request in batch.requests):
+            self._send_apart(batch, self._check)
+            return
+        for index in range(len(batch.requests)):
+            batch.results[index] = sum(batch.requests)
+
+    def _check(self, request):
+        if request < 0:
+            raise ValueError(request)
+        return request
+
+
+class TestBatcher(unittest.TestCase):
+
+    def test_submit(self):
+        summer = _Summer(window=0, linger=0)
+        self.assertEqual(summer._submit('key', 3), 3)
+        self.assertEqual(summer.flushed, [[3]])
+        self.assertEqual(summer._pending, {})
+
+    def test_submit_coalesces(self):
+        summer = _Summer(window=1, linger=1)
+        results = run_concurrently(
+            [partial(summer._submit, 'key', 1) for _ in range(3)] +
+            [partial(summer._submit, 'other', 5)])
+        self.assertEqual(results, {0: 3, 1: 3, 2: 3, 3: 5})
+        self.assertEqual(sorted(summer.flushed), [[1, 1, 1], [5]])
+
+    def test_submit_full(self):
+        # Full batches are sent without waiting for the window to end
+        summer = _Summer(window=10, linger=10)
+        results = run_concurrently(
+            [partial(summer._submit, 'key', 5) for _ in range(2)])
+        self.assertEqual(results, {0: 10, 1: 10})
+
+    def test_submit_does_not_fit(self):
+        # The open batch is sent, the request starts a new one
+        summer = _Summer(window=1, linger=1)
+        results = run_concurrently(
+            [partial(summer._submit, 'key', 6) for _ in range(2)])
+        self.assertEqual(results, {0: 6, 1: 6})
+        self.assertEqual(summer.flushed, [[6], [6]])
+
+    def test_submit_linger(self):
+        now = [0]
+        summer = _Summer(window=10, linger=1, clock=lambda: now[0])
+        summer._full = MagicMock()
+
+        def wait(timeout):
+            self.assertEqual(timeout, 1)
+            now[0] += timeout
+        summer._full.wait = MagicMock(side_effect=wait)
+        summer._submit('key', 1)
+        # No other request joined, sent after the linger time
+        self.assertEqual(summer._full.wait.call_count, 1)
+
+    def test_submit_single_operation(self):
+        summer = _Summer(window=10, linger=10)
+        summer._full = MagicMock()
+        # A manager runs every operation in its own process
+        current_ctx.set(CloudifyContext({'task_target': 'agent'}))
+        try:
+            self.assertTrue(single_operation())
+            self.assertEqual(summer._submit('key', 1), 1)
+        finally:
+            current_ctx.clear()
+        self.assertFalse(summer._full.wait.called)
+        self.assertFalse(single_operation())
+
+    def test_send_apart(self):
+        summer = _Summer(window=1, linger=1)
+        results = run_concurrently(
+            [partial(summer._submit, 'key', 1),
+             partial(summer._submit, 'key', -1)])
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_shared_client(self):
+        client = MagicMock()
+        self.assertIs(shared_client(client), client)
+        self.assertIs(shared_client(MemoizedClient(client, 5)), client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,7 +16,13 @@ import copy
 from cloudify_awssdk.common.tests.test_base import TestBase, CLIENT_CONFIG
 from mock import patch, MagicMock
 
-from cloudify_awssdk.common.connection import Boto3Connection
+import boto3
+from botocore.config import Config
+from cloudify.exceptions import NonRecoverableError
+
+from cloudify_awssdk.common.connection import (
+    Boto3Connection, ClientCache, CLIENT_CACHE, get_session,
+    build_client_config, validate_client_config)
 
 
 class TestConnection(TestBase):
@@ -64,6 +70,180 @@ class TestConnection(TestBase):
 
         self.assertEqual(connection.aws_config, CLIENT_CONFIG)
 
+    def test_client_instrumented(self):
+
+        node = MagicMock()
+        node.properties = {}
+
+        connection = Boto3Connection(node, copy.deepcopy(CLIENT_CONFIG))
+        connection.client('instrumented')
+
+        events = [call[0][0] for call in
+                  self.fake_client.meta.events.register.call_args_list]
+        self.assertEqual(events, ['before-call', 'needs-retry', 'after-call'])
+
+    def test_client_cached(self):
+
+        node = MagicMock()
+        node.properties = {
+            'client_config': copy.deepcopy(CLIENT_CONFIG)
+        }
+
+        connection = Boto3Connection(node)
+        client = connection.client('abc')
+        self.assertEqual(CLIENT_CACHE.misses, 1)
+        self.assertEqual(CLIENT_CACHE.hits, 0)
+
+        # Same config from another node, client is reused
+        other = Boto3Connection(node)
+        self.assertEqual(other.client('abc'), client)
+        self.assertEqual(CLIENT_CACHE.misses, 1)
+        self.assertEqual(CLIENT_CACHE.hits, 1)
+        self.assertEqual(self.fake_boto.call_count, 1)
+
+        # Another service builds a new client
+        connection.client('def')
+        self.assertEqual(CLIENT_CACHE.misses, 2)
+
+        # Other credentials build a new client
+        Boto3Connection(node, {'aws_secret_access_key': 'www'}).client('abc')
+        self.assertEqual(CLIENT_CACHE.misses, 3)
+        self.assertEqual(self.fake_boto.call_count, 3)
+
+    def test_cache_key_hashes_credentials(self):
+
+        node = MagicMock()
+        node.properties = {
+            'client_config': copy.deepcopy(CLIENT_CONFIG)
+        }
+
+        key = Boto3Connection(node).cache_key('abc')
+
+        self.assertEqual(key[0], 'abc')
+        self.assertIn(('region_name', 'zzz'), key)
+        self.assertNotIn('xxx', str(key))
+        self.assertNotIn('yyy', str(key))
+
+    def test_client_built_from_shared_session(self):
+
+        node = MagicMock()
+        node.properties = {
+            'client_config': copy.deepcopy(CLIENT_CONFIG)
+        }
+
+        Boto3Connection(node).client('abc')
+
+        session = get_session()
+        self.assertIs(get_session(), session)
+        self.assertIs(boto3.DEFAULT_SESSION._session, session)
+
+        # Reinstalled if the default session was replaced
+        boto3.setup_default_session()
+        self.assertIs(get_session(), session)
+        self.assertIs(boto3.DEFAULT_SESSION._session, session)
+
+    def test_client_config(self):
+
+        config = copy.deepcopy(CLIENT_CONFIG)
+        config['client_config'] = {
+            'max_pool_connections': 50,
+            'read_timeout': 30,
+            'retries': {'max_attempts': 10}
+        }
+        node = MagicMock()
+        node.properties = {'client_config': config}
+
+        connection = Boto3Connection(node)
+        connection.client('abc')
+
+        args, kwargs = self.fake_boto.call_args
+        self.assertEqual(args, ('abc',))
+        botocore_config = kwargs.pop('config')
+        self.assertEqual(kwargs, CLIENT_CONFIG)
+        self.assertIsInstance(botocore_config, Config)
+        self.assertEqual(botocore_config.max_pool_connections, 50)
+        self.assertEqual(botocore_config.read_timeout, 30)
+        self.assertEqual(botocore_config.retries, {'max_attempts': 10})
+
+        # Client options are part of the cache key
+        config['client_config']['max_pool_connections'] = 20
+        self.assertNotEqual(Boto3Connection(node).cache_key('abc'),
+                            connection.cache_key('abc'))
+
+    def test_validate_client_config(self):
+
+        self.assertEqual(validate_client_config({}), {})
+        self.assertEqual(
+            validate_client_config({
+                'connect_timeout': 5,
+                'read_timeout': None,
+                'retries': {'max_attempts': 3, 'mode': None}
+            }),
+            {'connect_timeout': 5, 'retries': {'max_attempts': 3}})
+
+        for invalid in [
+                'abc',
+                {'unknown': 1},
+                {'max_pool_connections': '10'},
+                {'max_pool_connections': 0},
+                {'connect_timeout': -1},
+                {'retries': []},
+                {'retries': {'max_attempts': -1}},
+                {'retries': {'mode': 'unknown'}},
+                {'retries': {'total': 3}}]:
+            with self.assertRaises(NonRecoverableError):
+                validate_client_config(invalid)
+
+    def test_build_client_config(self):
+
+        config = build_client_config(
+            {'retries': {'max_attempts': 2, 'mode': 'legacy'}})
+        self.assertEqual(config.retries, {'max_attempts': 2})
+
+        with patch('cloudify_awssdk.common.connection.Config',
+                   MagicMock(side_effect=TypeError('mode'))):
+            with self.assertRaises(NonRecoverableError):
+                build_client_config({'retries': {'mode': 'adaptive'}})
+
+
+class TestClientCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = ClientCache(max_size=2, ttl=10,
+                                 clock=lambda: self.now)
+
+    def test_ttl(self):
+        factory = MagicMock(side_effect=['first', 'second'])
+
+        self.assertEqual(self.cache.get('a', factory), 'first')
+        self.now = 9
+        self.assertEqual(self.cache.get('a', factory), 'first')
+        self.now = 10
+        self.assertEqual(self.cache.get('a', factory), 'second')
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_lru_eviction(self):
+        self.cache.get('a', lambda: 'a')
+        self.cache.get('b', lambda: 'b')
+        # Touch "a" so that "b" is the least recently used
+        self.cache.get('a', lambda: 'other')
+        self.cache.get('c', lambda: 'c')
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('a', lambda: 'other'), 'a')
+        self.assertEqual(self.cache.get('b', lambda: 'new'), 'new')
+
+    def test_clear(self):
+        self.cache.get('a', lambda: 'a')
+        self.cache.get('a', lambda: 'a')
+        self.cache.clear()
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 0)
+
 
 if __name__ == '__main__':
     unittest.main()
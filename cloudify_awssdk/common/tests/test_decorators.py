@@ -14,12 +14,12 @@
 
 import unittest
 
-from mock import MagicMock
+from mock import MagicMock, PropertyMock, patch
 from cloudify_awssdk.common.tests.test_base import TestBase
 from cloudify.state import current_ctx
 from cloudify.exceptions import OperationRetry, NonRecoverableError
 
-from cloudify_awssdk.common import decorators
+from cloudify_awssdk.common import decorators, utils
 
 
 class TestDecorators(TestBase):
@@ -134,6 +134,71 @@ class TestDecorators(TestBase):
 
         test_ignore(ctx=_ctx, iface=mock_interface)
 
+    def test_wait_for_status_inline(self):
+
+        _ctx = self._gen_decorators_context(
+            'test_wait_for_status_inline',
+            op_name='cloudify.interfaces.lifecycle.create')
+
+        @decorators.wait_for_status(status_good=['ok'],
+                                    status_pending=['pending'],
+                                    wait_mode='inline')
+        def test_ok(*agrs, **kwargs):
+            pass
+
+        # becomes ok while waiting
+        mock_interface = MagicMock()
+        type(mock_interface).status = PropertyMock(
+            side_effect=['pending', 'pending', 'ok'])
+        mock_interface.properties = {'status': 'ok'}
+
+        with patch('time.sleep') as mock_sleep:
+            test_ok(ctx=_ctx, iface=mock_interface)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(mock_interface.refresh.call_count, 2)
+        self.assertEqual(
+            _ctx.instance.runtime_properties['create_response'],
+            {'status': 'ok'})
+
+        # budget exhausted, falls back to a retry
+        mock_interface = MagicMock()
+        mock_interface.status = 'pending'
+
+        with patch('time.sleep') as mock_sleep:
+            with self.assertRaises(OperationRetry):
+                test_ok(ctx=_ctx, iface=mock_interface, wait_budget=20)
+        self.assertEqual(
+            sum(args[0] for args, _ in mock_sleep.call_args_list), 20)
+
+        # operation input switches back to retries
+        with patch('time.sleep') as mock_sleep:
+            with self.assertRaises(OperationRetry):
+                test_ok(ctx=_ctx, iface=mock_interface, wait_mode='retry')
+        self.assertFalse(mock_sleep.called)
+
+        # invalid mode
+        with self.assertRaises(NonRecoverableError):
+            test_ok(ctx=_ctx, iface=mock_interface, wait_mode='unknown')
+
+    def test_wait_for_delete_inline(self):
+
+        _ctx = self._gen_decorators_context('test_wait_for_delete_inline')
+
+        @decorators.wait_for_delete(status_deleted=['deleted'],
+                                    status_pending=['deleting'])
+        def test_delete(*agrs, **kwargs):
+            pass
+
+        mock_interface = MagicMock()
+        type(mock_interface).status = PropertyMock(
+            side_effect=['deleting', None])
+
+        test_delete(ctx=_ctx, iface=mock_interface, wait_mode='inline')
+
+        self.assertEqual(_ctx.instance.runtime_properties, {
+            '__deleted': True,
+        })
+
     def test_aws_resource(self):
 
         fake_class_instance = MagicMock()
@@ -337,6 +402,180 @@ class TestDecorators(TestBase):
         current_ctx.set(_ctx)
         return _ctx
 
+    def test_tag_resources(self):
+        _ctx = self._gen_decorators_context(
+            'test_tag_resources',
+            runtime_prop={'aws_resource_id': 'i-1'},
+            prop={'Tags': [{'Key': 'a', 'Value': '1'},
+                           {'Key': 'b', 'Value': '2'}]})
+
+        @decorators.tag_resources
+        def test_create(*args, **kwargs):
+            pass
+
+        # Tags of the resource are unknown
+        mock_interface = MagicMock()
+        mock_interface.current_tags = None
+        test_create(ctx=_ctx, iface=mock_interface)
+        mock_interface.tag.assert_called_with({
+            'Tags': [{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}],
+            'Resources': ['i-1']})
+
+        # Only the missing tags are set
+        mock_interface = MagicMock()
+        mock_interface.current_tags = [{'Key': 'a', 'Value': '1'}]
+        test_create(ctx=_ctx, iface=mock_interface)
+        mock_interface.tag.assert_called_with({
+            'Tags': [{'Key': 'b', 'Value': '2'}],
+            'Resources': ['i-1']})
+
+        # Nothing to set
+        mock_interface = MagicMock()
+        mock_interface.current_tags = [{'Key': 'a', 'Value': '1'},
+                                       {'Key': 'b', 'Value': '2'}]
+        test_create(ctx=_ctx, iface=mock_interface)
+        mock_interface.tag.assert_not_called()
+
+    def test_tag_resources_tag_specifications(self):
+        _ctx = self._gen_decorators_context(
+            'test_tag_resources_tag_specifications',
+            prop={'Tags': [{'Key': 'a', 'Value': '1'},
+                           {'Key': 'b', 'Value': '2'}]})
+
+        @decorators.tag_resources
+        def test_create(*args, **kwargs):
+            return kwargs['resource_config']
+
+        mock_interface = MagicMock()
+        mock_interface.tag_specifications_type = 'instance'
+        # Node and input tags are merged in order, inputs win by key
+        params = test_create(
+            ctx=_ctx, iface=mock_interface, resource_config={},
+            Tags=[{'Key': 'c', 'Value': '3'}, {'Key': 'a', 'Value': '4'}])
+        self.assertEqual(params['TagSpecifications'], [{
+            'ResourceType': 'instance',
+            'Tags': [{'Key': 'a', 'Value': '4'}, {'Key': 'b', 'Value': '2'},
+                     {'Key': 'c', 'Value': '3'}]}])
+        mock_interface.tag.assert_not_called()
+
+    def test_untag_resources(self):
+        _ctx = self._gen_decorators_context(
+            'test_untag_resources',
+            runtime_prop={'aws_resource_id': 'i-1'},
+            prop={'Tags': [{'Key': 'a', 'Value': '1'},
+                           {'Key': 'b', 'Value': '2'}]})
+
+        @decorators.untag_resources
+        def test_delete(*args, **kwargs):
+            pass
+
+        mock_interface = MagicMock()
+        mock_interface.current_tags = [{'Key': 'b', 'Value': '2'}]
+        test_delete(ctx=_ctx, iface=mock_interface)
+        mock_interface.untag.assert_called_with({
+            'Tags': [{'Key': 'b', 'Value': '2'}],
+            'Resources': ['i-1']})
+
+    def test_check_swift_resource_retry(self):
+        _ctx = self._gen_decorators_context(
+            'test_check_swift_resource_retry',
+            runtime_prop={'aws_config': {'region_name': 'region'}},
+            prop={'swift_config': {}})
+        _ctx.node.type = 'cloudify.nodes.swift.s3.Bucket'
+
+        @decorators.check_swift_resource
+        def test_delete(*args, **kwargs):
+            raise OperationRetry('still emptying', retry_after=1)
+
+        # Retries are not turned into non recoverable errors
+        with self.assertRaises(OperationRetry):
+            test_delete(ctx=_ctx)
+
+        @decorators.check_swift_resource
+        def test_fail(*args, **kwargs):
+            raise ValueError('failed')
+
+        with self.assertRaises(NonRecoverableError):
+            test_fail(ctx=_ctx)
+
+    def test_idempotent_create(self):
+        _ctx = self._gen_decorators_context(
+            'test_idempotent_create',
+            op_name='cloudify.interfaces.lifecycle.create')
+        calls = []
+
+        @decorators.idempotent_create
+        def test_create(*args, **kwargs):
+            calls.append(kwargs['resource_config'])
+
+        mock_interface = MagicMock()
+        mock_interface.idempotency_token = 'ClientToken'
+        mock_interface.find_by_token = MagicMock(return_value=None)
+
+        # The token is added, and is the same for every retry
+        test_create(ctx=_ctx, iface=mock_interface,
+                    resource_config={'Name': 'a'})
+        token = utils.get_idempotency_token(_ctx)
+        self.assertEqual(calls[-1], {'Name': 'a', 'ClientToken': token})
+        mock_interface.find_by_token.assert_called_with(token)
+        self.assertEqual(
+            _ctx.instance.runtime_properties['__idempotency_generation'], 1)
+
+        # The next install gets another token
+        test_create(ctx=_ctx, iface=mock_interface,
+                    resource_config={'Name': 'a'})
+        self.assertNotEqual(calls[-1]['ClientToken'], token)
+        self.assertEqual(calls[-1]['ClientToken'],
+                         utils.get_idempotency_token(_ctx, 1))
+
+        # A given token is kept
+        test_create(ctx=_ctx, iface=mock_interface,
+                    resource_config={'ClientToken': 'mine'})
+        self.assertEqual(calls[-1], {'ClientToken': 'mine'})
+
+        # A resource created by an earlier attempt is adopted
+        mock_interface.find_by_token = MagicMock(return_value='fs-1')
+        test_create(ctx=_ctx, iface=mock_interface, resource_config={})
+        self.assertEqual(len(calls), 3)
+        mock_interface.update_resource_id.assert_called_with('fs-1')
+        self.assertEqual(
+            _ctx.instance.runtime_properties['aws_resource_id'], 'fs-1')
+
+        # Resources without idempotency token
+        mock_interface = MagicMock()
+        mock_interface.idempotency_token = None
+        test_create(ctx=_ctx, iface=mock_interface,
+                    resource_config={'Name': 'a'})
+        self.assertEqual(calls[-1], {'Name': 'a'})
+        mock_interface.find_by_token.assert_not_called()
+
+    def test_wait_for_status_idempotent_retry(self):
+        _ctx = self._gen_decorators_context(
+            'test_wait_for_status_idempotent_retry',
+            op_name='cloudify.interfaces.lifecycle.create')
+        _ctx.operation._operation_context['retry_number'] = 1
+        test_create = MagicMock()
+
+        @decorators.wait_for_status(status_good=['ok'])
+        def test_ok(*args, **kwargs):
+            test_create()
+
+        mock_interface = MagicMock()
+        mock_interface.status = 'ok'
+        mock_interface.idempotency_token = None
+        test_ok(ctx=_ctx, iface=mock_interface)
+        test_create.assert_not_called()
+
+        # The create failed before its resource was recorded
+        mock_interface.idempotency_token = 'ClientToken'
+        test_ok(ctx=_ctx, iface=mock_interface)
+        test_create.assert_called_once_with()
+
+        # Recorded
+        _ctx.instance.runtime_properties['aws_resource_id'] = 'i-1'
+        test_ok(ctx=_ctx, iface=mock_interface)
+        test_create.assert_called_once_with()
+
     def test_aws_relationship(self):
         fake_class_instance = MagicMock()
         FakeClass = MagicMock(return_value=fake_class_instance)
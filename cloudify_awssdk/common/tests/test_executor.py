@@ -0,0 +1,154 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import unittest
+from functools import partial
+from mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from cloudify.exceptions import (
+    NonRecoverableError,
+    RecoverableError,
+    TimeoutException)
+
+from cloudify_awssdk.common import AWSResourceBase
+from cloudify_awssdk.common.executor import fan_out
+
+
+def _client_error(code='InvalidParameterValue'):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'call')
+
+
+class TestFanOut(unittest.TestCase):
+
+    def setUp(self):
+        super(TestFanOut, self).setUp()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def _call(self, value, release=None, error=None):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if release:
+                release.wait(5)
+            if error:
+                raise error
+            return value
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def test_results_in_order(self):
+        release = threading.Event()
+        calls = [partial(self._call, i, release) for i in range(6)]
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        self.assertEqual(fan_out(calls, max_workers=3), range(6))
+        # Calls ran concurrently, within the limit
+        self.assertEqual(self.max_running, 3)
+
+    def test_inline(self):
+        calls = [partial(self._call, i) for i in range(3)]
+        self.assertEqual(fan_out(calls, max_workers=1), [0, 1, 2])
+        self.assertEqual(fan_out([]), [])
+
+    def test_single_error_raised(self):
+        error = _client_error()
+        calls = [partial(self._call, 0),
+                 partial(self._call, 1, error=error)]
+        with self.assertRaises(ClientError) as raised:
+            fan_out(calls, max_workers=2)
+        self.assertIs(raised.exception, error)
+
+    def test_errors_aggregated(self):
+        calls = [partial(self._call, 0, error=RecoverableError('first')),
+                 partial(self._call, 1),
+                 partial(self._call, 2, error=_client_error())]
+        with self.assertRaises(RecoverableError) as raised:
+            fan_out(calls, max_workers=3)
+        self.assertNotIsInstance(raised.exception, NonRecoverableError)
+        self.assertIn('2 of 3 calls failed', str(raised.exception))
+        self.assertEqual(
+            [cause['type'] for cause in raised.exception.causes],
+            ['RecoverableError', 'ClientError'])
+
+        # All the calls ran, any non recoverable error fails the fan-out
+        fatal = MagicMock(side_effect=NonRecoverableError('fatal'))
+        calls = [partial(self._call, 0, error=RecoverableError('first')),
+                 fatal]
+        with self.assertRaises(NonRecoverableError):
+            fan_out(calls, max_workers=1)
+        fatal.assert_called_once_with()
+
+    def test_timeout(self):
+        release = threading.Event()
+        calls = [partial(self._call, 0),
+                 partial(self._call, 1, release)]
+        try:
+            with self.assertRaises(TimeoutException):
+                fan_out(calls, max_workers=2, timeout=0.05)
+        finally:
+            release.set()
+
+    def test_timeout_all_workers_stuck(self):
+        release = threading.Event()
+        calls = [partial(self._call, 0, release),
+                 partial(self._call, 1, release),
+                 partial(self._call, 2)]
+        try:
+            with self.assertRaises(RecoverableError) as raised:
+                fan_out(calls, max_workers=2, timeout=0.05)
+            self.assertIn('3 of 3 calls failed', str(raised.exception))
+        finally:
+            release.set()
+
+
+class TestMakeClientCalls(unittest.TestCase):
+
+    def setUp(self):
+        super(TestMakeClientCalls, self).setUp()
+        self.fake_client = MagicMock()
+        self.fake_client.meta.config.max_pool_connections = 2
+        self.fake_client.start_things = MagicMock(
+            side_effect=lambda **kwargs: {'Started': kwargs['Ids']})
+        self.iface = AWSResourceBase(self.fake_client, resource_id='a')
+        self.iface.type_name = 'Things'
+
+    def test_make_client_calls(self):
+        res = self.iface.make_client_calls(
+            'start_things', [{'Ids': ['a']}, {'Ids': ['b']}, {'Ids': ['c']}])
+        self.assertEqual(res, [{'Started': ['a']}, {'Started': ['b']},
+                               {'Started': ['c']}])
+        self.assertEqual(self.fake_client.start_things.call_count, 3)
+
+    def test_make_client_calls_pool_size(self):
+        with patch('cloudify_awssdk.common.fan_out') as fake_fan_out:
+            self.iface.make_client_calls('start_things', [{'Ids': ['a']}])
+        # Calls do not wait for a connection of the client pool
+        self.assertEqual(fake_fan_out.call_args[1]['max_workers'], 2)
+
+    def test_make_client_calls_fatal(self):
+        self.fake_client.start_things = MagicMock(
+            side_effect=[{'Started': ['a']}, _client_error()])
+        with self.assertRaises(NonRecoverableError):
+            self.iface.make_client_calls(
+                'start_things', [{'Ids': ['a']}, {'Ids': ['b']}])
+
+
+if __name__ == '__main__':
+    unittest.main()
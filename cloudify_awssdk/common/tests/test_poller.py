@@ -0,0 +1,100 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+from mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from cloudify_awssdk.common import MemoizedClient
+from cloudify_awssdk.common.poller import BatchPoller
+
+
+class TestBatchPoller(unittest.TestCase):
+
+    def setUp(self):
+        super(TestBatchPoller, self).setUp()
+        self.now = 0
+        self.client = MagicMock()
+        self.describe = MagicMock(
+            side_effect=lambda client, ids: {i: {'Id': i} for i in ids
+                                             if i != 'missing'})
+        self.poller = BatchPoller(self.describe, batch_size=2, ttl=10,
+                                  watch_ttl=100, clock=lambda: self.now)
+
+    def test_get_coalesces_watched_resources(self):
+        self.assertEqual(self.poller.get(self.client, 'a'), {'Id': 'a'})
+        self.assertEqual(self.poller.get(self.client, 'b'), {'Id': 'b'})
+        self.assertEqual(self.describe.call_count, 2)
+
+        # Both are stale, one call refreshes both
+        self.now = 10
+        self.poller.get(self.client, 'a')
+        self.describe.assert_called_with(self.client, ['a', 'b'])
+        self.assertEqual(self.poller.get(self.client, 'b'), {'Id': 'b'})
+        self.assertEqual(self.describe.call_count, 3)
+        self.assertEqual(self.poller.calls, 3)
+
+    def test_get_batch_size(self):
+        for resource_id in ['a', 'b', 'c']:
+            self.poller.get(self.client, resource_id)
+        self.now = 10
+        self.describe.reset_mock()
+        self.poller.get(self.client, 'c')
+        # The requested resource is in the first batch
+        self.assertEqual(self.describe.call_count, 2)
+        self.assertEqual(self.describe.call_args_list[0][0][1][0], 'c')
+
+    def test_get_missing(self):
+        self.assertIsNone(self.poller.get(self.client, 'missing'))
+        self.assertIsNone(self.poller.get(self.client, 'missing'))
+        self.assertEqual(self.describe.call_count, 1)
+        self.assertIsNone(self.poller.get(self.client, None))
+
+    def test_get_client_error(self):
+        self.describe.side_effect = ClientError(
+            error_response={'Error': {}}, operation_name='describe')
+        self.assertIsNone(self.poller.get(self.client, 'a'))
+        self.describe.side_effect = None
+        self.describe.return_value = {'a': {'Id': 'a'}}
+        self.assertEqual(self.poller.get(self.client, 'a'), {'Id': 'a'})
+
+    def test_watch_ttl(self):
+        self.poller.get(self.client, 'a')
+        self.now = 100
+        self.poller.get(self.client, 'b')
+        self.describe.assert_called_with(self.client, ['b'])
+
+    def test_invalidate(self):
+        self.poller.get(self.client, 'a')
+        self.poller.invalidate(self.client, ['a', None])
+        self.poller.get(self.client, 'a')
+        self.assertEqual(self.describe.call_count, 2)
+
+    def test_clients_isolated(self):
+        other = MagicMock()
+        self.poller.get(self.client, 'a')
+        self.poller.get(other, 'a')
+        self.assertEqual(self.describe.call_count, 2)
+        # Memoizing wrappers share the state of their client
+        self.poller.get(MemoizedClient(self.client, 5), 'a')
+        self.assertEqual(self.describe.call_count, 2)
+
+    def test_normalize(self):
+        poller = BatchPoller(self.describe, batch_size=2,
+                             normalize=lambda i: i.lower())
+        self.assertEqual(poller.get(self.client, 'A'), {'Id': 'a'})
+
+
+if __name__ == '__main__':
+    unittest.main()
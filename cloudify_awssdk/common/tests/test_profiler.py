@@ -0,0 +1,178 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from mock import MagicMock
+
+import boto3
+
+from cloudify.mocks import MockCloudifyContext
+from cloudify.state import current_ctx
+
+from cloudify_awssdk.common import decorators, profiler
+
+
+def _http_response(status_code=200, size=42):
+    http_response = MagicMock()
+    http_response.status_code = status_code
+    http_response.headers = {'content-length': str(size)}
+    return http_response
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        super(TestProfiler, self).setUp()
+        self.now = 0
+        self.client = profiler.instrument(boto3.client(
+            'ec2', region_name='us-east-1', aws_access_key_id='key',
+            aws_secret_access_key='secret'))
+        self.client._endpoint.make_request = MagicMock(
+            side_effect=self._make_request)
+        self.responses = []
+
+    def _make_request(self, model, request_dict):
+        self.now += 0.2
+        return self.responses.pop(0)
+
+    def test_calls_recorded(self):
+        profile = profiler.OperationProfile(clock=lambda: self.now)
+        self.responses = [(_http_response(), {'Reservations': []}),
+                          (_http_response(size=10), {'Reservations': []})]
+
+        # Not profiled
+        self.client.describe_instances()
+        self.assertEqual(len(self.responses), 1)
+
+        with profiler.activate(profile):
+            self.client.describe_instances(InstanceIds=['i-1'])
+        self.assertIsNone(profiler.current())
+
+        stats = profile.to_dict()['calls']['ec2.DescribeInstances']
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['response_bytes'], 10)
+        self.assertGreater(stats['request_bytes'], 0)
+        self.assertAlmostEqual(stats['latency']['total'], 0.2)
+        self.assertEqual(stats['latency']['histogram']['<=0.25'], 1)
+        self.assertEqual(sum(stats['latency']['histogram'].values()), 1)
+
+    def test_retries_and_throttles(self):
+        profile = profiler.OperationProfile(clock=lambda: self.now)
+        model = MagicMock()
+        model.service_model.service_name = 'ec2'
+        model.name = 'RunInstances'
+        context = dict()
+        throttled = (_http_response(503),
+                     {'Error': {'Code': 'RequestLimitExceeded'}})
+        profile.before_call(model, {'body': 'Action=RunInstances'}, context)
+        profile.needs_retry(model, throttled, 1, context)
+        profile.needs_retry(model, throttled, 2, context)
+        profile.needs_retry(model, (_http_response(), {}), 3, context)
+        profile.after_call(model, _http_response(400), {}, context)
+
+        stats = profile.to_dict()['calls']['ec2.RunInstances']
+        self.assertEqual(stats['request_bytes'], 19)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['throttles'], 2)
+        self.assertEqual(stats['errors'], 1)
+
+    def test_stage_and_bind(self):
+        profile = profiler.OperationProfile(clock=lambda: self.now)
+        with profiler.stage('status'):
+            self.now += 1
+        with profiler.activate(profile):
+            with profiler.stage('status'):
+                self.now += 2
+            with profiler.stage('status'):
+                self.now += 1
+            bound = profiler.bind(profiler.current)
+        self.assertEqual(profile.stages, {'status': 3})
+
+        # Calls run by other threads are recorded in the same profile
+        result = []
+        thread = threading.Thread(target=lambda: result.append(bound()))
+        thread.start()
+        thread.join()
+        self.assertIs(result[0], profile)
+
+
+class TestProfileOperation(unittest.TestCase):
+
+    def setUp(self):
+        super(TestProfileOperation, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'profile.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(TestProfileOperation, self).tearDown()
+
+    def _ctx(self, api_profile):
+        _ctx = MockCloudifyContext(
+            node_id='node_1', deployment_id='dep',
+            properties={'api_profile': api_profile},
+            runtime_properties={},
+            operation={'retry_number': 0,
+                       'name': 'cloudify.interfaces.lifecycle.create'})
+        current_ctx.set(_ctx)
+        return _ctx
+
+    def test_disabled(self):
+        _ctx = self._ctx({'enabled': False, 'file': self.path})
+        with profiler.profile_operation(_ctx) as profile:
+            self.assertIsNone(profile)
+            self.assertIsNone(profiler.current())
+        self.assertNotIn('api_profile', _ctx.instance.runtime_properties)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_aws_resource_profiled(self):
+        _ctx = self._ctx({'enabled': True, 'file': self.path})
+
+        @decorators.aws_resource(class_decl=MagicMock())
+        def test_create(**kwargs):
+            profiler.current().add_stage('create', 1)
+
+        test_create(ctx=_ctx)
+        test_create(ctx=_ctx)
+
+        record = _ctx.instance.runtime_properties['api_profile'][
+            'cloudify.interfaces.lifecycle.create']
+        self.assertEqual(record['node_instance_id'], 'node_1')
+        self.assertEqual(record['retry_number'], 0)
+        self.assertEqual(record['stages']['create'], 1)
+        self.assertIn('aws_resource', record['stages'])
+        with open(self.path) as lines:
+            records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1]['deployment_id'], 'dep')
+
+    def test_file_error(self):
+        _ctx = self._ctx({'enabled': True, 'runtime_property': False,
+                          'file': self.tmpdir})
+        _ctx.logger.warn = MagicMock()
+        with profiler.profile_operation(_ctx) as profile:
+            self.assertIs(profiler.current(), profile)
+        # Profiling never fails an operation
+        self.assertTrue(_ctx.logger.warn.called)
+        self.assertNotIn('api_profile', _ctx.instance.runtime_properties)
+
+
+if __name__ == '__main__':
+    unittest.main()
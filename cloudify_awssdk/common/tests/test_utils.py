@@ -12,9 +12,15 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import json
 import unittest
 from cloudify_awssdk.common.tests.test_base import TestBase
 from mock import MagicMock
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+
+from botocore.response import StreamingBody
 
 from cloudify.mocks import MockCloudifyContext
 from cloudify.state import current_ctx
@@ -260,12 +266,227 @@ class TestUtils(TestBase):
             ), [mock_child]
         )
 
+    def test_relationship_index(self):
+        mock_instance, mock_child = self._prepare_for_find_rel()
+        instance = mock_instance.instance
+        index = utils.get_relationship_index(instance)
+        self.assertIs(utils.get_relationship_index(instance), index)
+        self.assertEqual(
+            index.by_type('cloudify.relationships.contained_in'),
+            [mock_child])
+        self.assertEqual(index.by_node_type('cloudify.nodes.Root'),
+                         [mock_child])
+        self.assertEqual(index.by_node_type('cloudify.nodes.Compute'), [])
+
+        # The index is rebuilt when relationships are added
+        mock_other = MagicMock()
+        mock_other.type_hierarchy = ['cloudify.relationships.depends_on']
+        mock_other.target.node.type_hierarchy = ['cloudify.nodes.Compute']
+        instance.relationships.append(mock_other)
+        self.assertIsNot(utils.get_relationship_index(instance), index)
+        self.assertEqual(
+            utils.find_rels_by_node_type(instance, 'cloudify.nodes.Compute'),
+            [mock_other])
+
+    def test_get_ancestor_by_type_memoized(self):
+        mock_instance, mock_child = self._prepare_for_find_rel()
+        instance = mock_instance.instance
+        ancestor = utils.get_ancestor_by_type(
+            instance, 'cloudify.nodes.Compute')
+        self.assertEqual(ancestor.instance.runtime_properties,
+                         {'aws_resource_id': 'b'})
+        self.assertEqual(
+            utils.get_relationship_index(instance).ancestors,
+            {'cloudify.nodes.Compute': ancestor})
+        self.assertIsNone(utils.get_ancestor_by_type(
+            instance, 'cloudify.nodes.Network'))
+
     def test_validate_arn(self):
         self.assertTrue(utils.validate_arn('arn:aws:11'))
 
     def test_get_uuid(self):
         self.assertTrue(utils.get_uuid())
 
+    def test_get_idempotency_token(self):
+        def _ctx(deployment_id='dep', node_id='node_1',
+                 operation='cloudify.interfaces.lifecycle.create'):
+            return MockCloudifyContext(
+                deployment_id=deployment_id, node_id=node_id,
+                operation={'retry_number': 0, 'name': operation})
+
+        token = utils.get_idempotency_token(_ctx())
+        self.assertEqual(token, utils.get_idempotency_token(_ctx()))
+        self.assertLessEqual(len(token), 64)
+        for other in [_ctx(deployment_id='other'), _ctx(node_id='node_2'),
+                      _ctx(operation='cloudify.interfaces.lifecycle.start')]:
+            self.assertNotEqual(token, utils.get_idempotency_token(other))
+        self.assertNotEqual(token, utils.get_idempotency_token(_ctx(), 1))
+
+    def test_json_cleanuper(self):
+        response = {
+            'LaunchTime': datetime(2017, 1, 2, 3, 4, 5),
+            'Size': Decimal('1.5'),
+            'Count': 3,
+            'Enabled': True,
+            'Name': u'name',
+            'Empty': None,
+            'Tags': [{'Key': 'a', 'Values': ('b', Decimal('2'))}],
+            'Body': StreamingBody(BytesIO(b'payload'), 7)
+        }
+        self.assertEqual(utils.JsonCleanuper(response).to_dict(), {
+            'LaunchTime': '2017-01-02 03:04:05',
+            'Size': '1.5',
+            'Count': 3,
+            'Enabled': True,
+            'Name': u'name',
+            'Empty': None,
+            'Tags': [{'Key': 'a', 'Values': ['b', '2']}],
+            'Body': 'payload'
+        })
+
+    def test_json_cleanuper_deep(self):
+        response = value = {}
+        for _ in range(5000):
+            value['Child'] = {'Time': datetime(2017, 1, 1)}
+            value = value['Child']
+        cleaned = utils.JsonCleanuper(response).to_dict()
+        self.assertEqual(cleaned['Child']['Child']['Time'],
+                         '2017-01-01 00:00:00')
+
+    def test_json_cleanuper_keys(self):
+        response = [{'InstanceId': 'i-1', 'Time': datetime(2017, 1, 1),
+                     'Reservation': {'Large': 'x'}}]
+        self.assertEqual(
+            utils.JsonCleanuper(response, keys=['InstanceId', 'Time'])
+            .to_dict(),
+            [{'InstanceId': 'i-1', 'Time': '2017-01-01 00:00:00'}])
+
+    def test_project_response(self):
+        response = {'InstanceId': 'i-1', 'State': {'Name': 'running'},
+                    'Tags': [{'Key': 'a'}, {'Key': 'b'}]}
+        self.assertEqual(utils.project_response(response, None), response)
+        self.assertEqual(
+            utils.project_response(
+                response, ['InstanceId', 'State.Name', 'Tags[].Key']),
+            {'InstanceId': 'i-1', 'State.Name': 'running',
+             'Tags[].Key': ['a', 'b']})
+
+    def test_limit_response_size(self):
+        response = {'Small': 'a', 'Large': 'b' * 100, 'Medium': 'c' * 20}
+        self.assertEqual(utils.limit_response_size(response, 0),
+                         (response, 161, []))
+        limited, size, dropped = utils.limit_response_size(response, 50)
+        self.assertEqual(limited, {'Small': 'a', 'Medium': 'c' * 20})
+        self.assertEqual((size, dropped), (161, ['Large']))
+        self.assertLessEqual(len(json.dumps(limited)), 50)
+
+        limited, _, dropped = utils.limit_response_size(
+            ['a' * 10, 'b' * 10, 'c' * 10], 30)
+        self.assertEqual((limited, dropped), (['a' * 10, 'b' * 10], [2]))
+
+        self.assertEqual(utils.limit_response_size('a' * 10, 5),
+                         (None, 12, []))
+
+        # Kept keys are not dropped, even if the response does not fit
+        limited, _, dropped = utils.limit_response_size(
+            response, 50, keep=['Large'])
+        self.assertEqual(limited, {'Large': 'b' * 100})
+        self.assertEqual(sorted(dropped), ['Medium', 'Small'])
+
+    def test_budget_response_default(self):
+        # Responses are only limited when the node sets a budget
+        node = MagicMock(properties={})
+        response = {'Id': 'a', 'Large': 'b' * 100000}
+        self.assertEqual(
+            utils.budget_response(node, response, MagicMock()), response)
+
+    def test_update_create_response(self):
+        _ctx = MockCloudifyContext(
+            node_id='test_update_create_response',
+            properties={'response_budget': {
+                'fields': ['Id', 'Time'], 'max_size': 1000}},
+            runtime_properties={})
+        utils.update_create_response(
+            _ctx, {'Id': 'a', 'Time': datetime(2017, 1, 1), 'Other': 'b'})
+        self.assertEqual(_ctx.instance.runtime_properties['create_response'],
+                         {'Id': 'a', 'Time': '2017-01-01 00:00:00'})
+
+    def test_get_tags_list(self):
+        self.assertEqual(utils.get_tags_list(None, None, None), [])
+        node_tags = [{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}]
+        self.assertEqual(utils.get_tags_list(node_tags, None, None),
+                         node_tags)
+        # Later sources override by key, the order is kept
+        self.assertEqual(
+            utils.get_tags_list(node_tags, [{'Key': 'c', 'Value': '3'}],
+                                [{'Key': 'a', 'Value': '4'}]),
+            [{'Key': 'a', 'Value': '4'}, {'Key': 'b', 'Value': '2'},
+             {'Key': 'c', 'Value': '3'}])
+
+    def test_missing_tags(self):
+        tags = [{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}]
+        self.assertEqual(utils.missing_tags(tags, None), tags)
+        self.assertEqual(
+            utils.missing_tags(tags, [{'Key': 'a', 'Value': '1'},
+                                      {'Key': 'b', 'Value': '3'}]),
+            [{'Key': 'b', 'Value': '2'}])
+        self.assertEqual(utils.missing_tags(tags, tags), [])
+
+    def test_present_tags(self):
+        tags = [{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'},
+                {'Key': 'c'}]
+        self.assertEqual(utils.present_tags(tags, None), tags)
+        self.assertEqual(
+            utils.present_tags(tags, [{'Key': 'a', 'Value': '1'},
+                                      {'Key': 'b', 'Value': '3'},
+                                      {'Key': 'c', 'Value': '4'}]),
+            [{'Key': 'a', 'Value': '1'}, {'Key': 'c'}])
+        self.assertEqual(utils.present_tags(tags, []), [])
+
+    def test_update_runtime_list(self):
+        instance = MagicMock()
+        instance.runtime_properties = {'instances': ['a', 'b']}
+        stored = {'instances': ['a', 'b', 'c'], 'other': 1}
+
+        def update(on_conflict):
+            # Conflicting write of another operation
+            instance.runtime_properties = on_conflict(
+                instance.runtime_properties.copy(), stored)
+        instance.update = MagicMock(side_effect=update)
+        utils.update_runtime_list(instance, 'instances', add=['d', 'a'],
+                                  remove=['b'])
+        self.assertEqual(instance.runtime_properties,
+                         {'instances': ['a', 'c', 'd'], 'other': 1})
+
+        stored = {}
+        utils.update_runtime_list(instance, 'instances', add=['a'])
+        self.assertEqual(instance.runtime_properties, {'instances': ['a']})
+
+    def test_add_tag_specifications(self):
+        tags = [{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}]
+        params = {'ImageId': 'ami'}
+        self.assertEqual(
+            utils.add_tag_specifications(params, 'instance', tags),
+            {'ImageId': 'ami', 'TagSpecifications': [
+                {'ResourceType': 'instance', 'Tags': tags}]})
+        self.assertEqual(params, {'ImageId': 'ami'})
+
+        # Tags of the resource configuration take precedence
+        params = {'TagSpecifications': [
+            {'ResourceType': 'volume', 'Tags': [{'Key': 'c', 'Value': '3'}]},
+            {'ResourceType': 'instance', 'Tags': [{'Key': 'a',
+                                                   'Value': '0'}]}]}
+        self.assertEqual(
+            utils.add_tag_specifications(params, 'instance', tags),
+            {'TagSpecifications': [
+                {'ResourceType': 'volume',
+                 'Tags': [{'Key': 'c', 'Value': '3'}]},
+                {'ResourceType': 'instance',
+                 'Tags': [{'Key': 'a', 'Value': '0'},
+                          {'Key': 'b', 'Value': '2'}]}]})
+        self.assertEqual(params['TagSpecifications'][1]['Tags'],
+                         [{'Key': 'a', 'Value': '0'}])
+
 
 if __name__ == '__main__':
     unittest.main()
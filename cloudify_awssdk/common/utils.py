@@ -20,12 +20,19 @@
 
 # Local imports
 import sys
+import json
+import six
 from six.moves import urllib
 import re
 import uuid
+import weakref
+from datetime import date, datetime
+from decimal import Decimal
 
 # Third party imports
+import jmespath
 import requests
+from botocore.response import StreamingBody
 from requests import exceptions
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError
@@ -169,6 +176,32 @@ def update_resource_arn(instance, val):
     instance.runtime_properties[constants.EXTERNAL_RESOURCE_ARN] = str(val)
 
 
+def update_runtime_list(instance, key, add=None, remove=None):
+    '''
+        Adds and removes values of a list runtime property, as a set, and
+        stores it at once. Concurrent operations updating the same node
+        instance (like relationship operations of many sources with the
+        same target) are merged instead of overwriting each other.
+
+    :param instance: Cloudify node instance context
+    :param str key: Name of the runtime property
+    :param list add: Values to add, if not in the list
+    :param list remove: Values to remove, if in the list
+    '''
+    remove = list(remove or [])
+
+    def merge(_, latest):
+        values = [value for value in latest.get(key) or []
+                  if value not in remove]
+        for value in add or []:
+            if value not in values:
+                values.append(value)
+        latest = dict(latest)
+        latest[key] = values
+        return latest
+    instance.update(on_conflict=merge)
+
+
 def get_parent_resource_id(node_instance,
                            rel_type=constants.REL_CONTAINED_IN,
                            raise_on_missing=True):
@@ -211,6 +244,79 @@ def filter_boto_params(args, filters, preserve_none=False):
     }
 
 
+class RelationshipIndex(object):
+    '''
+        Index of the relationships of a node instance by relationship
+        type and by target node type (including the types they derive
+        from). Each index is built on first use, so that target nodes
+        are only fetched when searching by node type.
+
+    :param list relationships: Cloudify relationships
+    '''
+    def __init__(self, relationships):
+        self.relationships = relationships
+        self.size = len(relationships)
+        self.ancestors = dict()
+        self._by_type = None
+        self._by_node_type = None
+
+    @staticmethod
+    def _build(relationships, get_hierarchy):
+        index = dict()
+        for rel in relationships:
+            hierarchy = get_hierarchy(rel)
+            if isinstance(hierarchy, six.string_types):
+                hierarchy = [hierarchy]
+            for type_name in hierarchy or []:
+                rels = index.get(type_name)
+                if rels is None:
+                    index[type_name] = [rel]
+                elif rels[-1] is not rel:
+                    rels.append(rel)
+        return index
+
+    def is_current(self, relationships):
+        '''Checks if the index was built from these relationships'''
+        return relationships is self.relationships and \
+            len(relationships) == self.size
+
+    def by_type(self, rel_type):
+        '''Gets the relationships of a relationship type'''
+        if self._by_type is None:
+            self._by_type = self._build(
+                self.relationships, lambda rel: rel.type_hierarchy)
+        return list(self._by_type.get(rel_type, []))
+
+    def by_node_type(self, node_type):
+        '''Gets the relationships to nodes of a node type'''
+        if self._by_node_type is None:
+            self._by_node_type = self._build(
+                self.relationships,
+                lambda rel: rel.target.node.type_hierarchy)
+        return list(self._by_node_type.get(node_type, []))
+
+
+# node instance -> RelationshipIndex. Node instance contexts only live
+# for one operation, so are the indexes.
+_RELATIONSHIP_INDEXES = weakref.WeakKeyDictionary()
+
+
+def get_relationship_index(node_instance):
+    '''
+        Gets the relationship index of a node instance, building it
+        if needed or if the relationships changed.
+    :param `cloudify.context.NodeInstanceContext` node_instance:
+        Cloudify node instance.
+    :returns: A `RelationshipIndex`
+    '''
+    relationships = node_instance.relationships
+    index = _RELATIONSHIP_INDEXES.get(node_instance)
+    if index is None or not index.is_current(relationships):
+        index = RelationshipIndex(relationships)
+        _RELATIONSHIP_INDEXES[node_instance] = index
+    return index
+
+
 def find_rels_by_type(node_instance, rel_type):
     '''
         Finds all specified relationships of the Cloudify
@@ -221,8 +327,7 @@ def find_rels_by_type(node_instance, rel_type):
         node_instance.relationships for.
     :returns: List of Cloudify relationships
     '''
-    return [x for x in node_instance.relationships
-            if rel_type in x.type_hierarchy]
+    return get_relationship_index(node_instance).by_type(rel_type)
 
 
 def find_rel_by_type(node_instance, rel_type):
@@ -248,8 +353,7 @@ def find_rels_by_node_type(node_instance, node_type):
         node_instance.relationships for.
     :returns: List of Cloudify relationships
     '''
-    return [x for x in node_instance.relationships
-            if node_type in x.target.node.type_hierarchy]
+    return get_relationship_index(node_instance).by_node_type(node_type)
 
 
 def find_rel_by_node_type(node_instance, node_type):
@@ -295,13 +399,18 @@ def get_ancestor_by_type(inst, node_type):
     :param string node_type: Node type name
     :returns: Ancestor context or None
     '''
-    # Find a parent of a specific type
-    rel = find_rel_by_type(inst, 'cloudify.relationships.contained_in')
-    if not rel:
-        return None
-    if node_type in rel.target.node.type_hierarchy:
-        return rel.target
-    return get_ancestor_by_type(rel.target.instance, node_type)
+    index = get_relationship_index(inst)
+    if node_type not in index.ancestors:
+        # Find a parent of a specific type
+        rel = find_rel_by_type(inst, 'cloudify.relationships.contained_in')
+        if not rel:
+            ancestor = None
+        elif is_node_type(rel.target.node, node_type):
+            ancestor = rel.target
+        else:
+            ancestor = get_ancestor_by_type(rel.target.instance, node_type)
+        index.ancestors[node_type] = ancestor
+    return index.ancestors[node_type]
 
 
 def add_resources_from_rels(node_instance, node_type, current_list):
@@ -376,51 +485,215 @@ def get_uuid():
     return str(uuid.uuid4())
 
 
+def get_idempotency_token(_ctx, generation=0):
+    '''
+        Gets the idempotency token of the create call of the current
+        operation. Retries of the operation, even in another execution,
+        get the same token until `generation` changes.
+
+    :param _ctx: Cloudify node instance operation context
+    :param int generation: Number of resources created before
+    :returns: A UUID string, within the 64 characters of
+        ClientToken and CreationToken
+    '''
+    name = '/'.join([str(_ctx.deployment.id), str(_ctx.instance.id),
+                     str(_ctx.operation.name), str(generation)])
+    return str(uuid.uuid5(
+        uuid.UUID(constants.IDEMPOTENCY_NAMESPACE), name))
+
+
+def _read_streaming_body(body):
+    content = body.read()
+    if isinstance(content, six.binary_type) and \
+            six.binary_type is not str:
+        return content.decode('utf-8', 'replace')
+    return content
+
+
 class JsonCleanuper(object):
+    '''
+        Converts an AWS response, in place, to values which can be stored
+        in runtime properties. Dicts and lists are walked without
+        recursion and every other value is converted by looking its type
+        up in `converters`.
+
+    :param ob: Response, or an object with a `to_dict` method
+    :param list keys: If given, only these keys of the response (or of
+        each item of a list response) are kept
+    '''
+    # type -> function converting a value of that type, or None to keep it
+    converters = {
+        bool: None,
+        int: None,
+        str: None,
+        six.text_type: None,
+        datetime: str,
+        date: str,
+        Decimal: str,
+        StreamingBody: _read_streaming_body,
+    }
+    if six.binary_type is not str:
+        converters[six.binary_type] = \
+            lambda value: value.decode('utf-8', 'replace')
 
-    def __init__(self, ob):
+    def __init__(self, ob, keys=None):
         try:
             resource = ob.to_dict()
         except AttributeError:
             resource = ob
 
-        if isinstance(resource, list):
-            self._cleanuped_list(resource)
-        elif isinstance(resource, dict):
-            self._cleanuped_dict(resource)
+        if keys is not None:
+            resource = self._pruned(resource, set(keys))
+        if isinstance(resource, (list, dict)):
+            self._cleanup(resource)
 
         self.value = resource
 
-    def _cleanuped_list(self, resource):
-        for k, v in enumerate(resource):
-            if not v:
-                continue
-            if isinstance(v, list):
-                self._cleanuped_list(v)
-            elif isinstance(v, dict):
-                self._cleanuped_dict(v)
-            elif (not isinstance(v, int) and  # integer and bool
-                  not isinstance(v, str) and
-                  not isinstance(v, unicode)):
-                resource[k] = str(v)
-
-    def _cleanuped_dict(self, resource):
-        for k in resource:
-            if not resource[k]:
-                continue
-            if isinstance(resource[k], list):
-                self._cleanuped_list(resource[k])
-            elif isinstance(resource[k], dict):
-                self._cleanuped_dict(resource[k])
-            elif (not isinstance(resource[k], int) and  # integer and bool
-                  not isinstance(resource[k], str) and
-                  not isinstance(resource[k], unicode)):
-                resource[k] = str(resource[k])
+    @staticmethod
+    def _pruned(resource, keys):
+        if isinstance(resource, dict):
+            return dict((k, v) for k, v in resource.items() if k in keys)
+        if isinstance(resource, list):
+            return [JsonCleanuper._pruned(item, keys) for item in resource]
+        return resource
+
+    @classmethod
+    def _converter(cls, value_type):
+        for base in value_type.__mro__:
+            if base in cls.converters:
+                converter = cls.converters[base]
+                break
+        else:
+            converter = str
+        cls.converters[value_type] = converter
+        return converter
+
+    def _cleanup(self, resource):
+        converters = self.converters
+        stack = [resource]
+        while stack:
+            container = stack.pop()
+            if isinstance(container, dict):
+                items = container.items()
+            else:
+                items = enumerate(container)
+            for k, v in items:
+                if not v:
+                    continue
+                value_type = type(v)
+                if value_type is dict or value_type is list:
+                    stack.append(v)
+                    continue
+                if value_type is tuple:
+                    container[k] = v = list(v)
+                    stack.append(v)
+                    continue
+                try:
+                    converter = converters[value_type]
+                except KeyError:
+                    if isinstance(v, (dict, list)):
+                        stack.append(v)
+                        continue
+                    converter = self._converter(value_type)
+                if converter is not None:
+                    container[k] = converter(v)
 
     def to_dict(self):
         return self.value
 
 
+def project_response(response, fields):
+    '''
+        Keeps only some fields of a response
+
+    :param response: AWS response
+    :param list fields: JMESPath expressions, each one is the key of its
+        result in the projection. Nothing is projected if empty.
+    :returns: Projected response
+    '''
+    if not fields:
+        return response
+    return dict((field, jmespath.search(field, response)) for field in fields)
+
+
+def _json_size(value):
+    return len(json.dumps(value, default=str))
+
+
+def limit_response_size(response, max_size, keep=None):
+    '''
+        Drops the largest keys of a cleaned response (or the last items
+        of a list response) until its JSON encoding fits in `max_size`
+
+    :param response: Cleaned AWS response
+    :param int max_size: Maximum number of bytes, no limit if 0 or None
+    :param list keep: Keys of a dict response which are never dropped,
+        even if the response does not fit
+    :returns: A tuple of the limited response, the original size and
+        the list of dropped keys (or indexes)
+    '''
+    size = _json_size(response)
+    if not max_size or size <= max_size:
+        return response, size, []
+    remaining = size
+    dropped = list()
+    if isinstance(response, dict):
+        # Every entry takes '"key": value, '
+        entries = sorted(
+            ((_json_size(k) + _json_size(v) + 4, k)
+             for k, v in response.items() if k not in (keep or [])),
+            reverse=True)
+        response = dict(response)
+        for entry_size, key in entries:
+            if remaining <= max_size:
+                break
+            del response[key]
+            dropped.append(key)
+            remaining -= entry_size
+    elif isinstance(response, list):
+        response = list(response)
+        while response and remaining > max_size:
+            # Every item takes 'value, '
+            remaining -= _json_size(response.pop()) + 2
+            dropped.append(len(response))
+    if remaining > max_size and not (keep and isinstance(response, dict)):
+        return None, size, dropped
+    return response, size, dropped
+
+
+def budget_response(node, response, logger=None, keep=None):
+    '''
+        Cleans a response to be kept in runtime properties, applying the
+        projection and size budget of the node "response_budget" property
+
+    :param `cloudify.context.NodeContext` node: Cloudify node
+    :param response: AWS response
+    :param logger: Logger, defaults to the operation logger
+    :param list keep: Keys of the response which are never dropped
+        to fit the size budget
+    :returns: Cleaned response
+    '''
+    config = node.properties.get(constants.RESPONSE_BUDGET_PROPERTY) or dict()
+    response = JsonCleanuper(
+        project_response(response, config.get('fields'))).to_dict()
+    max_size = config.get('max_size', constants.RESPONSE_MAX_SIZE)
+    response, size, dropped = limit_response_size(response, max_size, keep)
+    logger = logger or ctx.logger
+    if max_size and size > max_size:
+        logger.warn(
+            'Response of {0} bytes exceeds the {1} bytes budget, dropped: '
+            '{2}'.format(size, max_size, dropped or 'all'))
+    else:
+        logger.debug('Response size: {0} bytes'.format(size))
+    return response
+
+
+def update_create_response(_ctx, response):
+    '''Stores the cleaned response of a create call'''
+    _ctx.instance.runtime_properties['create_response'] = \
+        budget_response(_ctx.node, response, _ctx.logger)
+
+
 def generate_swift_access_config(auth_url, username, password):
 
     payload = dict()
@@ -447,11 +720,91 @@ def generate_swift_access_config(auth_url, username, password):
 
 
 def get_tags_list(node_prop, runtime_prop, input_prop):
+    '''
+        Merges the tags of a node property, runtime property and
+        operation input. Tags keep their order, a tag of a later source
+        replaces the tag of an earlier one with the same key, so that
+        retries send the same tags.
+
+    :param list node_prop: Tags of the node property
+    :param list runtime_prop: Tags of the runtime property
+    :param list input_prop: Tags of the operation input
+    :returns: List of Key/Value dicts
+    '''
     tags_list = []
-    if isinstance(node_prop, list):
-        tags_list = node_prop
-    if isinstance(runtime_prop, list):
-        tags_list = list(set(tags_list + runtime_prop))
-    if isinstance(input_prop, list):
-        tags_list = list(set(tags_list + input_prop))
+    positions = dict()
+    for tags in (node_prop, runtime_prop, input_prop):
+        if not isinstance(tags, list):
+            continue
+        for tag in tags:
+            key = tag.get('Key') if isinstance(tag, dict) else None
+            if key is None:
+                tags_list.append(tag)
+            elif key in positions:
+                tags_list[positions[key]] = tag
+            else:
+                positions[key] = len(tags_list)
+                tags_list.append(tag)
     return tags_list
+
+
+def missing_tags(tags, existing):
+    '''
+        Gets the tags which are not set yet
+
+    :param list tags: Tags to set, as a list of Key/Value dicts
+    :param list existing: Tags of the resource, None if unknown
+    :returns: The tags of `tags` not in `existing`
+    '''
+    if not isinstance(existing, list):
+        return tags
+    present = set((tag.get('Key'), tag.get('Value')) for tag in existing)
+    return [tag for tag in tags
+            if (tag.get('Key'), tag.get('Value')) not in present]
+
+
+def present_tags(tags, existing):
+    '''
+        Gets the tags which are set, matching on the key only when
+        a tag to delete has no value
+
+    :param list tags: Tags to delete, as a list of Key/Value dicts
+    :param list existing: Tags of the resource, None if unknown
+    :returns: The tags of `tags` in `existing`
+    '''
+    if not isinstance(existing, list):
+        return tags
+    present = set((tag.get('Key'), tag.get('Value')) for tag in existing)
+    keys = set(key for key, _ in present)
+    return [tag for tag in tags
+            if tag.get('Key') in keys and
+            ('Value' not in tag or (tag['Key'], tag['Value']) in present)]
+
+
+def add_tag_specifications(params, resource_type, tags):
+    '''
+        Adds tags to the TagSpecifications of a create call, tags
+        already specified for the resource type take precedence
+
+    :param dict params: Parameters of the create call
+    :param str resource_type: TagSpecifications resource type,
+        such as "instance"
+    :param list tags: Tags, as a list of Key/Value dicts
+    :returns: A copy of `params` with the tags
+    '''
+    params = dict(params or {})
+    specifications = list(params.get('TagSpecifications') or [])
+    for index, specification in enumerate(specifications):
+        if specification.get('ResourceType') == resource_type:
+            keys = set(tag.get('Key')
+                       for tag in specification.get('Tags', []))
+            specifications[index] = dict(
+                specification,
+                Tags=specification.get('Tags', []) +
+                [tag for tag in tags if tag.get('Key') not in keys])
+            break
+    else:
+        specifications.append({'ResourceType': resource_type,
+                               'Tags': tags})
+    params['TagSpecifications'] = specifications
+    return params
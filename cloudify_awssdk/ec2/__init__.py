@@ -20,6 +20,7 @@
 # Cloudify AWS
 from cloudify_awssdk.common import AWSResourceBase
 from cloudify_awssdk.common.connection import Boto3Connection
+from cloudify_awssdk.ec2 import tagging
 
 # pylint: disable=R0903
 
@@ -28,6 +29,10 @@ class EC2Base(AWSResourceBase):
     """
         AWS ELB base interface
     """
+    # TagSpecifications resource type of the create call, None when
+    # the resource is tagged after it is created
+    tag_specifications_type = None
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         AWSResourceBase.__init__(
             self, client or Boto3Connection(ctx_node).client('ec2'),
@@ -51,16 +56,34 @@ class EC2Base(AWSResourceBase):
         """Deletes a resource"""
         raise NotImplementedError()
 
+    @property
+    def current_tags(self):
+        """
+            Gets the tags of the resource when they are known without
+            an additional AWS call, None otherwise
+        """
+        return None
+
+    def _tag_call(self, batcher, params):
+        if set(params) - set([tagging.RESOURCES, tagging.TAGS]):
+            # Options such as DryRun are not batched
+            res = getattr(self.client, batcher.method)(**params)
+        else:
+            res = batcher.submit(self.client, params[tagging.RESOURCES],
+                                 params.get(tagging.TAGS))
+            AWSResourceBase.refresh(self)
+        return res
+
     def tag(self, params):
-        """Creates a resource"""
+        """Tags resources, batched with concurrent operations"""
         self.logger.info('Tagging %s.' % params)
-        res = self.client.create_tags(**params)
+        res = self._tag_call(tagging.TAGGER, params)
         self.logger.debug('Response: %s' % res)
         return res
 
     def untag(self, params):
-        """Creates a resource"""
+        """Untags resources, batched with concurrent operations"""
         self.logger.info('Untagging %s.' % params)
-        res = self.client.delete_tags(**params)
+        res = self._tag_call(tagging.UNTAGGER, params)
         self.logger.debug('Response: %s' % res)
         return res
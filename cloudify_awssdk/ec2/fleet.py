@@ -0,0 +1,143 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    EC2.Fleet
+    ~~~~~~~~~
+    Batched launching of identical EC2 instances
+'''
+# Standard imports
+import json
+import time
+
+# Cloudify
+from cloudify_awssdk.common.batcher import Batch, Batcher, shared_client
+from cloudify_awssdk.common.constants import (
+    EC2_FLEET_LINGER,
+    EC2_FLEET_MAX_SIZE,
+    EC2_FLEET_WINDOW)
+
+CLIENT_TOKEN = 'ClientToken'
+INSTANCES = 'Instances'
+INSTANCE_ID = 'InstanceId'
+LAUNCH_INDEX = 'AmiLaunchIndex'
+
+
+class _Launch(Batch):
+    '''Node instances waiting for identical EC2 instances'''
+    def __init__(self, key, params, max_size):
+        Batch.__init__(self, key)
+        self.params = params
+        self.max_size = max_size
+
+
+class InstanceFleet(Batcher):
+    '''
+        Coalesces the run_instances calls of concurrent operations. The
+        requests of node instances of the same node, with the same
+        run_instances parameters and client, are sent as a single
+        run_instances call launching one EC2 instance per request. A
+        launch is sent when it has `max_size` requests, when no request
+        joined it for `linger` seconds, or `window` seconds after its
+        first request, whichever comes first.
+
+        The launched instances, ordered by launch index, are given to the
+        requests ordered by node instance ID. Fewer instances than
+        requests may be launched when capacity is short, the requests
+        left without an instance then get None and launch their own.
+
+        Only the operations of one process share a launch, that is the
+        operations of a workflow run by "cfy local". A manager runs every
+        operation in its own process, where every launch has a single
+        request, sent right away with the client token of the request.
+
+    :param float linger: Number of seconds a launch waits for
+        another request
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, linger=EC2_FLEET_LINGER, clock=time.time):
+        Batcher.__init__(self, EC2_FLEET_WINDOW, linger, clock)
+
+    def launch(self, client, group, request_id, params,
+               max_size=EC2_FLEET_MAX_SIZE, window=EC2_FLEET_WINDOW,
+               client_token=None):
+        '''
+            Launches one EC2 instance, together with the concurrent
+            requests of the same group with the same parameters
+
+        :param client: A Boto3 EC2 client
+        :param group: Hashable ID of the group, typically the
+            deployment and node IDs
+        :param str request_id: Node instance ID
+        :param dict params: run_instances parameters, without the counts
+        :param int max_size: Maximum number of instances per call
+        :param float window: Maximum number of seconds a launch waits
+            for requests
+        :param str client_token: Idempotency token of the request, only
+            sent when the launch has no other request
+        :returns: The run_instances response for this request, with a
+            single instance, or None if no instance was launched for it
+        '''
+        key = (shared_client(client), group,
+               json.dumps(params, sort_keys=True, default=str))
+        return self._submit(key, (request_id, client_token), window=window,
+                            params=params, max_size=max_size)
+
+    def _new_batch(self, key, params=None, max_size=EC2_FLEET_MAX_SIZE):
+        return _Launch(key, params, max_size)
+
+    def _is_full(self, launch):
+        return len(launch.requests) >= launch.max_size
+
+    def _assign(self, launch, response, instances):
+        '''Gives the instances to the requests, returns their IDs'''
+        indexes = sorted(range(len(launch.requests)),
+                         key=lambda index: launch.requests[index][0])
+        for index, instance in zip(indexes, instances):
+            launch.results[index] = dict(response, **{INSTANCES: [instance]})
+            yield instance[INSTANCE_ID]
+
+    def _flush(self, launch):
+        client = launch.key[0]
+        launched = list()
+        given = set()
+        try:
+            params = dict(launch.params, MinCount=1,
+                          MaxCount=len(launch.requests))
+            client_token = launch.requests[0][1]
+            if len(launch.requests) == 1 and client_token:
+                # A shared call cannot have the token of every request
+                params[CLIENT_TOKEN] = client_token
+            self.calls += 1
+            response = client.run_instances(**params)
+            instances = sorted(response.get(INSTANCES, []),
+                               key=lambda instance: instance.get(LAUNCH_INDEX))
+            launched = [instance[INSTANCE_ID] for instance in instances]
+            given.update(self._assign(launch, response, instances))
+        except Exception as error:
+            launch.results.clear()
+            for index in range(len(launch.requests)):
+                launch.errors[index] = error
+            given.clear()
+        finally:
+            # Instances not given to a node instance would never
+            # be terminated
+            orphans = [instance_id for instance_id in launched
+                       if instance_id not in given]
+            if orphans:
+                self.calls += 1
+                client.terminate_instances(InstanceIds=orphans)
+
+
+FLEET = InstanceFleet()
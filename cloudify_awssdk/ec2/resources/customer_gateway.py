@@ -108,8 +108,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)['CustomerGateway']
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     utils.update_resource_id(ctx.instance,
                              create_response.get(CUSTOMERGATEWAY_ID))
 
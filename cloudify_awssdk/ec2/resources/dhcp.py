@@ -110,8 +110,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)[DHCPOPTIONS]
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     dhcp_options_id = create_response.get(DHCPOPTIONS_ID, '')
     iface.update_resource_id(dhcp_options_id)
     utils.update_resource_id(ctx.instance, dhcp_options_id)
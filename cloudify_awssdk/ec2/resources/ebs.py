@@ -17,14 +17,12 @@
     ~~~~~~~~~~~~~~
     AWS EC2 EBS Volume
 """
-# Boto
-from botocore.exceptions import ClientError
-
 # Cloudify
 from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.common import decorators
 from cloudify_awssdk.common import constants
 from cloudify_awssdk.common import utils
+from cloudify_awssdk.common.poller import BatchPoller
 from cloudify_awssdk.ec2 import EC2Base
 
 
@@ -51,6 +49,29 @@ DELETING = 'deleting'
 DELETED = 'deleted'
 
 
+def describe_volumes_batch(client, volume_ids):
+    """
+    Describes many volumes at once. Filters are used instead of
+    VolumeIds so that a missing volume does not fail the call.
+    :param client: A Boto3 EC2 client
+    :param volume_ids: list of volume IDs
+    :return: dict of volume ID to volume
+    """
+    params = {'Filters': [{'Name': 'volume-id', 'Values': volume_ids}]}
+    volumes = dict()
+    while True:
+        resources = client.describe_volumes(**params)
+        for volume in resources.get(VOLUMES, []):
+            volumes[volume[VOLUME_ID]] = volume
+        if not resources.get('NextToken'):
+            return volumes
+        params['NextToken'] = resources['NextToken']
+
+
+VOLUMES_POLLER = BatchPoller(describe_volumes_batch,
+                             batch_size=constants.EC2_FILTER_MAX_VALUES)
+
+
 class EC2VolumeMixin(object):
     """
         EC2 EBS Volume
@@ -65,14 +86,12 @@ class EC2VolumeMixin(object):
         Gets the properties of an external resource
         :return: dict of selected volume
         """
-        params = {VOLUME_IDS: [self.resource_id]}
-        try:
-            resources = \
-                self.client.describe_volumes(**params)
-        except ClientError:
-            pass
-        else:
-            return resources.get(VOLUMES)[0] if resources else None
+        return VOLUMES_POLLER.get(self.client, self.resource_id)
+
+    def refresh(self):
+        """Drops cached responses so that the next read goes to AWS"""
+        EC2Base.refresh(self)
+        VOLUMES_POLLER.invalidate(self.client, [self.resource_id])
 
     @property
     def status(self):
@@ -83,11 +102,20 @@ class EC2VolumeMixin(object):
         return self.properties[VOLUME_STATE]\
             if self.properties and self.properties.get(VOLUME_STATE) else None
 
+    @property
+    def current_tags(self):
+        """Gets the tags of the resource, shared with the status polling"""
+        props = self.properties
+        if not props:
+            return None
+        return props.get('Tags', [])
+
 
 class EC2Volume(EC2VolumeMixin, EC2Base):
     """
         EC2 EBS Volume
     """
+    tag_specifications_type = 'volume'
 
     def create(self, params):
         """
@@ -106,6 +134,7 @@ class EC2Volume(EC2VolumeMixin, EC2Base):
         self.logger.debug('Deleting {0} with parameters: {1}'
                           .format(self.type_name, params))
         res = self.client.delete_volume(**params)
+        VOLUMES_POLLER.invalidate(self.client, [params.get(VOLUME_ID)])
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -121,7 +150,9 @@ class EC2VolumeAttachment(EC2VolumeMixin, EC2Base):
         :param params:
         :return:
         """
-        return self.make_client_call('attach_volume', params)
+        res = self.make_client_call('attach_volume', params)
+        VOLUMES_POLLER.invalidate(self.client, [params.get(VOLUME_ID)])
+        return res
 
     def delete(self, params=None):
         """
@@ -133,6 +164,7 @@ class EC2VolumeAttachment(EC2VolumeMixin, EC2Base):
                           .format(self.type_name, params.get(VOLUME_ID, None)))
 
         res = self.client.detach_volume(**params)
+        VOLUMES_POLLER.invalidate(self.client, [params.get(VOLUME_ID)])
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -165,8 +165,7 @@ def create(ctx, iface, resource_config, **_):
     # Actually create the resource
     create_response = iface.create(params)['NetworkInterface']
     cleaned_create_response = utils.JsonCleanuper(create_response).to_dict()
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(cleaned_create_response).to_dict()
+    utils.update_create_response(ctx, cleaned_create_response)
     eni_id = cleaned_create_response.get(NETWORKINTERFACE_ID, '')
     iface.update_resource_id(eni_id)
     utils.update_resource_id(ctx.instance, eni_id)
@@ -23,17 +23,24 @@ from Crypto.PublicKey import RSA
 from collections import defaultdict
 import json
 import os
-
-# Boto
-from botocore.exceptions import ClientError
+import sys
 
 # Cloudify
 from cloudify import compute
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError, OperationRetry
-from cloudify_awssdk.common import decorators, utils
-from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
+from cloudify.utils import exception_to_error_cause
+from cloudify_awssdk.common import FATAL_EXCEPTIONS, decorators, utils
+from cloudify_awssdk.common.backoff import get_retry_after
+from cloudify_awssdk.common.constants import (
+    DESCRIBE_CACHE_TTL,
+    EC2_FILTER_MAX_VALUES,
+    EC2_FLEET_MAX_SIZE,
+    EC2_FLEET_WINDOW,
+    EXTERNAL_RESOURCE_ID)
+from cloudify_awssdk.common.poller import BatchPoller
 from cloudify_awssdk.ec2 import EC2Base
+from cloudify_awssdk.ec2.fleet import FLEET
 from cloudify_awssdk.ec2.decrypt import decrypt_password
 
 RESOURCE_TYPE = 'EC2 Instances'
@@ -58,12 +65,41 @@ INSTANCE_ID = 'InstanceId'
 INSTANCE_IDS = 'InstanceIds'
 DEVICE_INDEX = 'DeviceIndex'
 NIC_ID = 'NetworkInterfaceId'
+MIN_COUNT = 'MinCount'
+MAX_COUNT = 'MaxCount'
+CLIENT_TOKEN = 'ClientToken'
+FLEET_PROPERTY = 'fleet'
+
+
+def describe_instances_batch(client, instance_ids):
+    '''
+        Describes many instances at once. Filters are used instead of
+        InstanceIds so that a missing instance does not fail the call.
+    '''
+    params = {'Filters': [{'Name': 'instance-id', 'Values': instance_ids}]}
+    instances = dict()
+    while True:
+        resources = client.describe_instances(**params)
+        for reservation in resources.get(RESERVATIONS, []):
+            for instance in reservation.get(INSTANCES, []):
+                instances[instance[INSTANCE_ID]] = instance
+        if not resources.get('NextToken'):
+            return instances
+        params['NextToken'] = resources['NextToken']
+
+
+INSTANCES_POLLER = BatchPoller(describe_instances_batch,
+                               batch_size=EC2_FILTER_MAX_VALUES)
 
 
 class EC2Instances(EC2Base):
     '''
         EC2 Instances interface
     '''
+    describe_cache_ttl = DESCRIBE_CACHE_TTL
+    tag_specifications_type = 'instance'
+    idempotency_token = CLIENT_TOKEN
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         EC2Base.__init__(self, ctx_node, resource_id, client, logger)
         self.type_name = RESOURCE_TYPE
@@ -71,21 +107,12 @@ class EC2Instances(EC2Base):
     @property
     def properties(self):
         '''Gets the properties of an external resource'''
-        params = {INSTANCE_IDS: [self.resource_id]}
-        try:
-            resources = \
-                self.client.describe_instances(**params)
-        except ClientError:
-            pass
-        else:
-            reservations = resources.get(RESERVATIONS, [])
-            instances = []
-            for r in reservations:
-                for i in r.get(INSTANCES, []):
-                    instances.append(i)
-            if len(instances) == 1:
-                return instances[0]
-        return None
+        return INSTANCES_POLLER.get(self.client, self.resource_id)
+
+    def refresh(self):
+        '''Drops cached responses so that the next read goes to AWS'''
+        EC2Base.refresh(self)
+        INSTANCES_POLLER.invalidate(self.client, [self.resource_id])
 
     @property
     def status(self):
@@ -95,12 +122,51 @@ class EC2Instances(EC2Base):
             return None
         return props['State']['Code']
 
+    @property
+    def current_tags(self):
+        '''Gets the tags of the resource, shared with the status polling'''
+        props = self.properties
+        if not props:
+            return None
+        return props.get('Tags', [])
+
     def create(self, params):
         '''
             Create AWS EC2 Instances.
         '''
         return self.make_client_call('run_instances', params)
 
+    def create_in_fleet(self, params, group, request_id,
+                        max_size=EC2_FLEET_MAX_SIZE, window=EC2_FLEET_WINDOW,
+                        client_token=None):
+        '''
+            Create an AWS EC2 Instance, in a run_instances call shared
+            with the other node instances of the group launched at the
+            same time with the same parameters, by the same process.
+        '''
+        self.logger.debug(
+            'Launching {0} {1} in group {2} with parameters: {3}'.format(
+                self.type_name, request_id, group, params))
+        try:
+            res = FLEET.launch(self.client, group, request_id, params,
+                               max_size=max_size, window=window,
+                               client_token=client_token)
+        except FATAL_EXCEPTIONS as error:
+            _, _, tb = sys.exc_info()
+            raise NonRecoverableError(
+                str(error.message),
+                causes=[exception_to_error_cause(error, tb)])
+        finally:
+            EC2Base.refresh(self)
+        if res is None:
+            # Capacity was short for the whole group
+            params = dict(params, **{MIN_COUNT: 1, MAX_COUNT: 1})
+            if client_token:
+                params[CLIENT_TOKEN] = client_token
+            return self.create(params)
+        self.logger.debug('Response: {0}'.format(res))
+        return res
+
     def start(self, params):
         '''
             Start Instances.
@@ -109,6 +175,7 @@ class EC2Instances(EC2Base):
             'Starting {0} with parameters: {1}'.format(
                 self.type_name, params))
         res = self.client.start_instances(**params)
+        INSTANCES_POLLER.invalidate(self.client, params.get(INSTANCE_IDS))
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -120,6 +187,7 @@ class EC2Instances(EC2Base):
             'Stopping {0} with parameters: {1}'.format(
                 self.type_name, params))
         res = self.client.stop_instances(**params)
+        INSTANCES_POLLER.invalidate(self.client, params.get(INSTANCE_IDS))
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -131,6 +199,7 @@ class EC2Instances(EC2Base):
             'Deleting {0} with parameters: {1}'.format(
                 self.type_name, params))
         res = self.client.terminate_instances(**params)
+        INSTANCES_POLLER.invalidate(self.client, params.get(INSTANCE_IDS))
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -142,6 +211,7 @@ class EC2Instances(EC2Base):
             'Modifying {0} attribute with parameters: {1}'.format(
                 self.type_name, params))
         res = self.client.modify_instance_attribute(**params)
+        INSTANCES_POLLER.invalidate(self.client, [params.get(INSTANCE_ID)])
         self.logger.debug('Response: {0}'.format(res))
         return res
 
@@ -169,6 +239,7 @@ def prepare(ctx, iface, resource_config, **_):
     status_good=[RUNNING, PENDING],
     fail_on_missing=False)
 @decorators.tag_resources
+@decorators.idempotent_create
 def create(ctx, iface, resource_config, **_):
     '''Creates AWS EC2 Instances'''
 
@@ -242,9 +313,21 @@ def create(ctx, iface, resource_config, **_):
             nic[DEVICE_INDEX] = counter
     params[NETWORK_INTERFACES] = merged_nics
 
-    create_response = iface.create(params)
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    fleet = ctx.node.properties.get(FLEET_PROPERTY) or dict()
+    if fleet.get('enabled') and params.get(MIN_COUNT, 1) == 1 \
+            and params.get(MAX_COUNT, 1) == 1:
+        # Instances of a fleet share one run_instances call, the token
+        # is only sent by launches of a single instance
+        create_response = iface.create_in_fleet(
+            dict((key, value) for key, value in params.items()
+                 if key not in [MIN_COUNT, MAX_COUNT, CLIENT_TOKEN]),
+            (ctx.deployment.id, ctx.node.id), ctx.instance.id,
+            max_size=fleet.get('max_size') or EC2_FLEET_MAX_SIZE,
+            window=fleet.get('window') or EC2_FLEET_WINDOW,
+            client_token=params.get(CLIENT_TOKEN))
+    else:
+        create_response = iface.create(params)
+    utils.update_create_response(ctx, create_response)
     try:
         instance = create_response[INSTANCES][0]
     except (KeyError, IndexError) as e:
@@ -323,12 +406,14 @@ def assign_ip_properties(_ctx, current_properties):
 def start(ctx, iface, resource_config, **_):
     '''Starts AWS EC2 Instances'''
 
-    if iface.status in [RUNNING] and ctx.operation.retry_number > 0:
+    status = iface.status
+    if status in [RUNNING] and ctx.operation.retry_number > 0:
         assign_ip_properties(ctx, iface.properties)
         if not _handle_password(iface):
             raise OperationRetry(
                 'Waiting for {0} ID# {1} password.'.format(
-                    iface.type_name, iface.resource_id))
+                    iface.type_name, iface.resource_id),
+                retry_after=get_retry_after(ctx, RUNNING))
         return
 
     elif ctx.operation.retry_number == 0:
@@ -340,7 +425,8 @@ def start(ctx, iface, resource_config, **_):
 
     raise OperationRetry(
         '{0} ID# {1} is still in a pending state.'.format(
-            iface.type_name, iface.resource_id))
+            iface.type_name, iface.resource_id),
+        retry_after=get_retry_after(ctx, status))
 
 
 @decorators.aws_resource(EC2Instances, RESOURCE_TYPE)
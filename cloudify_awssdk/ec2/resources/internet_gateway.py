@@ -112,8 +112,7 @@ def create(ctx, iface, resource_config, **_):
     '''Creates an AWS EC2 Internet Gateway'''
     params = dict() if not resource_config else resource_config.copy()
     create_response = iface.create(params)['InternetGateway']
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     utils.update_resource_id(ctx.instance,
                              create_response.get(INTERNETGATEWAY_ID))
 
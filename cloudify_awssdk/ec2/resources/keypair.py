@@ -159,8 +159,7 @@ def create(ctx, iface, resource_config, **_):
     if 'KeyMaterial' in cleaned_create_response and not \
             ctx.node.properties['store_in_runtime_properties']:
         del cleaned_create_response['KeyMaterial']
-    ctx.instance.runtime_properties['create_response'] = \
-        cleaned_create_response
+    utils.update_create_response(ctx, cleaned_create_response)
 
     iface.update_resource_id(cleaned_create_response.get(KEYNAME))
     utils.update_resource_id(ctx.instance, key_name)
@@ -32,6 +32,7 @@ NATGATEWAY_IDS = 'NatGatewayIds'
 SUBNET_ID = 'SubnetId'
 ALLOCATION_ID = 'AllocationId'
 ALLOCATION_ID_DEPRECATED = 'allocation_id'
+CLIENT_TOKEN = 'ClientToken'
 SUBNET_TYPE = 'cloudify.nodes.aws.ec2.Subnet'
 SUBNET_TYPE_DEPRECATED = 'cloudify.aws.nodes.Subnet'
 ELASTICIP_TYPE = 'cloudify.nodes.aws.ec2.ElasticIP'
@@ -42,6 +43,8 @@ class EC2NatGateway(EC2Base):
     """
         EC2 NAT Gateway interface
     """
+    idempotency_token = CLIENT_TOKEN
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         EC2Base.__init__(self, ctx_node, resource_id, client, logger)
         self.type_name = RESOURCE_TYPE
@@ -99,6 +102,7 @@ def prepare(ctx, resource_config, **_):
     status_pending=['pending'],
     fail_on_missing=False)
 @decorators.tag_resources
+@decorators.idempotent_create
 def create(ctx, iface, resource_config, **_):
     """Creates an AWS EC2 NAT Gateway"""
 
@@ -134,8 +138,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)['NatGateway']
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     utils.update_resource_id(
         ctx.instance, create_response.get(NATGATEWAY_ID))
 
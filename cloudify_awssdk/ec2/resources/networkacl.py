@@ -141,8 +141,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)['NetworkAcl']
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     network_acl_id = create_response.get(NETWORKACL_ID, '')
     iface.update_resource_id(network_acl_id)
     utils.update_resource_id(ctx.instance, network_acl_id)
@@ -126,8 +126,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)[ROUTETABLE]
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     route_table_id = create_response.get(ROUTETABLE_ID)
     iface.update_resource_id(route_table_id)
     utils.update_resource_id(ctx.instance,
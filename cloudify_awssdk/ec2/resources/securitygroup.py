@@ -162,8 +162,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     group_id = create_response.get(GROUPID, '')
     iface.update_resource_id(group_id)
     utils.update_resource_id(
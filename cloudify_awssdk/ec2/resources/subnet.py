@@ -144,8 +144,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)[SUBNET]
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     subnet_id = create_response.get(SUBNET_ID)
     iface.update_resource_id(subnet_id)
     utils.update_resource_id(ctx.instance, subnet_id)
@@ -107,8 +107,7 @@ def create(ctx, iface, resource_config, **_):
 
     # Actually create the resource
     create_response = iface.create(params)[VPC]
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
 
     vpc_id = create_response.get(VPC_ID, '')
     iface.update_resource_id(vpc_id)
@@ -96,8 +96,7 @@ def create(ctx, iface, resource_config, **_):
     params = dict() if not resource_config else resource_config.copy()
     # Actually create the resource
     create_response = iface.create(params)[VPN_CONNECTION]
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     if create_response:
         resource_id = \
             utils.get_resource_id(
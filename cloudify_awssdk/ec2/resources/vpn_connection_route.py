@@ -77,8 +77,7 @@ def create(ctx, iface, resource_config, **_):
     utils.update_resource_id(ctx.instance, resource_id)
     # Actually create the resource
     create_response = iface.create(params)
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
 
 
 @decorators.aws_resource(EC2VPNConnectionRoute, RESOURCE_TYPE)
@@ -120,8 +120,7 @@ def create(ctx, iface, resource_config, **_):
     # Actually create the resource
     # Actually create the resource
     create_response = iface.create(params)['VpnGateway']
-    ctx.instance.runtime_properties['create_response'] = \
-        utils.JsonCleanuper(create_response).to_dict()
+    utils.update_create_response(ctx, create_response)
     utils.update_resource_id(ctx.instance, create_response.get(VPNGATEWAY_ID))
 
 
@@ -0,0 +1,134 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+'''
+    EC2.Tagging
+    ~~~~~~~~~~~
+    Batched tagging of EC2 resources
+'''
+# Standard imports
+import time
+
+# Cloudify
+from cloudify_awssdk.common.batcher import Batch, Batcher, shared_client
+from cloudify_awssdk.common.constants import (
+    EC2_TAG_BATCH_LINGER,
+    EC2_TAG_BATCH_SIZE,
+    EC2_TAG_BATCH_WINDOW)
+
+RESOURCES = 'Resources'
+TAGS = 'Tags'
+
+
+def _tags_key(tags):
+    '''A hashable key of a tag set, None stands for "all tags"'''
+    if tags is None:
+        return None
+    return frozenset((tag.get('Key'), tag.get('Value')) for tag in tags)
+
+
+class _Batch(Batch):
+    '''Resources waiting to get the same tags'''
+    def __init__(self, key, tags):
+        Batch.__init__(self, key)
+        self.tags = tags
+        self.resources = list()
+        self.seen = set()
+
+    def add(self, resources, now):
+        for resource in resources:
+            if resource not in self.seen:
+                self.seen.add(resource)
+                self.resources.append(resource)
+        return Batch.add(self, resources, now)
+
+
+class TagBatcher(Batcher):
+    '''
+        Coalesces the create_tags (or delete_tags) calls of the concurrent
+        operations of a process, see `Batcher`. Requests with the same
+        tags, made with the same client (clients are cached per service,
+        region and credentials) are sent together, in calls of at most
+        `batch_size` resources. A batch is sent when it is full, when no
+        request joined it for `linger` seconds, or `window` seconds after
+        its first request, whichever comes first. Every request blocks
+        until its batch was sent, so no tags are left pending when an
+        operation ends.
+
+    :param str method: Name of the client method, "create_tags"
+        or "delete_tags"
+    :param int batch_size: Maximum number of resources per call
+    :param float window: Maximum number of seconds a batch waits
+        for requests
+    :param float linger: Number of seconds a batch waits for
+        another request
+    :param callable clock: Returns the current time in seconds
+    '''
+    def __init__(self, method, batch_size=EC2_TAG_BATCH_SIZE,
+                 window=EC2_TAG_BATCH_WINDOW, linger=EC2_TAG_BATCH_LINGER,
+                 clock=time.time):
+        Batcher.__init__(self, window, linger, clock)
+        self.method = method
+        self.batch_size = batch_size
+
+    def submit(self, client, resources, tags):
+        '''
+            Tags resources, together with the concurrent requests
+            with the same tags
+
+        :param client: A Boto3 EC2 client
+        :param list resources: IDs of the resources
+        :param list tags: Tags, as a list of Key/Value dicts. None
+            deletes all the tags of the resources.
+        :returns: The response of the last call of the batch
+        '''
+        return self._submit((shared_client(client), _tags_key(tags)),
+                            resources, tags=tags)
+
+    def _new_batch(self, key, tags=None):
+        return _Batch(key, tags)
+
+    def _is_full(self, batch):
+        return len(batch.resources) >= self.batch_size
+
+    def _call(self, client, resources, tags):
+        '''Sends the resources in calls of at most `batch_size`'''
+        res = None
+        for i in range(0, len(resources), self.batch_size):
+            params = {RESOURCES: resources[i:i + self.batch_size]}
+            if tags is not None:
+                params[TAGS] = tags
+            self.calls += 1
+            res = getattr(client, self.method)(**params)
+        return res
+
+    def _flush(self, batch):
+        client = batch.key[0]
+        try:
+            res = self._call(client, batch.resources, batch.tags)
+        except Exception as error:
+            if len(batch.requests) == 1:
+                batch.errors[0] = error
+                return
+            # A single invalid resource fails the whole call, find
+            # out which requests it belongs to
+            self._send_apart(batch, lambda resources: self._call(
+                client, resources, batch.tags))
+            return
+        for index in range(len(batch.requests)):
+            batch.results[index] = res
+
+
+TAGGER = TagBatcher('create_tags')
+UNTAGGER = TagBatcher('delete_tags')
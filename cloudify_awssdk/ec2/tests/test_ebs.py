@@ -48,6 +48,7 @@ class TestEC2Volume(TestBase):
         reload(ebs)
 
     def test_class_properties(self):
+        self.ebs_volume.resource_id = 'test_volume_id'
         effect = self.get_client_error_exception(name='EC2 EBS Volume')
         self.ebs_volume.client = \
             self.make_client_function('describe_volumes', side_effect=effect)
@@ -72,6 +73,7 @@ class TestEC2Volume(TestBase):
         self.assertEqual(res[VOLUME_ID], 'test_volume_id')
 
     def test_class_status(self):
+        self.ebs_volume.resource_id = 'test_volume_id'
         value = {}
         self.ebs_volume.client = \
             self.make_client_function('describe_volumes',
@@ -216,6 +218,7 @@ class TestEC2VolumeAttachment(TestBase):
         reload(ebs)
 
     def test_class_properties(self):
+        self.ebs_volume_attachment.resource_id = 'test_volume_id'
         effect = self.get_client_error_exception(name='EC2 EBS Volume '
                                                       'Attachment')
         self.ebs_volume_attachment.client = \
@@ -261,6 +264,7 @@ class TestEC2VolumeAttachment(TestBase):
         self.assertEquals(len(res['Attachments']), 1)
 
     def test_class_status(self):
+        self.ebs_volume_attachment.resource_id = 'test_volume_id'
         value = {}
         self.ebs_volume_attachment.client = \
             self.make_client_function('describe_volumes',
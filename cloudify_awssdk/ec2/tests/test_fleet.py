@@ -0,0 +1,150 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import time
+import unittest
+from functools import partial
+from mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from cloudify.context import CloudifyContext
+from cloudify.state import current_ctx
+
+from cloudify_awssdk.common.tests.test_base import run_concurrently
+from cloudify_awssdk.ec2.fleet import InstanceFleet
+
+PARAMS = {'ImageId': 'ami', 'InstanceType': 't2.micro'}
+
+
+def run_instances(**kwargs):
+    # Launched in reverse order of launch index
+    return {'ReservationId': 'r-1', 'Instances': [
+        {'InstanceId': 'i-%d' % index, 'AmiLaunchIndex': index}
+        for index in reversed(range(kwargs['MaxCount']))]}
+
+
+class TestInstanceFleet(unittest.TestCase):
+
+    def setUp(self):
+        super(TestInstanceFleet, self).setUp()
+        self.client = MagicMock()
+        self.client.run_instances = MagicMock(side_effect=run_instances)
+        self.fleet = InstanceFleet(linger=5)
+
+    def _launch_concurrently(self, requests, window=5, max_size=3):
+        results = run_concurrently([
+            partial(self.fleet.launch, self.client, group, request_id,
+                    PARAMS, max_size=max_size, window=window,
+                    client_token=request_id)
+            for request_id, group in requests])
+        return dict((request_id, results[index])
+                    for index, (request_id, _) in enumerate(requests))
+
+    def test_launch(self):
+        res = self.fleet.launch(self.client, 'node', 'vm_1', PARAMS,
+                                window=0)
+        self.assertEqual(res, {'ReservationId': 'r-1', 'Instances': [
+            {'InstanceId': 'i-0', 'AmiLaunchIndex': 0}]})
+        self.client.run_instances.assert_called_once_with(
+            MinCount=1, MaxCount=1, **PARAMS)
+
+    def test_launch_client_token(self):
+        self.fleet.launch(self.client, 'node', 'vm_1', PARAMS, window=0,
+                          client_token='token')
+        # Retries of a launch on its own launch the same instance
+        self.client.run_instances.assert_called_once_with(
+            MinCount=1, MaxCount=1, ClientToken='token', **PARAMS)
+
+    def test_launch_single_operation(self):
+        self.fleet = InstanceFleet(linger=10)
+        # A manager runs every operation in its own process
+        current_ctx.set(CloudifyContext({'task_target': 'agent'}))
+        try:
+            started = time.time()
+            self.fleet.launch(self.client, 'node', 'vm_1', PARAMS,
+                              window=10, client_token='token')
+        finally:
+            current_ctx.clear()
+        self.assertLess(time.time() - started, 5)
+        self.client.run_instances.assert_called_once_with(
+            MinCount=1, MaxCount=1, ClientToken='token', **PARAMS)
+
+    def test_launch_coalesces(self):
+        results = self._launch_concurrently(
+            [('vm_c', 'node'), ('vm_a', 'node'), ('vm_b', 'node')])
+        self.client.run_instances.assert_called_once_with(
+            MinCount=1, MaxCount=3, **PARAMS)
+        # Node instance IDs in the order of launch indexes
+        self.assertEqual(
+            dict((request_id, res['Instances'][0]['InstanceId'])
+                 for request_id, res in results.items()),
+            {'vm_a': 'i-0', 'vm_b': 'i-1', 'vm_c': 'i-2'})
+        self.assertEqual(results['vm_a']['ReservationId'], 'r-1')
+
+    def test_launch_groups(self):
+        self.fleet = InstanceFleet(linger=0.5)
+        self._launch_concurrently(
+            [('vm_1', 'node_1'), ('vm_2', 'node_2')], window=0.5)
+        self.assertEqual(self.client.run_instances.call_count, 2)
+
+    def test_launch_partial(self):
+        self.client.run_instances = MagicMock(
+            side_effect=lambda **kwargs: run_instances(MaxCount=2))
+        results = self._launch_concurrently(
+            [('vm_1', 'node'), ('vm_2', 'node'), ('vm_3', 'node')])
+        self.assertEqual(results['vm_1']['Instances'][0]['InstanceId'],
+                         'i-0')
+        self.assertEqual(results['vm_2']['Instances'][0]['InstanceId'],
+                         'i-1')
+        # No instance for the last one, it launches its own
+        self.assertIsNone(results['vm_3'])
+        self.client.terminate_instances.assert_not_called()
+
+    def test_launch_extra_instances(self):
+        self.client.run_instances = MagicMock(
+            side_effect=lambda **kwargs: run_instances(MaxCount=2))
+        res = self.fleet.launch(self.client, 'node', 'vm_1', PARAMS,
+                                window=0)
+        self.assertEqual(res['Instances'][0]['InstanceId'], 'i-0')
+        self.client.terminate_instances.assert_called_once_with(
+            InstanceIds=['i-1'])
+
+    def test_launch_error(self):
+        self.client.run_instances = MagicMock(
+            side_effect=ClientError({'Error': {}}, 'run_instances'))
+        results = self._launch_concurrently(
+            [('vm_1', 'node'), ('vm_2', 'node'), ('vm_3', 'node')])
+        self.assertEqual(self.client.run_instances.call_count, 1)
+        for res in results.values():
+            self.assertIsInstance(res, ClientError)
+
+    def test_launch_rollback(self):
+        self.client.run_instances = MagicMock(return_value={'Instances': [
+            {'InstanceId': 'i-0', 'AmiLaunchIndex': 0}, {}]})
+        with self.assertRaises(KeyError):
+            self.fleet.launch(self.client, 'node', 'vm_1', PARAMS, window=0)
+        self.assertEqual(self.fleet.calls, 1)
+
+        self.client.run_instances = MagicMock(
+            side_effect=lambda **kwargs: run_instances(MaxCount=2))
+        self.fleet._assign = MagicMock(side_effect=KeyError())
+        with self.assertRaises(KeyError):
+            self.fleet.launch(self.client, 'node', 'vm_1', PARAMS, window=0)
+        # Nothing was given to the node instance, all are terminated
+        self.client.terminate_instances.assert_called_once_with(
+            InstanceIds=['i-0', 'i-1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,9 +19,10 @@ from cloudify_awssdk.ec2.resources.instances import (
     GROUP_TYPE, NETWORK_INTERFACE_TYPE, SUBNET_TYPE,
     INSTANCE_IDS)
 from mock import patch, MagicMock
+from cloudify_awssdk.common import utils
 from cloudify_awssdk.ec2.resources import instances
 from cloudify.state import current_ctx
-from cloudify.exceptions import OperationRetry
+from cloudify.exceptions import OperationRetry, NonRecoverableError
 
 
 class TestEC2Instances(TestBase):
@@ -38,6 +39,7 @@ class TestEC2Instances(TestBase):
         reload(instances)
 
     def test_class_properties(self):
+        self.instances.resource_id = 'test_name'
         effect = self.get_client_error_exception(name='EC2 Instances')
         self.instances.client = \
             self.make_client_function('describe_instances',
@@ -60,6 +62,7 @@ class TestEC2Instances(TestBase):
         self.assertEqual(res[INSTANCE_ID], 'test_name')
 
     def test_class_status(self):
+        self.instances.resource_id = 'test_name'
         value = {}
         self.instances.client = \
             self.make_client_function('describe_instances',
@@ -75,6 +78,24 @@ class TestEC2Instances(TestBase):
         res = self.instances.status
         self.assertEqual(res, 16)
 
+    def test_class_status_batched(self):
+        client = MagicMock()
+        client.describe_instances = MagicMock(return_value={
+            RESERVATIONS: [{INSTANCES: [
+                {INSTANCE_ID: 'i-1', 'State': {'Code': 16}},
+                {INSTANCE_ID: 'i-2', 'State': {'Code': 0}}]}]})
+        first = EC2Instances('ctx_node', resource_id='i-1', client=client)
+        second = EC2Instances('ctx_node', resource_id='i-2', client=client)
+
+        self.assertEqual(first.status, 16)
+        instances.INSTANCES_POLLER.invalidate(client, ['i-1'])
+        # One call refreshes both instances
+        self.assertEqual(second.status, 0)
+        self.assertEqual(first.status, 16)
+        client.describe_instances.assert_called_with(
+            Filters=[{'Name': 'instance-id', 'Values': ['i-2', 'i-1']}])
+        self.assertEqual(client.describe_instances.call_count, 2)
+
     def test_class_create(self):
         value = {RESERVATIONS: [{INSTANCES: [{INSTANCE_IDS: ['test_name']}]}]}
         self.instances.client = \
@@ -135,6 +156,120 @@ class TestEC2Instances(TestBase):
         self.assertEqual(self.instances.resource_id,
                          'test_name')
 
+    def test_create_tag_specifications(self):
+        tags = [{'Key': 'test key', 'Value': 'test value'}]
+        ctx = self.get_mock_ctx(
+            "EC2Instances",
+            test_properties={'os_family': 'linux', 'Tags': tags},
+            type_hierarchy=['cloudify.nodes.Root', 'cloudify.nodes.Compute'])
+        current_ctx.set(ctx=ctx)
+        params = {'ImageId': 'test image', 'InstanceType': 'test type'}
+        iface = MagicMock()
+        iface.tag_specifications_type = 'instance'
+        value = {INSTANCES: [{INSTANCE_ID: 'test_name'}]}
+        iface.create = self.mock_return(value)
+        instances.create(ctx=ctx, iface=iface, resource_config=params)
+        self.assertEqual(
+            iface.create.call_args[0][0]['TagSpecifications'],
+            [{'ResourceType': 'instance', 'Tags': tags}])
+        # Tagged by the create call, not after it
+        iface.tag.assert_not_called()
+        self.assertNotIn('TagSpecifications', params)
+
+    def test_create_client_token(self):
+        ctx = self.get_mock_ctx(
+            "EC2Instances",
+            test_properties={'os_family': 'linux',
+                             'fleet': {'enabled': True}},
+            type_hierarchy=['cloudify.nodes.Root', 'cloudify.nodes.Compute'])
+        current_ctx.set(ctx=ctx)
+        params = {'ImageId': 'test image', 'InstanceType': 'test type',
+                  'MinCount': 1, 'MaxCount': 2}
+        iface = MagicMock()
+        iface.idempotency_token = 'ClientToken'
+        iface.find_by_token = MagicMock(return_value=None)
+        value = {INSTANCES: [{INSTANCE_ID: 'test_name'}]}
+        iface.create = self.mock_return(value)
+        iface.create_in_fleet = self.mock_return(value)
+        instances.create(ctx=ctx, iface=iface, resource_config=params)
+        # Retries of the operation launch the same instances
+        self.assertEqual(iface.create.call_args[0][0]['ClientToken'],
+                         utils.get_idempotency_token(ctx))
+        self.assertNotIn('ClientToken', params)
+
+        # Instances of a fleet do not share a token, it is only sent
+        # when an instance is launched on its own
+        params['MaxCount'] = 1
+        instances.create(ctx=ctx, iface=iface, resource_config=params)
+        self.assertNotIn('ClientToken',
+                         iface.create_in_fleet.call_args[0][0])
+        # Of the next generation, after the first create
+        self.assertEqual(iface.create_in_fleet.call_args[1]['client_token'],
+                         utils.get_idempotency_token(ctx, 1))
+
+    def test_create_fleet(self):
+        ctx = self.get_mock_ctx(
+            "EC2Instances",
+            test_properties={'os_family': 'linux',
+                             'fleet': {'enabled': True, 'window': 5}},
+            type_hierarchy=['cloudify.nodes.Root', 'cloudify.nodes.Compute'])
+        current_ctx.set(ctx=ctx)
+        params = {'ImageId': 'test image', 'InstanceType': 'test type',
+                  'MinCount': 1, 'MaxCount': 1}
+        iface = MagicMock()
+        value = {INSTANCES: [{INSTANCE_ID: 'test_name'}]}
+        iface.create_in_fleet = self.mock_return(value)
+        instances.create(ctx=ctx, iface=iface, resource_config=params)
+        args, kwargs = iface.create_in_fleet.call_args
+        self.assertNotIn('MinCount', args[0])
+        self.assertEqual(args[1], (ctx.deployment.id, ctx.node.id))
+        self.assertEqual(args[2], ctx.instance.id)
+        self.assertEqual(kwargs, {'max_size': 100, 'window': 5,
+                                  'client_token': None})
+        self.assertFalse(iface.create.called)
+        self.assertEqual(
+            ctx.instance.runtime_properties['aws_resource_id'], 'test_name')
+
+        # More than one instance per node instance
+        params['MaxCount'] = 2
+        iface = MagicMock()
+        iface.create = self.mock_return(value)
+        instances.create(ctx=ctx, iface=iface, resource_config=params)
+        self.assertFalse(iface.create_in_fleet.called)
+
+    def test_class_create_in_fleet(self):
+        self.instances.client = MagicMock()
+        value = {INSTANCES: [{INSTANCE_ID: 'test_name'}]}
+        self.instances.client.run_instances = MagicMock(return_value=value)
+        params = {'ImageId': 'test image'}
+        with patch('cloudify_awssdk.ec2.resources.instances.FLEET') as fleet:
+            fleet.launch = MagicMock(return_value=value)
+            self.assertEqual(
+                self.instances.create_in_fleet(params, 'node', 'vm_1'),
+                value)
+            fleet.launch.assert_called_with(
+                self.instances.client, 'node', 'vm_1', params,
+                max_size=100, window=10, client_token=None)
+            self.assertFalse(self.instances.client.run_instances.called)
+
+            # Not launched with the others
+            fleet.launch = MagicMock(return_value=None)
+            self.assertEqual(
+                self.instances.create_in_fleet(params, 'node', 'vm_1'),
+                value)
+            self.instances.client.run_instances.assert_called_with(
+                ImageId='test image', MinCount=1, MaxCount=1)
+            self.instances.create_in_fleet(params, 'node', 'vm_1',
+                                           client_token='token')
+            self.instances.client.run_instances.assert_called_with(
+                ImageId='test image', MinCount=1, MaxCount=1,
+                ClientToken='token')
+
+            fleet.launch = MagicMock(
+                side_effect=self.get_client_error_exception())
+            with self.assertRaises(NonRecoverableError):
+                self.instances.create_in_fleet(params, 'node', 'vm_1')
+
     def test_create_with_relationships(self):
         ctx = self.get_mock_ctx(
             "EC2Instances",
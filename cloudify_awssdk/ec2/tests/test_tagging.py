@@ -0,0 +1,140 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+from functools import partial
+from mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from cloudify_awssdk.common import MemoizedClient
+from cloudify_awssdk.common.tests.test_base import run_concurrently
+from cloudify_awssdk.ec2 import EC2Base
+from cloudify_awssdk.ec2.tagging import TagBatcher
+
+TAGS = [{'Key': 'a', 'Value': '1'}]
+
+
+class TestTagBatcher(unittest.TestCase):
+
+    def setUp(self):
+        super(TestTagBatcher, self).setUp()
+        self.client = MagicMock()
+        self.client.create_tags = MagicMock(return_value={'ok': True})
+        self.batcher = TagBatcher('create_tags', batch_size=2, window=0)
+
+    def test_submit(self):
+        self.assertEqual(
+            self.batcher.submit(self.client, ['i-1'], TAGS), {'ok': True})
+        self.client.create_tags.assert_called_once_with(
+            Resources=['i-1'], Tags=TAGS)
+
+    def test_submit_batch_size(self):
+        self.batcher.submit(self.client, ['i-1', 'i-2', 'i-3', 'i-1'], TAGS)
+        self.assertEqual(self.client.create_tags.call_count, 2)
+        self.client.create_tags.assert_any_call(
+            Resources=['i-1', 'i-2'], Tags=TAGS)
+        self.client.create_tags.assert_any_call(
+            Resources=['i-3'], Tags=TAGS)
+        self.assertEqual(self.batcher.calls, 2)
+
+    def test_submit_memoized_client(self):
+        self.batcher.submit(MemoizedClient(self.client, 10), ['i-1'], TAGS)
+        self.client.create_tags.assert_called_once_with(
+            Resources=['i-1'], Tags=TAGS)
+
+    def test_submit_all_tags(self):
+        client = MagicMock()
+        batcher = TagBatcher('delete_tags', window=0)
+        batcher.submit(client, ['i-1'], None)
+        client.delete_tags.assert_called_once_with(Resources=['i-1'])
+
+    def test_submit_error(self):
+        self.client.create_tags = MagicMock(
+            side_effect=ClientError({'Error': {}}, 'create_tags'))
+        with self.assertRaises(ClientError):
+            self.batcher.submit(self.client, ['i-1'], TAGS)
+
+    def _submit_concurrently(self, batcher, requests):
+        return run_concurrently([
+            partial(batcher.submit, self.client, resources, tags)
+            for resources, tags in requests])
+
+    def test_submit_coalesces(self):
+        batcher = TagBatcher('create_tags', batch_size=3, window=1,
+                             linger=1)
+        other_tags = [{'Key': 'b', 'Value': '2'}]
+        results = self._submit_concurrently(batcher, [
+            (['i-1'], TAGS), (['i-2'], TAGS), (['i-3'], other_tags),
+            (['i-4'], TAGS)])
+        self.assertEqual(results, dict((i, {'ok': True}) for i in range(4)))
+        # A full batch is sent without waiting for the window to end
+        self.assertEqual(self.client.create_tags.call_count, 2)
+        args = [call[1] for call in self.client.create_tags.call_args_list]
+        self.assertIn({'Resources': ['i-3'], 'Tags': other_tags}, args)
+        batched = [arg for arg in args if arg['Tags'] == TAGS][0]
+        self.assertEqual(sorted(batched['Resources']), ['i-1', 'i-2', 'i-4'])
+
+    def test_submit_linger(self):
+        now = [0]
+        batcher = TagBatcher('create_tags', window=10, linger=1,
+                             clock=lambda: now[0])
+        batcher._full = MagicMock()
+
+        def wait(timeout):
+            self.assertEqual(timeout, 1)
+            now[0] += timeout
+        batcher._full.wait = MagicMock(side_effect=wait)
+        batcher.submit(self.client, ['i-1'], TAGS)
+        # No other request joined, sent after the linger time
+        self.assertEqual(batcher._full.wait.call_count, 1)
+        self.client.create_tags.assert_called_once_with(
+            Resources=['i-1'], Tags=TAGS)
+
+    def test_submit_coalesced_error(self):
+        def create_tags(Resources, Tags):
+            if 'bad' in Resources:
+                raise ClientError({'Error': {}}, 'create_tags')
+            return {'ok': True}
+        self.client.create_tags = MagicMock(side_effect=create_tags)
+        batcher = TagBatcher('create_tags', batch_size=2, window=5,
+                             linger=5)
+        results = self._submit_concurrently(batcher, [
+            (['i-1'], TAGS), (['bad'], TAGS)])
+        # Only the request with the invalid resource fails
+        self.assertEqual(results[0], {'ok': True})
+        self.assertIsInstance(results[1], ClientError)
+
+
+class TestEC2BaseTagging(unittest.TestCase):
+
+    def setUp(self):
+        super(TestEC2BaseTagging, self).setUp()
+        self.client = MagicMock()
+        self.base = EC2Base('ctx_node', resource_id='i-1',
+                            client=self.client, logger=None)
+
+    def test_tag(self):
+        self.base.tag({'Resources': ['i-1'], 'Tags': TAGS})
+        self.client.create_tags.assert_called_once_with(
+            Resources=['i-1'], Tags=TAGS)
+        self.assertIsNone(self.base.current_tags)
+
+    def test_untag_dry_run(self):
+        self.base.untag({'Resources': ['i-1'], 'Tags': TAGS, 'DryRun': True})
+        self.client.delete_tags.assert_called_once_with(
+            Resources=['i-1'], Tags=TAGS, DryRun=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,12 +27,16 @@ RESOURCE_TYPE = 'EFS File System'
 FILESYSTEM_ID = 'FileSystemId'
 FILESYSTEMS = 'FileSystems'
 CREATION_TOKEN = 'CreationToken'
+LIFECYCLE_STATE = 'LifeCycleState'
+DELETED_STATES = ['deleting', 'deleted']
 
 
 class EFSFileSystem(EFSBase):
     """
         AWS EFS File System interface
     """
+    idempotency_token = CREATION_TOKEN
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         EFSBase.__init__(self, ctx_node, resource_id, client, logger)
         self.type_name = RESOURCE_TYPE
@@ -61,6 +65,21 @@ class EFSFileSystem(EFSBase):
         """
         return self.make_client_call('create_file_system', params)
 
+    def find_by_token(self, token):
+        """
+            Gets the ID of the AWS EFS File System created with a
+            creation token, create_file_system fails once it is used.
+        """
+        try:
+            resources = \
+                self.client.describe_file_systems(**{CREATION_TOKEN: token})
+        except ClientError:
+            return None
+        for resource in resources.get(FILESYSTEMS, []):
+            if resource.get(LIFECYCLE_STATE) not in DELETED_STATES:
+                return resource.get(FILESYSTEM_ID)
+        return None
+
     def delete(self, params=None):
         """
             Deletes an existing AWS EFS File System.
@@ -78,6 +97,7 @@ def prepare(ctx, resource_config, **_):
 
 
 @decorators.aws_resource(EFSFileSystem, RESOURCE_TYPE)
+@decorators.idempotent_create
 def create(ctx, iface, resource_config, **_):
     """Creates an AWS EFS File System"""
 
@@ -86,15 +106,8 @@ def create(ctx, iface, resource_config, **_):
         dict() if not resource_config else resource_config.copy()
 
     # The creation token is used by AWS to ensure idempotent fs creation.
-    creation_token = \
-        params.get(
-            CREATION_TOKEN,
-            ctx.instance.runtime_properties.get(CREATION_TOKEN))
-    if not creation_token:
-        creation_token = utils.get_uuid()
-        ctx.instance.runtime_properties[CREATION_TOKEN] = \
-            creation_token
-        params[CREATION_TOKEN] = creation_token
+    ctx.instance.runtime_properties[CREATION_TOKEN] = \
+        params[CREATION_TOKEN]
 
     output = iface.create(params)
     utils.update_resource_id(ctx.instance, output.get(FILESYSTEM_ID))
@@ -33,6 +33,7 @@ NODE_PROPERTIES = {
 
 RUNTIME_PROPERTIES_AFTER_CREATE = {
     'CreationToken': 'xxx-ccc',
+    '__idempotency_generation': 1,
     'aws_resource_id': 'fs_id',
     'resource_config': {}
 }
@@ -90,15 +91,21 @@ class TestEFSFileSystem(TestBase):
                 'FileSystemId': 'fs_id'
             }
         )
+        self.fake_client.describe_file_systems = MagicMock(
+            return_value={'FileSystems': []}
+        )
 
         with patch(
-            'cloudify_awssdk.common.utils.get_uuid',
+            'cloudify_awssdk.common.utils.get_idempotency_token',
             MagicMock(return_value="xxx-ccc")
         ):
             file_system.create(ctx=_ctx, resource_config=None, iface=None)
 
         self.fake_boto.assert_called_with('efs', **CLIENT_CONFIG)
 
+        self.fake_client.describe_file_systems.assert_called_with(
+            CreationToken='xxx-ccc'
+        )
         self.fake_client.create_file_system.assert_called_with(
             CreationToken='xxx-ccc'
         )
@@ -108,6 +115,25 @@ class TestEFSFileSystem(TestBase):
             RUNTIME_PROPERTIES_AFTER_CREATE
         )
 
+    def test_create_adopts_created(self):
+        _ctx = self._prepare_context()
+
+        self.fake_client.create_file_system = MagicMock()
+        self.fake_client.describe_file_systems = MagicMock(
+            return_value={'FileSystems': [
+                {'FileSystemId': 'fs_old', 'LifeCycleState': 'deleted'},
+                {'FileSystemId': 'fs_id', 'LifeCycleState': 'creating'}]}
+        )
+
+        file_system.create(ctx=_ctx, resource_config=None, iface=None)
+
+        # An earlier attempt created it, but failed to record it
+        self.fake_client.create_file_system.assert_not_called()
+        self.assertEqual(
+            _ctx.instance.runtime_properties['aws_resource_id'], 'fs_id')
+        self.assertEqual(
+            _ctx.instance.runtime_properties['__idempotency_generation'], 1)
+
     def test_delete(self):
         _ctx = self._prepare_context(RUNTIME_PROPERTIES_AFTER_CREATE)
 
@@ -0,0 +1,268 @@
+# #######
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+"""
+    ELB.Registration
+    ~~~~~~~~~~~~~~~~
+    Batched registration of load balancer members
+"""
+# Standard imports
+import time
+
+# Boto
+from botocore.exceptions import ClientError
+
+# Cloudify
+from cloudify_awssdk.common.batcher import Batch, Batcher, shared_client
+from cloudify_awssdk.common.constants import (
+    ELB_REGISTRATION_BATCH_SIZE,
+    ELB_REGISTRATION_LINGER,
+    ELB_REGISTRATION_WINDOW,
+    ELB_TARGET_HEALTH_BUDGET,
+    ELB_TARGET_HEALTH_DELAY)
+
+INSTANCES = 'Instances'
+INSTANCE_ID = 'InstanceId'
+INSTANCE_STATES = 'InstanceStates'
+TARGETS = 'Targets'
+TARGET_HEALTH = 'TargetHealth'
+TARGET_HEALTH_DESCRIPTIONS = 'TargetHealthDescriptions'
+# Target states a registration waits for: healthy, or serving no traffic
+# because health checks are disabled or no load balancer uses the group
+REGISTERED_STATES = ['healthy', 'unavailable']
+REGISTERED_REASONS = ['Target.NotInUse']
+# Deregistered targets are unused, once they are drained
+DEREGISTERED_REASONS = ['Target.NotRegistered']
+
+
+class _Batch(Batch):
+    """Members waiting to be registered with the same load balancer"""
+    def __init__(self, key):
+        Batch.__init__(self, key)
+        self.members = list()
+        self.seen = set()
+
+    def add(self, members, now):
+        for member in members:
+            if member not in self.seen:
+                self.seen.add(member)
+                self.members.append(member)
+        return Batch.add(self, members, now)
+
+
+class RegistrationBatcher(Batcher):
+    """
+        Coalesces the registrations (or deregistrations) of concurrent
+        relationship operations of one process, see `Batcher`. Members
+        of the same load balancer, made with the same client, are sent
+        together in calls of at most `batch_size` members, and the result
+        of every call is checked once for all its members. A batch is
+        sent when it is full, when no request joined it for `linger`
+        seconds, or `window` seconds after its first request, whichever
+        comes first.
+
+        Subclasses implement `_change`, which sends a call, and `_confirm`,
+        which returns the members whose change is effective.
+
+    :param int batch_size: Maximum number of members per call
+    :param float window: Maximum number of seconds a batch waits
+        for requests
+    :param float linger: Number of seconds a batch waits for
+        another request
+    :param callable clock: Returns the current time in seconds
+    """
+    def __init__(self, batch_size=ELB_REGISTRATION_BATCH_SIZE,
+                 window=ELB_REGISTRATION_WINDOW,
+                 linger=ELB_REGISTRATION_LINGER, clock=time.time):
+        Batcher.__init__(self, window, linger, clock)
+        self.batch_size = batch_size
+
+    def submit(self, client, parent, members):
+        """
+            Registers (or deregisters) members, together with the
+            concurrent requests for the same load balancer
+
+        :param client: A Boto3 ELB client
+        :param str parent: Name or ARN of the load balancer
+        :param list members: Hashable IDs of the members
+        :returns: Set of the members of the request whose change is
+            effective, the others are still pending
+        """
+        return self._submit((shared_client(client), parent), members)
+
+    def _new_batch(self, key):
+        return _Batch(key)
+
+    def _is_full(self, batch):
+        return len(batch.members) >= self.batch_size
+
+    def _change(self, client, parent, members):
+        """Sends a call for the members, returns its response"""
+        raise NotImplementedError()
+
+    def _confirm(self, client, parent, members, response):
+        """Returns the members of a call whose change is effective"""
+        raise NotImplementedError()
+
+    def _call(self, client, parent, members):
+        """Sends the members in calls of at most `batch_size`"""
+        confirmed = set()
+        for i in range(0, len(members), self.batch_size):
+            chunk = members[i:i + self.batch_size]
+            self.calls += 1
+            response = self._change(client, parent, chunk)
+            confirmed.update(self._confirm(client, parent, chunk, response))
+        return confirmed
+
+    def _flush(self, batch):
+        client, parent = batch.key
+        try:
+            confirmed = self._call(client, parent, batch.members)
+        except Exception as error:
+            if len(batch.requests) == 1:
+                batch.errors[0] = error
+                return
+            # A single invalid member fails the whole call, find
+            # out which requests it belongs to
+            self._send_apart(batch, lambda members: self._call(
+                client, parent, members).intersection(members))
+            return
+        for index, members in enumerate(batch.requests):
+            batch.results[index] = confirmed.intersection(members)
+
+
+class InstanceRegistrar(RegistrationBatcher):
+    """
+        Registers EC2 instances with ELB classic load balancers, or
+        deregisters them
+
+    :param bool register: Registers when true, deregisters otherwise
+    """
+    def __init__(self, register=True, **kwargs):
+        RegistrationBatcher.__init__(self, **kwargs)
+        self.register = register
+
+    def _change(self, client, parent, members):
+        method = 'register_instances_with_load_balancer' if self.register \
+            else 'deregister_instances_from_load_balancer'
+        return getattr(client, method)(**{
+            'LoadBalancerName': parent,
+            INSTANCES: [{INSTANCE_ID: member} for member in members]})
+
+    def _confirm(self, client, parent, members, response):
+        # Both calls respond with the instances of the load balancer
+        listed = set(instance[INSTANCE_ID]
+                     for instance in response.get(INSTANCES, []))
+        if not self.register:
+            return set(members) - listed
+        try:
+            self.calls += 1
+            states = client.describe_instance_health(**{
+                'LoadBalancerName': parent,
+                INSTANCES: [{INSTANCE_ID: member} for member in members]})
+        except ClientError as error:
+            if error.response['Error'].get('Code') != 'InvalidInstance':
+                raise
+            # Some of the instances are not registered yet
+            return listed.intersection(members)
+        return set(state[INSTANCE_ID]
+                   for state in states.get(INSTANCE_STATES, []))
+
+
+def _target(member):
+    """A target of describe_target_health and friends, from its member"""
+    target = dict(Id=member[0])
+    if member[1] is not None:
+        target['Port'] = member[1]
+    return target
+
+
+class TargetRegistrar(RegistrationBatcher):
+    """
+        Registers targets with ELBv2 target groups, or deregisters them.
+        Members are (ID, port) tuples, the port being None for the port
+        of the target group. After all the calls of a batch, the health
+        of all its targets is polled in a single loop until they are
+        healthy (or drained), for at most `budget` seconds.
+
+    :param bool register: Registers when true, deregisters otherwise
+    :param float delay: Number of seconds between health polls
+    :param float budget: Maximum number of seconds spent polling
+    :param callable sleep: Sleeps for a number of seconds
+    """
+    def __init__(self, register=True, delay=ELB_TARGET_HEALTH_DELAY,
+                 budget=ELB_TARGET_HEALTH_BUDGET, sleep=time.sleep,
+                 **kwargs):
+        RegistrationBatcher.__init__(self, **kwargs)
+        self.register = register
+        self.delay = delay
+        self.budget = budget
+        self.sleep = sleep
+
+    def _change(self, client, parent, members):
+        method = 'register_targets' if self.register \
+            else 'deregister_targets'
+        return getattr(client, method)(**{
+            'TargetGroupArn': parent,
+            TARGETS: [_target(member) for member in members]})
+
+    def _done(self, health):
+        state = health.get('State')
+        if self.register:
+            return state in REGISTERED_STATES or (
+                state == 'unused' and
+                health.get('Reason') in REGISTERED_REASONS)
+        return state == 'unused' and \
+            health.get('Reason') in DEREGISTERED_REASONS
+
+    def _confirm(self, client, parent, members, response):
+        wanted = set(members)
+        confirmed = set()
+        for i in range(0, len(members), self.batch_size):
+            self.calls += 1
+            res = client.describe_target_health(**{
+                'TargetGroupArn': parent,
+                TARGETS: [_target(member)
+                          for member in members[i:i + self.batch_size]]})
+            for description in res.get(TARGET_HEALTH_DESCRIPTIONS, []):
+                target = description.get('Target', dict())
+                member = (target.get('Id'), target.get('Port'))
+                # Targets are described with the port of the target group
+                if member not in wanted:
+                    member = (target.get('Id'), None)
+                if self._done(description.get(TARGET_HEALTH, dict())):
+                    confirmed.add(member)
+        return confirmed
+
+    def _call(self, client, parent, members):
+        """Sends every call, then polls the health of all the targets"""
+        for i in range(0, len(members), self.batch_size):
+            self.calls += 1
+            self._change(client, parent, members[i:i + self.batch_size])
+        deadline = self.clock() + self.budget
+        pending = list(members)
+        confirmed = set()
+        while True:
+            confirmed.update(self._confirm(client, parent, pending, None))
+            pending = [member for member in pending
+                       if member not in confirmed]
+            if not pending or self.clock() + self.delay > deadline:
+                return confirmed
+            self.sleep(self.delay)
+
+
+INSTANCE_REGISTRAR = InstanceRegistrar(register=True)
+INSTANCE_DEREGISTRAR = InstanceRegistrar(register=False)
+TARGET_REGISTRAR = TargetRegistrar(register=True)
+TARGET_DEREGISTRAR = TargetRegistrar(register=False)
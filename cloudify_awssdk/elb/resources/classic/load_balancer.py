@@ -24,6 +24,9 @@ from botocore.exceptions import ClientError
 from cloudify.exceptions import OperationRetry
 from cloudify_awssdk.common import decorators, utils
 from cloudify_awssdk.elb import ELBBase
+from cloudify_awssdk.elb.registration import (
+    INSTANCE_DEREGISTRAR,
+    INSTANCE_REGISTRAR)
 from cloudify_awssdk.common.connection import Boto3Connection
 from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
 
@@ -36,6 +39,8 @@ SECGROUP_TYPE = 'cloudify.nodes.aws.ec2.SecurityGroup'
 SECGROUP_TYPE_DEPRECATED = 'cloudify.aws.nodes.SecurityGroup'
 SUBNETS = 'Subnets'
 SECGROUPS = 'SecurityGroups'
+# Runtime property of the load balancer listing its associated instances
+LB_INSTANCES = 'instances'
 
 
 class ELBClassicLoadBalancer(ELBBase):
@@ -119,6 +124,28 @@ class ELBClassicLoadBalancer(ELBBase):
         return self.make_client_call(
             'deregister_instances_from_load_balancer', params)
 
+    def add_instances(self, instance_ids):
+        """
+            Registers instances with the load balancer, in a batch with
+            the concurrent registrations.
+        :returns: Set of the instances which are registered
+        """
+        self.logger.debug('Registering instances %s with %s %s'
+                          % (instance_ids, self.type_name, self.resource_id))
+        return INSTANCE_REGISTRAR.submit(
+            self.client, self.resource_id, instance_ids)
+
+    def remove_instances(self, instance_ids):
+        """
+            Deregisters instances from the load balancer, in a batch with
+            the concurrent deregistrations.
+        :returns: Set of the instances which are deregistered
+        """
+        self.logger.debug('Deregistering instances %s from %s %s'
+                          % (instance_ids, self.type_name, self.resource_id))
+        return INSTANCE_DEREGISTRAR.submit(
+            self.client, self.resource_id, instance_ids)
+
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
 def prepare(ctx, resource_config, **_):
@@ -221,18 +248,11 @@ def assoc(ctx, **_):
     lb = ctx.target.instance.runtime_properties.get(EXTERNAL_RESOURCE_ID)
     iface = \
         ELBClassicLoadBalancer(ctx.target.node, lb, logger=ctx.logger)
-    if ctx.operation.retry_number == 0:
-        iface.register_instances(
-            {RESOURCE_NAME: lb, 'Instances': [{'InstanceId': instance_id}]})
-    if 'instances' not in ctx.target.instance.runtime_properties.keys():
-        ctx.target.instance.runtime_properties['instances'] = []
-    instances_list = ctx.target.instance.runtime_properties['instances']
-    if instance_id not in instances_list:
-        instances_list.append(instance_id)
-    ctx.target.instance.runtime_properties['instances'] = instances_list
-    actual_instance_ids = \
-        [i['InstanceId'] for i in iface.properties['Instances']]
-    if instance_id not in actual_instance_ids:
+    # Registering is idempotent, retries check the registration again
+    registered = iface.add_instances([instance_id])
+    utils.update_runtime_list(
+        ctx.target.instance, LB_INSTANCES, add=[instance_id])
+    if instance_id not in registered:
         raise OperationRetry(
             'Waiting for Instance {0} to be added to ELB {1}.'.format(
                 instance_id, lb))
@@ -248,12 +268,10 @@ def disassoc(ctx, **_):
         EXTERNAL_RESOURCE_ID)
     iface = \
         ELBClassicLoadBalancer(ctx.target.node, lb, logger=ctx.logger)
-    iface.deregister_instances(
-        {RESOURCE_NAME: lb, 'Instances': [{'InstanceId': instance_id}]})
-    instances_list = ctx.target.instance.runtime_properties['instances']
-    instances_list.remove(instance_id)
-    ctx.target.instance.runtime_properties['instances'] = instances_list
-    if instance_id in [i['InstanceId'] for i in iface.properties['Instances']]:
+    deregistered = iface.remove_instances([instance_id])
+    utils.update_runtime_list(
+        ctx.target.instance, LB_INSTANCES, remove=[instance_id])
+    if instance_id not in deregistered:
         raise OperationRetry(
             'Waiting for Instance {0} to be removed from ELB {1}.'.format(
                 instance_id, lb))
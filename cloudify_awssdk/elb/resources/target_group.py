@@ -18,8 +18,12 @@
     AWS ELB target group
 '''
 # Cloudify
+from cloudify.exceptions import OperationRetry
 from cloudify_awssdk.common import decorators, utils
 from cloudify_awssdk.elb import ELBBase
+from cloudify_awssdk.elb.registration import (
+    TARGET_DEREGISTRAR,
+    TARGET_REGISTRAR)
 from cloudify_awssdk.common.connection import Boto3Connection
 from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
 # Boto
@@ -31,6 +35,8 @@ VPC_ID = 'VpcId'
 VPC_TYPE = 'cloudify.nodes.aws.ec2.Vpc'
 VPC_TYPE_DEPRECATED = 'cloudify.aws.nodes.VPC'
 GRP_ATTR = 'Attributes'
+# Runtime property of the target group listing its registered targets
+TG_TARGETS = 'targets'
 
 
 class ELBTargetGroup(ELBBase):
@@ -98,6 +104,55 @@ class ELBTargetGroup(ELBBase):
         self.logger.debug('Response: %s' % res)
         return res[GRP_ATTR]
 
+    def register_targets(self, targets):
+        '''
+            Registers targets with the target group, in a batch with the
+            concurrent registrations, and waits until they are healthy.
+        :param list targets: Targets, as Id/Port dicts
+        :returns: List of the targets which are healthy
+        '''
+        self.logger.debug('Registering targets %s with %s %s'
+                          % (targets, self.type_name, self.resource_id))
+        return _targets(TARGET_REGISTRAR.submit(
+            self.client, self.resource_id, _members(targets)))
+
+    def deregister_targets(self, targets):
+        '''
+            Deregisters targets from the target group, in a batch with
+            the concurrent deregistrations, and waits until they are
+            drained.
+        :param list targets: Targets, as Id/Port dicts
+        :returns: List of the targets which are drained
+        '''
+        self.logger.debug('Deregistering targets %s from %s %s'
+                          % (targets, self.type_name, self.resource_id))
+        return _targets(TARGET_DEREGISTRAR.submit(
+            self.client, self.resource_id, _members(targets)))
+
+
+def _members(targets):
+    '''Hashable members of the registration batchers, from targets'''
+    return [(target['Id'], target.get('Port')) for target in targets]
+
+
+def _targets(members):
+    '''Targets, from members of the registration batchers'''
+    return [dict(Id=member[0], Port=member[1]) if member[1] is not None
+            else dict(Id=member[0]) for member in sorted(members)]
+
+
+def _relationship_target(ctx, port):
+    '''The target of a relationship operation, and the target group'''
+    target = dict(Id=ctx.source.instance.runtime_properties.get(
+        EXTERNAL_RESOURCE_ID))
+    if port:
+        target['Port'] = int(port)
+    iface = ELBTargetGroup(
+        ctx.target.node,
+        ctx.target.instance.runtime_properties.get(EXTERNAL_RESOURCE_ID),
+        logger=ctx.logger)
+    return target, iface
+
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
 def prepare(ctx, resource_config, **_):
@@ -167,3 +222,30 @@ def modify(ctx, iface, resource_config, **_):
         attributes = iface.modify_attribute(modify_params)
         ctx.instance.runtime_properties['resource_config'][TARGETGROUP_ARN] = \
             attributes
+
+
+@decorators.aws_relationship(None, RESOURCE_TYPE)
+def register_target(ctx, port=None, **_):
+    '''Registers a source instance with an ELB target group'''
+    target, iface = _relationship_target(ctx, port)
+    # Registering is idempotent, retries check the health again
+    healthy = iface.register_targets([target])
+    utils.update_runtime_list(
+        ctx.target.instance, TG_TARGETS, add=[target])
+    if target not in healthy:
+        raise OperationRetry(
+            'Waiting for target {0} of {1} to be healthy.'.format(
+                target['Id'], iface.resource_id))
+
+
+@decorators.aws_relationship(None, RESOURCE_TYPE)
+def deregister_target(ctx, port=None, **_):
+    '''Deregisters a source instance from an ELB target group'''
+    target, iface = _relationship_target(ctx, port)
+    drained = iface.deregister_targets([target])
+    utils.update_runtime_list(
+        ctx.target.instance, TG_TARGETS, remove=[target])
+    if target not in drained:
+        raise OperationRetry(
+            'Waiting for target {0} of {1} to be drained.'.format(
+                target['Id'], iface.resource_id))
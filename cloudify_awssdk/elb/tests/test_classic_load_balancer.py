@@ -162,63 +162,85 @@ class TestELBClassicLoadBalancer(TestBase):
         load_balancer.delete(iface, config)
         self.assertTrue(iface.delete.called)
 
-    def test_assoc(self):
-        load_balancer_properties = {
-            'Instances': [
-                {'InstanceId': 'ext_id'}
-            ]
-        }
-        mocked_elb = MagicMock()
-        setattr(mocked_elb, 'properties', load_balancer_properties)
-
-        ctx_target = self.get_mock_relationship_ctx(
+    def _relationship_ctx(self, instances=None):
+        target_props = {EXTERNAL_RESOURCE_ID: 'lb'}
+        if instances is not None:
+            target_props['instances'] = instances
+        ctx = self.get_mock_relationship_ctx(
             "elb",
-            test_target=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id'}),
+            test_target=self.get_mock_ctx("elb", {}, target_props),
             test_source=self.get_mock_ctx("elb", {},
                                           {EXTERNAL_RESOURCE_ID: 'ext_id'}))
+        props = ctx.target.instance.runtime_properties
+
+        def update(on_conflict):
+            merged = on_conflict(props.copy(), props.copy())
+            props.clear()
+            props.update(merged)
+        ctx.target.instance.update = MagicMock(side_effect=update)
+        return ctx
+
+    def test_class_add_instances(self):
+        self.load_balancer.resource_id = 'lb'
+        with patch(PATCH_PREFIX + 'INSTANCE_REGISTRAR') as registrar:
+            registrar.submit = MagicMock(return_value=set(['i-1']))
+            self.assertEqual(self.load_balancer.add_instances(['i-1']),
+                             set(['i-1']))
+        registrar.submit.assert_called_with(
+            self.load_balancer.client, 'lb', ['i-1'])
+
+    def test_class_remove_instances(self):
+        self.load_balancer.resource_id = 'lb'
+        with patch(PATCH_PREFIX + 'INSTANCE_DEREGISTRAR') as deregistrar:
+            deregistrar.submit = MagicMock(return_value=set())
+            self.assertEqual(self.load_balancer.remove_instances(['i-1']),
+                             set())
+        deregistrar.submit.assert_called_with(
+            self.load_balancer.client, 'lb', ['i-1'])
+
+    def test_assoc(self):
+        mocked_elb = MagicMock()
+        mocked_elb.add_instances = MagicMock(return_value=set(['ext_id']))
+        ctx_target = self._relationship_ctx()
 
         with patch(
                 PATCH_PREFIX + 'ELBClassicLoadBalancer',
                 return_value=mocked_elb):
             load_balancer.assoc(ctx_target)
+        mocked_elb.add_instances.assert_called_with(['ext_id'])
+        self.assertEqual(
+            ctx_target.target.instance.runtime_properties['instances'],
+            ['ext_id'])
 
     def test_assoc_raises(self):
-        ctx_target = self.get_mock_relationship_ctx(
-            "elb",
-            test_target=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id'}),
-            test_source=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id'}))
-        with patch(PATCH_PREFIX + 'ELBClassicLoadBalancer'):
+        mocked_elb = MagicMock()
+        mocked_elb.add_instances = MagicMock(return_value=set())
+        ctx_target = self._relationship_ctx(['other_id'])
+        with patch(
+                PATCH_PREFIX + 'ELBClassicLoadBalancer',
+                return_value=mocked_elb):
             self.assertRaises(OperationRetry, load_balancer.assoc, ctx_target)
+        # Merged with the instances of other operations
+        self.assertEqual(
+            ctx_target.target.instance.runtime_properties['instances'],
+            ['other_id', 'ext_id'])
 
     def test_disassoc(self):
-        ctx_target = self.get_mock_relationship_ctx(
-            "elb",
-            test_target=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id',
-                                           'instances': ['ext_id']}),
-            test_source=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id'}))
-        with patch(PATCH_PREFIX + 'ELBClassicLoadBalancer'):
+        mocked_elb = MagicMock()
+        mocked_elb.remove_instances = MagicMock(return_value=set(['ext_id']))
+        ctx_target = self._relationship_ctx(['ext_id', 'other_id'])
+        with patch(
+                PATCH_PREFIX + 'ELBClassicLoadBalancer',
+                return_value=mocked_elb):
             load_balancer.disassoc(ctx_target)
+        self.assertEqual(
+            ctx_target.target.instance.runtime_properties['instances'],
+            ['other_id'])
 
     def test_disassoc_raises(self):
-        load_balancer_properties = {
-            'Instances': [
-                {'InstanceId': 'ext_id'}
-            ]
-        }
         mocked_elb = MagicMock()
-        setattr(mocked_elb, 'properties', load_balancer_properties)
-        ctx_target = self.get_mock_relationship_ctx(
-            "elb",
-            test_target=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id',
-                                           'instances': ['ext_id']}),
-            test_source=self.get_mock_ctx("elb", {},
-                                          {EXTERNAL_RESOURCE_ID: 'ext_id'}))
+        mocked_elb.remove_instances = MagicMock(return_value=set())
+        ctx_target = self._relationship_ctx(['ext_id'])
         with patch(
                 PATCH_PREFIX + 'ELBClassicLoadBalancer',
                 return_value=mocked_elb):
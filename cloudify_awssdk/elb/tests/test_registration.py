@@ -0,0 +1,209 @@
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+from functools import partial
+from mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from cloudify_awssdk.common.tests.test_base import run_concurrently
+from cloudify_awssdk.elb.registration import (
+    InstanceRegistrar,
+    TargetRegistrar)
+
+
+def _instances(ids):
+    return [{'InstanceId': instance_id} for instance_id in ids]
+
+
+class TestInstanceRegistrar(unittest.TestCase):
+
+    def setUp(self):
+        super(TestInstanceRegistrar, self).setUp()
+        self.client = MagicMock()
+
+        def describe_instance_health(LoadBalancerName, Instances):
+            return {'InstanceStates': [
+                dict(instance, State='InService') for instance in Instances]}
+        self.client.describe_instance_health = MagicMock(
+            side_effect=describe_instance_health)
+        self.client.register_instances_with_load_balancer = MagicMock(
+            return_value={'Instances': []})
+
+    def test_submit(self):
+        registrar = InstanceRegistrar(window=0)
+        self.assertEqual(registrar.submit(self.client, 'lb', ['i-1']),
+                         set(['i-1']))
+        self.client.register_instances_with_load_balancer.\
+            assert_called_once_with(LoadBalancerName='lb',
+                                    Instances=_instances(['i-1']))
+        self.client.describe_instance_health.assert_called_once_with(
+            LoadBalancerName='lb', Instances=_instances(['i-1']))
+        self.assertEqual(registrar.calls, 2)
+
+    def test_submit_not_registered_yet(self):
+        self.client.describe_instance_health = MagicMock(
+            side_effect=ClientError(
+                {'Error': {'Code': 'InvalidInstance'}}, 'health'))
+        self.client.register_instances_with_load_balancer = MagicMock(
+            return_value={'Instances': _instances(['i-0', 'i-1'])})
+        registrar = InstanceRegistrar(window=0)
+        self.assertEqual(registrar.submit(self.client, 'lb', ['i-1', 'i-2']),
+                         set(['i-1']))
+
+    def test_submit_deregister(self):
+        self.client.deregister_instances_from_load_balancer = MagicMock(
+            return_value={'Instances': _instances(['i-0', 'i-2'])})
+        registrar = InstanceRegistrar(register=False, window=0)
+        self.assertEqual(registrar.submit(self.client, 'lb', ['i-1', 'i-2']),
+                         set(['i-1']))
+        self.assertFalse(self.client.describe_instance_health.called)
+
+    def test_submit_batch_size(self):
+        registrar = InstanceRegistrar(batch_size=2, window=0)
+        registrar.submit(self.client, 'lb', ['i-1', 'i-2', 'i-3'])
+        self.assertEqual(
+            self.client.register_instances_with_load_balancer.call_count, 2)
+        self.assertEqual(self.client.describe_instance_health.call_count, 2)
+
+    def _submit_concurrently(self, registrar, requests):
+        return run_concurrently([
+            partial(registrar.submit, self.client, lb, members)
+            for lb, members in requests])
+
+    def test_submit_coalesces(self):
+        registrar = InstanceRegistrar(batch_size=3, window=1, linger=1)
+        results = self._submit_concurrently(registrar, [
+            ('lb', ['i-1']), ('lb', ['i-2']), ('other', ['i-3']),
+            ('lb', ['i-4'])])
+        self.assertEqual(results[1], set(['i-2']))
+        self.assertEqual(results[2], set(['i-3']))
+        # A full batch is sent without waiting for the window to end
+        register = self.client.register_instances_with_load_balancer
+        self.assertEqual(register.call_count, 2)
+        batched = [call[1] for call in register.call_args_list
+                   if call[1]['LoadBalancerName'] == 'lb'][0]
+        self.assertEqual(sorted(i['InstanceId'] for i in batched['Instances']),
+                         ['i-1', 'i-2', 'i-4'])
+        self.assertEqual(self.client.describe_instance_health.call_count, 2)
+
+    def test_submit_coalesced_error(self):
+        def register(LoadBalancerName, Instances):
+            if {'InstanceId': 'bad'} in Instances:
+                raise ClientError({'Error': {}}, 'register')
+            return {'Instances': Instances}
+        self.client.register_instances_with_load_balancer = MagicMock(
+            side_effect=register)
+        registrar = InstanceRegistrar(batch_size=2, window=5, linger=5)
+        results = self._submit_concurrently(registrar, [
+            ('lb', ['i-1']), ('lb', ['bad'])])
+        # Only the request with the invalid instance fails
+        self.assertEqual(results[0], set(['i-1']))
+        self.assertIsInstance(results[1], ClientError)
+
+
+def _health(target, state, reason=None):
+    health = {'State': state}
+    if reason:
+        health['Reason'] = reason
+    return {'Target': target, 'TargetHealth': health}
+
+
+class TestTargetRegistrar(unittest.TestCase):
+
+    def setUp(self):
+        super(TestTargetRegistrar, self).setUp()
+        self.now = 0
+        self.client = MagicMock()
+
+    def _sleep(self, seconds):
+        self.now += seconds
+
+    def _registrar(self, **kwargs):
+        return TargetRegistrar(window=0, delay=5, budget=20,
+                               clock=lambda: self.now, sleep=self._sleep,
+                               **kwargs)
+
+    def test_submit_waits_healthy(self):
+        self.client.describe_target_health = MagicMock(side_effect=[
+            {'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'initial')]},
+            {'TargetHealthDescriptions': [
+                _health({'Id': 'i-2', 'Port': 8080}, 'healthy')]},
+            {'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'healthy')]}])
+        registrar = self._registrar(batch_size=1)
+        res = registrar.submit(self.client, 'tg',
+                               [('i-1', None), ('i-2', 8080)])
+        self.assertEqual(res, set([('i-1', None), ('i-2', 8080)]))
+        self.assertEqual(self.client.register_targets.call_count, 2)
+        self.client.register_targets.assert_any_call(
+            TargetGroupArn='tg', Targets=[{'Id': 'i-1'}])
+        self.client.register_targets.assert_any_call(
+            TargetGroupArn='tg', Targets=[{'Id': 'i-2', 'Port': 8080}])
+        # Only the pending targets are polled again
+        self.client.describe_target_health.assert_called_with(
+            TargetGroupArn='tg', Targets=[{'Id': 'i-1'}])
+        self.assertEqual(self.now, 5)
+
+    def test_submit_health_budget(self):
+        self.client.describe_target_health = MagicMock(return_value={
+            'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'unhealthy')]})
+        registrar = self._registrar()
+        self.assertEqual(registrar.submit(self.client, 'tg', [('i-1', None)]),
+                         set())
+        self.assertEqual(self.client.describe_target_health.call_count, 5)
+
+    def test_submit_not_in_use(self):
+        self.client.describe_target_health = MagicMock(return_value={
+            'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'unused',
+                        'Target.NotInUse')]})
+        registrar = self._registrar()
+        self.assertEqual(registrar.submit(self.client, 'tg', [('i-1', None)]),
+                         set([('i-1', None)]))
+
+    def test_submit_deregister_drains(self):
+        self.client.describe_target_health = MagicMock(side_effect=[
+            {'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'draining')]},
+            {'TargetHealthDescriptions': [
+                _health({'Id': 'i-1', 'Port': 80}, 'unused',
+                        'Target.NotRegistered')]}])
+        registrar = self._registrar(register=False)
+        self.assertEqual(registrar.submit(self.client, 'tg', [('i-1', 80)]),
+                         set([('i-1', 80)]))
+        self.client.deregister_targets.assert_called_once_with(
+            TargetGroupArn='tg', Targets=[{'Id': 'i-1', 'Port': 80}])
+
+    def test_submit_coalesces(self):
+        def describe_target_health(TargetGroupArn, Targets):
+            return {'TargetHealthDescriptions': [
+                _health(target, 'healthy') for target in Targets]}
+        self.client.describe_target_health = MagicMock(
+            side_effect=describe_target_health)
+        registrar = TargetRegistrar(window=1, linger=1)
+        results = run_concurrently([
+            partial(registrar.submit, self.client, 'tg', [('i-%d' % i, None)])
+            for i in range(3)])
+        self.assertEqual(results, dict(
+            (i, set([('i-%d' % i, None)])) for i in range(3)))
+        self.assertEqual(self.client.register_targets.call_count, 1)
+        self.assertEqual(self.client.describe_target_health.call_count, 1)
+        self.assertEqual(registrar.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
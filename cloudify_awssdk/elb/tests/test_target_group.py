@@ -22,6 +22,8 @@ from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
 from mock import patch, MagicMock
 from cloudify_awssdk.elb.resources import target_group
 
+from cloudify.exceptions import OperationRetry
+
 PATCH_PREFIX = 'cloudify_awssdk.elb.resources.target_group.'
 
 
@@ -37,9 +39,12 @@ class TestELBTargetGroup(TestBase):
                       mock_decorator)
         mock3 = patch('cloudify_awssdk.common.decorators.wait_for_delete',
                       mock_decorator)
+        mock4 = patch('cloudify_awssdk.common.decorators.aws_relationship',
+                      mock_decorator)
         mock1.start()
         mock2.start()
         mock3.start()
+        mock4.start()
         reload(target_group)
 
     def test_class_properties(self):
@@ -161,6 +166,79 @@ class TestELBTargetGroup(TestBase):
             target_group.modify(ctx, iface, config)
             self.assertTrue(iface.modify_attribute.called)
 
+    def test_class_register_targets(self):
+        self.target_group.resource_id = 'tg'
+        with patch(PATCH_PREFIX + 'TARGET_REGISTRAR') as registrar:
+            registrar.submit = MagicMock(
+                return_value=set([('i-2', None), ('i-1', 8080)]))
+            res = self.target_group.register_targets(
+                [{'Id': 'i-1', 'Port': 8080}, {'Id': 'i-2'}])
+        registrar.submit.assert_called_with(
+            self.target_group.client, 'tg', [('i-1', 8080), ('i-2', None)])
+        self.assertEqual(res, [{'Id': 'i-1', 'Port': 8080}, {'Id': 'i-2'}])
+
+    def test_class_deregister_targets(self):
+        self.target_group.resource_id = 'tg'
+        with patch(PATCH_PREFIX + 'TARGET_DEREGISTRAR') as deregistrar:
+            deregistrar.submit = MagicMock(return_value=set())
+            res = self.target_group.deregister_targets([{'Id': 'i-1'}])
+        deregistrar.submit.assert_called_with(
+            self.target_group.client, 'tg', [('i-1', None)])
+        self.assertEqual(res, [])
+
+    def _relationship_ctx(self, targets=None):
+        target_props = {EXTERNAL_RESOURCE_ID: 'tg'}
+        if targets is not None:
+            target_props['targets'] = targets
+        ctx = self.get_mock_relationship_ctx(
+            "elb",
+            test_target=self.get_mock_ctx("elb", {}, target_props),
+            test_source=self.get_mock_ctx("elb", {},
+                                          {EXTERNAL_RESOURCE_ID: 'i-1'}))
+        props = ctx.target.instance.runtime_properties
+
+        def update(on_conflict):
+            merged = on_conflict(props.copy(), props.copy())
+            props.clear()
+            props.update(merged)
+        ctx.target.instance.update = MagicMock(side_effect=update)
+        return ctx
+
+    def test_register_target(self):
+        iface = MagicMock()
+        iface.register_targets = MagicMock(
+            return_value=[{'Id': 'i-1', 'Port': 80}])
+        ctx = self._relationship_ctx([{'Id': 'i-0'}])
+        with patch(PATCH_PREFIX + 'ELBTargetGroup', return_value=iface):
+            target_group.register_target(ctx, port='80')
+        iface.register_targets.assert_called_with([{'Id': 'i-1', 'Port': 80}])
+        self.assertEqual(ctx.target.instance.runtime_properties['targets'],
+                         [{'Id': 'i-0'}, {'Id': 'i-1', 'Port': 80}])
+
+    def test_register_target_unhealthy(self):
+        iface = MagicMock()
+        iface.register_targets = MagicMock(return_value=[])
+        ctx = self._relationship_ctx()
+        with patch(PATCH_PREFIX + 'ELBTargetGroup', return_value=iface):
+            self.assertRaises(OperationRetry, target_group.register_target,
+                              ctx)
+        self.assertEqual(ctx.target.instance.runtime_properties['targets'],
+                         [{'Id': 'i-1'}])
+
+    def test_deregister_target(self):
+        iface = MagicMock()
+        iface.deregister_targets = MagicMock(return_value=[{'Id': 'i-1'}])
+        ctx = self._relationship_ctx([{'Id': 'i-1'}])
+        with patch(PATCH_PREFIX + 'ELBTargetGroup', return_value=iface):
+            target_group.deregister_target(ctx)
+        self.assertEqual(ctx.target.instance.runtime_properties['targets'],
+                         [])
+
+        iface.deregister_targets = MagicMock(return_value=[])
+        with patch(PATCH_PREFIX + 'ELBTargetGroup', return_value=iface):
+            self.assertRaises(OperationRetry,
+                              target_group.deregister_target, ctx)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -93,6 +93,30 @@ class IAMRole(IAMBase):
         params.update(dict(RoleName=self.resource_id))
         self.client.detach_role_policy(**params)
 
+    def attach_policies(self, policy_arns):
+        '''
+            Attaches IAM Policies to an IAM Role, concurrently
+        '''
+        self.logger.debug('Attaching IAM Policies %s to IAM Role "%s"'
+                          % (policy_arns, self.resource_id))
+        # Errors, like throttling, are retried as with single calls
+        self.make_client_calls(
+            'attach_role_policy',
+            [dict(RoleName=self.resource_id, PolicyArn=policy_arn)
+             for policy_arn in policy_arns], fatal_handled_exceptions=())
+
+    def detach_policies(self, policy_arns):
+        '''
+            Detaches IAM Policies from an IAM Role, concurrently
+        '''
+        self.logger.debug('Detaching IAM Policies %s from IAM Role "%s"'
+                          % (policy_arns, self.resource_id))
+        # Errors, like throttling, are retried as with single calls
+        self.make_client_calls(
+            'detach_role_policy',
+            [dict(RoleName=self.resource_id, PolicyArn=policy_arn)
+             for policy_arn in policy_arns], fatal_handled_exceptions=())
+
 
 @decorators.aws_resource(IAMRole, RESOURCE_TYPE)
 def create(ctx, iface, resource_config, **_):
@@ -123,14 +147,10 @@ def create(ctx, iface, resource_config, **_):
         ctx.instance, create_response['Role']['Arn'])
 
     # attach policy role
-    policies_arn = []
     policies = _.get('modify_role_attribute_args', [])
-    for policy in policies:
-        payload = dict()
-        payload['RoleName'] = resource_id
-        payload['PolicyArn'] = policy['PolicyArn']
-        policies_arn.append(payload['PolicyArn'])
-        iface.attach_policy(payload)
+    policies_arn = [policy['PolicyArn'] for policy in policies]
+    if policies_arn:
+        iface.attach_policies(policies_arn)
 
     # If there are policies added attached to role, then we need to make
     # sure that when uninstall triggers, all the attached policies arn are
@@ -146,11 +166,8 @@ def delete(ctx, iface, resource_config, **_):
     '''Deletes an AWS IAM Role'''
 
     # If the current role associated
-    if 'policies' in ctx.instance.runtime_properties:
-        for policy in ctx.instance.runtime_properties['policies']:
-            payload = dict()
-            payload['PolicyArn'] = policy
-            iface.detach_policy(payload)
+    if ctx.instance.runtime_properties.get('policies'):
+        iface.detach_policies(ctx.instance.runtime_properties['policies'])
 
     iface.delete(resource_config)
 
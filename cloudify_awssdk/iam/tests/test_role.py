@@ -13,6 +13,8 @@
 #    * limitations under the License.
 from mock import patch, MagicMock
 import unittest
+from botocore.exceptions import ClientError
+from cloudify.exceptions import NonRecoverableError
 from cloudify.state import current_ctx
 from cloudify_awssdk.common.tests.test_base import TestBase, CLIENT_CONFIG
 from cloudify_awssdk.common.tests.test_base import DELETE_RESPONSE
@@ -151,6 +153,94 @@ class TestIAMRole(TestBase):
             RUNTIME_PROPERTIES_AFTER_CREATE
         )
 
+    def test_create_with_policies(self):
+        _ctx = self.get_mock_ctx(
+            'test_create',
+            test_properties=NODE_PROPERTIES,
+            test_runtime_properties=DEFAULT_RUNTIME_PROPERTIES,
+            type_hierarchy=ROLE_TH
+        )
+
+        current_ctx.set(_ctx)
+
+        self.fake_client.create_role = MagicMock(return_value={
+            'Role': {
+                'RoleName': "role_name_id",
+                'Arn': "arn_id"
+            }
+        })
+        self.fake_client.attach_role_policy = MagicMock(return_value={})
+
+        role.create(ctx=_ctx, resource_config=None, iface=None,
+                    modify_role_attribute_args=[{'PolicyArn': 'arn_a'},
+                                                {'PolicyArn': 'arn_b'}])
+
+        self.assertEqual(
+            sorted(call[1]['PolicyArn'] for call in
+                   self.fake_client.attach_role_policy.call_args_list),
+            ['arn_a', 'arn_b'])
+        self.fake_client.attach_role_policy.assert_any_call(
+            RoleName='role_name_id', PolicyArn='arn_a')
+        self.assertEqual(_ctx.instance.runtime_properties['policies'],
+                         ['arn_a', 'arn_b'])
+
+    def test_create_with_policies_error(self):
+        _ctx = self.get_mock_ctx(
+            'test_create',
+            test_properties=NODE_PROPERTIES,
+            test_runtime_properties=DEFAULT_RUNTIME_PROPERTIES,
+            type_hierarchy=ROLE_TH
+        )
+
+        current_ctx.set(_ctx)
+
+        self.fake_client.create_role = MagicMock(return_value={
+            'Role': {
+                'RoleName': "role_name_id",
+                'Arn': "arn_id"
+            }
+        })
+        error = ClientError({'Error': {'Code': 'Throttling'}},
+                            'attach_role_policy')
+        self.fake_client.attach_role_policy = MagicMock(
+            side_effect=[{}, error])
+
+        # Not a NonRecoverableError, the operation is retried
+        with self.assertRaises(ClientError) as raised:
+            role.create(ctx=_ctx, resource_config=None, iface=None,
+                        modify_role_attribute_args=[{'PolicyArn': 'arn_a'},
+                                                    {'PolicyArn': 'arn_b'}])
+        self.assertIs(raised.exception, error)
+        self.assertNotIsInstance(raised.exception, NonRecoverableError)
+        self.assertEqual(self.fake_client.attach_role_policy.call_count, 2)
+
+    def test_delete_with_policies(self):
+        runtime_properties = dict(RUNTIME_PROPERTIES_AFTER_CREATE,
+                                  policies=['arn_a', 'arn_b'])
+        _ctx = self.get_mock_ctx(
+            'test_delete',
+            test_properties=NODE_PROPERTIES,
+            test_runtime_properties=runtime_properties,
+            type_hierarchy=ROLE_TH
+        )
+
+        current_ctx.set(_ctx)
+
+        self.fake_client.detach_role_policy = MagicMock(return_value={})
+        self.fake_client.delete_role = MagicMock(
+            return_value=DELETE_RESPONSE
+        )
+
+        role.delete(ctx=_ctx, resource_config=None, iface=None)
+
+        self.assertEqual(
+            sorted(call[1]['PolicyArn'] for call in
+                   self.fake_client.detach_role_policy.call_args_list),
+            ['arn_a', 'arn_b'])
+        self.fake_client.delete_role.assert_called_with(
+            RoleName='role_name_id'
+        )
+
     def test_delete(self):
         _ctx = self.get_mock_ctx(
             'test_delete',
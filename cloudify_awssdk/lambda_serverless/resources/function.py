@@ -17,19 +17,32 @@
     ~~~~~~~~~~~~~~~~~~~
     AWS Lambda Function interface
 '''
+from base64 import b64encode
+from hashlib import sha256
 from os import remove as os_remove
 from os.path import exists as path_exists
 # Cloudify
+from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.constants import (
+    LAMBDA_ZIPFILE_MAX_SIZE,
+    S3_MULTIPART_CONCURRENCY,
+    S3_MULTIPART_MIN_PART_SIZE,
+    S3_MULTIPART_PART_SIZE,
+    S3_READ_BUFFER_SIZE)
 from cloudify_awssdk.lambda_serverless import LambdaBase
+from cloudify_awssdk.s3.resources.bucket_object import S3BucketObject
 # Boto
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
 RESOURCE_TYPE = 'Lambda Function'
 SUBNET_TYPE = 'cloudify.nodes.aws.ec2.Subnet'
 SUBNET_TYPE_DEPRECATED = 'cloudify.aws.nodes.Subnet'
 SECGROUP_TYPE = 'cloudify.nodes.aws.ec2.SecurityGroup'
 SECGROUP_TYPE_DEPRECATED = 'cloudify.aws.nodes.SecurityGroup'
+# Staging of deployment packages in S3
+CODE_UPLOAD = 'code_upload'
+CODE_SHA256 = 'CodeSha256'
 
 
 class LambdaFunction(LambdaBase):
@@ -90,6 +103,63 @@ class LambdaFunction(LambdaBase):
         return res
 
 
+def _code_sha256(path):
+    '''
+        Reads a deployment package in chunks, returns its SHA-256 digest,
+        base64 encoded as the CodeSha256 of a function, its hex digest
+        and its size
+    '''
+    digest = sha256()
+    size = 0
+    with open(path, mode='rb') as _file:
+        while True:
+            chunk = _file.read(S3_READ_BUFFER_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return b64encode(digest.digest()), digest.hexdigest(), size
+
+
+def _stage_code(ctx, path, hexdigest, upload):
+    '''
+        Uploads a deployment package to the S3 staging bucket, streaming
+        it in parts. Packages are keyed by their digest, a package already
+        staged is not uploaded again.
+
+    :returns: The Code parameter of create_function
+    '''
+    params = dict(Bucket=upload['bucket'], Key='{0}{1}.zip'.format(
+        upload.get('key_prefix') or '', hexdigest))
+    part_size = upload.get('part_size') or S3_MULTIPART_PART_SIZE
+    if part_size < S3_MULTIPART_MIN_PART_SIZE:
+        raise NonRecoverableError(
+            'code_upload part_size must be at least {0} bytes'.format(
+                S3_MULTIPART_MIN_PART_SIZE))
+    staging = S3BucketObject(ctx.node, logger=ctx.logger)
+    code = dict(S3Bucket=params['Bucket'], S3Key=params['Key'])
+    try:
+        staging.client.head_object(**params)
+        ctx.logger.info('Deployment package already staged in s3://%s/%s.'
+                        % (params['Bucket'], params['Key']))
+        return code
+    except ClientError:
+        pass
+    state = dict()
+    try:
+        with open(path, mode='rb') as _file:
+            staging.upload(params, _file, state, part_size=part_size,
+                           concurrency=upload.get('concurrency') or
+                           S3_MULTIPART_CONCURRENCY)
+    except (BotoCoreError, ClientError, IOError):
+        if state.get('UploadId'):
+            staging.abort_upload(params, state['UploadId'])
+        raise
+    ctx.logger.info('Staged the deployment package in s3://%s/%s.'
+                    % (params['Bucket'], params['Key']))
+    return code
+
+
 @decorators.aws_resource(LambdaFunction, RESOURCE_TYPE)
 def create(ctx, iface, resource_config, **_):
     '''Creates an AWS Lambda Function'''
@@ -137,22 +207,55 @@ def create(ctx, iface, resource_config, **_):
             node=iam_role.target.node,
             instance=iam_role.target.instance,
             raise_on_missing=True)
+    create_response = None
+    upload = ctx.node.properties.get(CODE_UPLOAD) or dict()
     # Handle user-profided code ZIP file
-    if params.get('Code', dict()).get('ZipFile'):
+    if params.get('Code', dict()).get('ZipFile') and upload.get('bucket'):
+        # Streamed to S3, the package is never held in memory
+        codezip = params['Code']['ZipFile']
+        ctx.logger.debug('ZipFile: "%s" (%s)' % (codezip, type(codezip)))
+        downloaded = not path_exists(codezip)
+        if downloaded:
+            codezip = ctx.download_resource(codezip)
+            ctx.logger.debug('Downloaded resource: "%s"' % codezip)
+        try:
+            code_sha256, hexdigest, _ = _code_sha256(codezip)
+            existing = iface.properties
+            if existing and existing.get(CODE_SHA256) == code_sha256:
+                # Created by a previous attempt of the operation
+                ctx.logger.info('%s %s already exists with the same code.'
+                                % (iface.type_name, iface.resource_id))
+                create_response = existing
+            else:
+                params['Code'] = \
+                    _stage_code(ctx, codezip, hexdigest, upload)
+        finally:
+            if downloaded:
+                ctx.logger.debug('Deleting resource: "%s"' % codezip)
+                os_remove(codezip)
+    elif params.get('Code', dict()).get('ZipFile'):
         codezip = params['Code']['ZipFile']
         ctx.logger.debug('ZipFile: "%s" (%s)' % (codezip, type(codezip)))
         if not path_exists(codezip):
             codezip = ctx.download_resource(codezip)
             ctx.logger.debug('Downloaded resource: "%s"' % codezip)
             with open(codezip, mode='rb') as _file:
-                params['Code']['ZipFile'] = _file.read()
+                params['Code']['ZipFile'] = \
+                    _file.read(LAMBDA_ZIPFILE_MAX_SIZE + 1)
             ctx.logger.debug('Deleting resource: "%s"' % codezip)
             os_remove(codezip)
         else:
             with open(codezip, mode='rb') as _file:
-                params['Code']['ZipFile'] = _file.read()
+                params['Code']['ZipFile'] = \
+                    _file.read(LAMBDA_ZIPFILE_MAX_SIZE + 1)
+        if len(params['Code']['ZipFile']) > LAMBDA_ZIPFILE_MAX_SIZE:
+            raise NonRecoverableError(
+                'The deployment package is larger than {0} bytes, set '
+                'code_upload.bucket to stage it in S3.'.format(
+                    LAMBDA_ZIPFILE_MAX_SIZE))
     # Actually create the resource
-    create_response = iface.create(params)
+    if not create_response:
+        create_response = iface.create(params)
     resource_id = create_response['FunctionName']
     utils.update_resource_id(ctx.instance, resource_id)
     utils.update_resource_arn(
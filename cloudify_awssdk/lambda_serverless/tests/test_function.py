@@ -13,8 +13,13 @@
 #    * limitations under the License.
 from mock import patch, MagicMock
 from cloudify_awssdk.lambda_serverless.resources import function
+import hashlib
+import os
+import tempfile
 import unittest
 from io import StringIO
+from botocore.exceptions import ClientError, EndpointConnectionError
+from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.common.tests.test_base import TestBase, mock_decorator
 from cloudify.mocks import MockCloudifyContext, MockRelationshipContext
 
@@ -151,7 +156,7 @@ class TestLambdaFunction(TestBase):
             target=MockCloudifyContext('subnet'))
         subnettarget.target.node.type_hierarchy =\
             ['cloudify.nodes.aws.ec2.Subnet']
-        ctx = MockCloudifyContext("test_create")
+        ctx = MockCloudifyContext("test_create", properties={})
         with patch(PATCH_PREFIX + 'LambdaBase'),\
             patch(PATCH_PREFIX + 'utils') as utils,\
             patch(PATCH_PREFIX + 'path_exists', MagicMock(return_value=True)),\
@@ -183,7 +188,7 @@ class TestLambdaFunction(TestBase):
             target=MockCloudifyContext('subnet'))
         subnettarget.target.node.type_hierarchy =\
             ['cloudify.nodes.aws.ec2.Subnet']
-        ctx = MockCloudifyContext("test_create")
+        ctx = MockCloudifyContext("test_create", properties={})
         ctx.download_resource = MagicMock(return_value='abc')
         with patch(PATCH_PREFIX + 'LambdaBase'),\
             patch(PATCH_PREFIX + 'utils') as utils,\
@@ -213,6 +218,127 @@ class TestLambdaFunction(TestBase):
                               'SecurityGroupIds': ['Role']},
                              resource_config['VpcConfig'])
 
+    def _package(self, data=b'PK\x03\x04code'):
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        os.write(fd, data)
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def _staged_ctx(self):
+        ctx = MockCloudifyContext("test_create", properties={
+            'code_upload': {'bucket': 'staging', 'key_prefix': 'lambda/'}})
+        return ctx
+
+    def test_code_sha256(self):
+        path = self._package()
+        with patch(PATCH_PREFIX + 'S3_READ_BUFFER_SIZE', 3):
+            code_sha256, hexdigest, size = function._code_sha256(path)
+        digest = hashlib.sha256(b'PK\x03\x04code')
+        self.assertEqual(code_sha256,
+                         digest.digest().encode('base64').strip())
+        self.assertEqual(hexdigest, digest.hexdigest())
+        self.assertEqual(size, 8)
+
+    def test_create_staged(self):
+        path = self._package()
+        ctx = self._staged_ctx()
+        iface = MagicMock(properties=None)
+        iface.create = MagicMock(return_value={
+            'FunctionName': 'test_function', 'FunctionArn': 'arn'})
+        resource_config = {'Code': {'ZipFile': path}}
+        with patch(PATCH_PREFIX + 'S3BucketObject') as staging:
+            staging.return_value.client.head_object = MagicMock(
+                side_effect=ClientError({'Error': {}}, 'head_object'))
+            function.create(ctx, iface, resource_config)
+        key = 'lambda/%s.zip' % hashlib.sha256(
+            b'PK\x03\x04code').hexdigest()
+        self.assertEqual(resource_config['Code'],
+                         {'S3Bucket': 'staging', 'S3Key': key})
+        upload = staging.return_value.upload
+        self.assertEqual(upload.call_args[0][0],
+                         {'Bucket': 'staging', 'Key': key})
+        self.assertEqual(upload.call_args[1]['part_size'], 8388608)
+        self.assertTrue(iface.create.called)
+
+    def test_create_staged_upload_fails(self):
+        path = self._package()
+        ctx = self._staged_ctx()
+        iface = MagicMock(properties=None)
+
+        def upload(params, stream, state, **_):
+            state['UploadId'] = 'upload'
+            raise ClientError({'Error': {}}, 'upload_part')
+        with patch(PATCH_PREFIX + 'S3BucketObject') as staging:
+            staging.return_value.client.head_object = MagicMock(
+                side_effect=ClientError({'Error': {}}, 'head_object'))
+            staging.return_value.upload = MagicMock(side_effect=upload)
+            self.assertRaises(ClientError, function.create, ctx, iface,
+                              {'Code': {'ZipFile': path}})
+        staging.return_value.abort_upload.assert_called_with(
+            {'Bucket': 'staging', 'Key': 'lambda/%s.zip' % hashlib.sha256(
+                b'PK\x03\x04code').hexdigest()}, 'upload')
+        self.assertFalse(iface.create.called)
+
+    def test_create_staged_connection_error(self):
+        path = self._package()
+        # A Lambda node has no S3 resource_config
+        ctx = MockCloudifyContext("test_create", properties={
+            'code_upload': {'bucket': 'staging', 'part_size': 4}})
+        iface = MagicMock(properties=None)
+        client = MagicMock()
+        client.head_object = MagicMock(
+            side_effect=ClientError({'Error': {}}, 'head_object'))
+        client.create_multipart_upload = MagicMock(
+            return_value={'UploadId': 'upload'})
+        client.upload_part = MagicMock(side_effect=EndpointConnectionError(
+            endpoint_url='https://s3.amazonaws.com'))
+        with patch(PATCH_PREFIX + 'S3_MULTIPART_MIN_PART_SIZE', 4), \
+                patch('cloudify_awssdk.s3.Boto3Connection') as connection:
+            connection.return_value.client = MagicMock(return_value=client)
+            self.assertRaises(EndpointConnectionError, function.create,
+                              ctx, iface, {'Code': {'ZipFile': path}})
+        client.abort_multipart_upload.assert_called_with(
+            Bucket='staging', Key='%s.zip' % hashlib.sha256(
+                b'PK\x03\x04code').hexdigest(), UploadId='upload')
+        self.assertFalse(iface.create.called)
+
+    def test_create_staged_already(self):
+        path = self._package()
+        ctx = self._staged_ctx()
+        iface = MagicMock(properties=None)
+        iface.create = MagicMock(return_value={
+            'FunctionName': 'test_function', 'FunctionArn': 'arn'})
+        resource_config = {'Code': {'ZipFile': path}}
+        with patch(PATCH_PREFIX + 'S3BucketObject') as staging:
+            function.create(ctx, iface, resource_config)
+        self.assertFalse(staging.return_value.upload.called)
+        self.assertEqual(resource_config['Code']['S3Bucket'], 'staging')
+        self.assertTrue(iface.create.called)
+
+    def test_create_staged_same_code(self):
+        path = self._package()
+        ctx = self._staged_ctx()
+        code_sha256, _, _ = function._code_sha256(path)
+        iface = MagicMock(properties={
+            'FunctionName': 'test_function', 'FunctionArn': 'arn',
+            'CodeSha256': code_sha256})
+        with patch(PATCH_PREFIX + 'S3BucketObject') as staging:
+            function.create(ctx, iface, {'Code': {'ZipFile': path}})
+        self.assertFalse(staging.called)
+        self.assertFalse(iface.create.called)
+        self.assertEqual(
+            ctx.instance.runtime_properties['aws_resource_arn'], 'arn')
+
+    def test_create_too_large(self):
+        path = self._package(b'0123456789')
+        ctx = MockCloudifyContext("test_create", properties={})
+        iface = MagicMock()
+        with patch(PATCH_PREFIX + 'LAMBDA_ZIPFILE_MAX_SIZE', 8):
+            self.assertRaises(NonRecoverableError, function.create, ctx,
+                              iface, {'Code': {'ZipFile': path}})
+        self.assertFalse(iface.create.called)
+
     def test_delete(self):
         iface = MagicMock()
         function.delete(iface, None)
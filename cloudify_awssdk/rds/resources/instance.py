@@ -23,18 +23,45 @@ from datetime import datetime
 # Cloudify
 from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.constants import (
+    DESCRIBE_CACHE_TTL,
+    RDS_FILTER_MAX_VALUES)
+from cloudify_awssdk.common.poller import BatchPoller
 from cloudify_awssdk.rds import RDSBase
 
-# Boto
-from botocore.exceptions import ClientError
-
 RESOURCE_TYPE = 'RDS DB Instance'
 
 
+def describe_db_instances_batch(client, identifiers):
+    '''
+        Describes many DB instances at once. Filters are used instead of
+        DBInstanceIdentifier so that many instances are described by one
+        call and a missing instance does not fail it.
+    '''
+    params = dict(Filters=[dict(Name='db-instance-id', Values=identifiers)])
+    db_instances = dict()
+    while True:
+        resources = client.describe_db_instances(**params)
+        for db_instance in resources.get('DBInstances', list()):
+            db_instances[db_instance['DBInstanceIdentifier']] = db_instance
+        if not resources.get('Marker'):
+            return db_instances
+        params['Marker'] = resources['Marker']
+
+
+# DB instance identifiers are stored as lowercase strings
+DB_INSTANCES_POLLER = BatchPoller(describe_db_instances_batch,
+                                  batch_size=RDS_FILTER_MAX_VALUES,
+                                  normalize=lambda identifier:
+                                  identifier.lower())
+
+
 class DBInstance(RDSBase):
     '''
         AWS RDS DB Instance interface
     '''
+    describe_cache_ttl = DESCRIBE_CACHE_TTL
+
     def __init__(self, ctx_node, resource_id=None, client=None, logger=None):
         RDSBase.__init__(self, ctx_node, resource_id, client, logger)
         self.type_name = RESOURCE_TYPE
@@ -42,15 +69,12 @@ class DBInstance(RDSBase):
     @property
     def properties(self):
         '''Gets the properties of an external resource'''
-        resources = None
-        try:
-            resources = self.client.describe_db_instances(
-                DBInstanceIdentifier=self.resource_id)
-        except ClientError:
-            pass
-        if not resources or not resources.get('DBInstances', list()):
-            return None
-        return resources['DBInstances'][0]
+        return DB_INSTANCES_POLLER.get(self.client, self.resource_id)
+
+    def refresh(self):
+        '''Drops cached responses so that the next read goes to AWS'''
+        RDSBase.refresh(self)
+        DB_INSTANCES_POLLER.invalidate(self.client, [self.resource_id])
 
     @property
     def status(self):
@@ -80,6 +104,7 @@ class DBInstance(RDSBase):
         self.logger.debug('Deleting %s with parameters: %s'
                           % (self.type_name, params))
         self.client.delete_db_instance(**params)
+        DB_INSTANCES_POLLER.invalidate(self.client, [self.resource_id])
 
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
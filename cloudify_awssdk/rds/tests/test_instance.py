@@ -129,6 +129,7 @@ class TestRDSInstance(TestBase):
 
         self.fake_client.describe_db_instances = MagicMock(return_value={
             'DBInstances': [{
+                'DBInstanceIdentifier': 'devdbinstance',
                 'DBInstanceStatus': 'available'
             }]
         })
@@ -149,7 +150,7 @@ class TestRDSInstance(TestBase):
             StorageType='gp2'
         )
         self.fake_client.describe_db_instances.assert_called_with(
-            DBInstanceIdentifier='devdbinstance'
+            Filters=[{'Name': 'db-instance-id', 'Values': ['devdbinstance']}]
         )
         # We are removing these
         self.assertEqual(
@@ -199,7 +200,7 @@ class TestRDSInstance(TestBase):
         )
 
         self.fake_client.describe_db_instances.assert_called_with(
-            DBInstanceIdentifier='devdbinstance'
+            Filters=[{'Name': 'db-instance-id', 'Values': ['devdbinstance']}]
         )
 
         self.assertEqual(
@@ -189,7 +189,8 @@ class TestRDSOptionGroup(TestBase):
             str(error.exception),
             (
                 'RDS Option Group ID# "dev-db-option-group" is still ' +
-                'in a pending state.'
+                'in a pending state. ' +
+                '[retry_after={0}]'.format(error.exception.retry_after)
             )
         )
 
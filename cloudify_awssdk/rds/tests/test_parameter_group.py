@@ -249,7 +249,8 @@ class TestRDSParameterGroup(TestBase):
             str(error.exception),
             (
                 'RDS Parameter Group ID# "dev-db-param-group"' +
-                ' is still in a pending state.'
+                ' is still in a pending state. ' +
+                '[retry_after={0}]'.format(error.exception.retry_after)
             )
         )
 
@@ -17,16 +17,329 @@
     ~~~~~~~~~~~~~~~~~~
     AWS Route53 Hosted Zone interface
 '''
-# Sleep
-from time import sleep
+# Standard imports
+import time
 # Cloudify
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.batcher import Batch, Batcher, shared_client
 from cloudify_awssdk.common.connection import Boto3Connection
+from cloudify_awssdk.common.constants import (
+    ROUTE53_CHANGE_LINGER,
+    ROUTE53_CHANGE_WINDOW,
+    ROUTE53_LIST_PAGE_SIZE,
+    ROUTE53_MAX_CHANGES,
+    ROUTE53_SEEK_MAX_UPSERTS,
+    ROUTE53_SEEK_PAGE_SIZE,
+    ROUTE53_SYNC_BUDGET,
+    ROUTE53_SYNC_DELAY)
 from cloudify_awssdk.route53 import Route53Base
 # Boto
 from botocore.exceptions import ClientError
 
 RESOURCE_TYPE = 'Route53 Hosted Zone'
+CHANGE_INFO = 'ChangeInfo'
+INSYNC = 'INSYNC'
+RECORD_SETS = 'ResourceRecordSets'
+RECORD_SET = 'ResourceRecordSet'
+
+
+def _record_name(name):
+    '''A domain name as Route53 lists it: lower case, with the final dot'''
+    name = (name or '').lower().replace('*', '\\052')
+    return name if name.endswith('.') else name + '.'
+
+
+def _record_key(record):
+    '''Key of a record set: name, type and set identifier'''
+    return (_record_name(record.get('Name')), record.get('Type'),
+            record.get('SetIdentifier'))
+
+
+def _normalize_record(record):
+    '''A record set, in a form comparable with a listed one'''
+    record = dict(record, Name=_record_name(record.get('Name')))
+    if record.get('ResourceRecords'):
+        record['ResourceRecords'] = sorted(
+            record['ResourceRecords'], key=lambda value: value.get('Value'))
+    if record.get('AliasTarget'):
+        record['AliasTarget'] = dict(
+            record['AliasTarget'],
+            DNSName=_record_name(record['AliasTarget'].get('DNSName')))
+    return record
+
+
+def list_record_sets(client, zone_id, page_size=ROUTE53_LIST_PAGE_SIZE,
+                     **params):
+    '''
+        Lists the record sets of a hosted zone, from the optional
+        StartRecordName, StartRecordType and StartRecordIdentifier,
+        fetching pages as they are consumed
+
+    :param client: A Boto3 Route53 client
+    :param str zone_id: ID of the hosted zone
+    :param int page_size: Number of records per call
+    :returns: Generator of record sets
+    '''
+    params = dict(params, HostedZoneId=zone_id, MaxItems=str(page_size))
+    while True:
+        res = client.list_resource_record_sets(**params)
+        for record in res.get(RECORD_SETS, []):
+            yield record
+        if not res.get('IsTruncated'):
+            return
+        params['StartRecordName'] = res['NextRecordName']
+        params['StartRecordType'] = res['NextRecordType']
+        if res.get('NextRecordIdentifier'):
+            params['StartRecordIdentifier'] = res['NextRecordIdentifier']
+        else:
+            params.pop('StartRecordIdentifier', None)
+
+
+def find_record_set(client, zone_id, name, record_type, set_identifier=None):
+    '''
+        Seeks to a record set of a hosted zone
+
+    :param client: A Boto3 Route53 client
+    :param str zone_id: ID of the hosted zone
+    :param str name: Name of the record set
+    :param str record_type: Type of the record set
+    :param str set_identifier: SetIdentifier of weighted, latency,
+        geolocation and failover record sets
+    :returns: The record set, or None if it does not exist
+    '''
+    key = _record_key(dict(Name=name, Type=record_type,
+                           SetIdentifier=set_identifier))
+    for record in list_record_sets(client, zone_id,
+                                   page_size=ROUTE53_SEEK_PAGE_SIZE,
+                                   StartRecordName=key[0],
+                                   StartRecordType=record_type):
+        record_key = _record_key(record)
+        if record_key == key:
+            return record
+        if record_key[:2] != key[:2]:
+            # Listed by name and type, past the record set
+            return None
+    return None
+
+
+class RecordIndex(object):
+    '''
+        Record sets of a hosted zone, by name, type and set identifier
+
+    :param records: Iterable of record sets, see `list_record_sets`
+    '''
+    def __init__(self, records):
+        self.records = dict(
+            (_record_key(record), record) for record in records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, name, record_type, set_identifier=None):
+        '''Gets a record set, None if it does not exist'''
+        return self.records.get(_record_key(dict(
+            Name=name, Type=record_type, SetIdentifier=set_identifier)))
+
+
+def is_noop_upsert(change, existing):
+    '''
+        Checks if a change is an UPSERT which would not change
+        an existing record set
+
+    :param dict change: A change, as in a ChangeBatch
+    :param dict existing: The existing record set, or None
+    '''
+    if not existing or change.get('Action', '').upper() != 'UPSERT':
+        return False
+    return _normalize_record(change.get(RECORD_SET, dict())) == \
+        _normalize_record(existing)
+
+
+def _invalid_change_batch(error):
+    '''Checks if Route53 rejected the changes of a call'''
+    return isinstance(error, ClientError) and \
+        error.response.get('Error', dict()).get('Code') == \
+        'InvalidChangeBatch'
+
+
+def _weight(change):
+    '''Number of changes a change counts for against the limit'''
+    records = change.get('ResourceRecordSet', dict()).get(
+        'ResourceRecords') or [None]
+    upsert = change.get('Action', '').upper() == 'UPSERT'
+    return len(records) * (2 if upsert else 1)
+
+
+class _ChangeBatch(Batch):
+    '''Record set changes waiting to be sent to a hosted zone'''
+    def __init__(self, key):
+        Batch.__init__(self, key)
+        self.changes = list()
+        self.weight = 0
+
+    def add(self, request, now):
+        changes, weight = request
+        self.changes.extend(changes)
+        self.weight += weight
+        return Batch.add(self, changes, now)
+
+
+class ChangeBatcher(Batcher):
+    '''
+        Coalesces the record set changes of the concurrent operations of
+        a process (as run by "cfy local", see `Batcher`). The
+        changes of a hosted zone, made with the same client (clients are
+        cached per service and credentials), are sent in a single
+        change_resource_record_sets call, then the change is polled with
+        get_change until it is INSYNC. A batch is sent when it would go
+        over `max_changes`, when no change joined it for `linger` seconds,
+        or `window` seconds after its first change, whichever comes first.
+
+        Route53 applies the changes of a call all together or not at all.
+        When Route53 rejects the changes of a batch (InvalidChangeBatch),
+        the changes of every request are sent on their own so that only
+        the requests with invalid changes fail. Any other error is raised
+        by every request of the batch, and a failure to poll a change
+        which was accepted reports the change as it is.
+
+    :param int max_changes: Maximum weight of the changes of a call
+    :param float window: Maximum number of seconds a batch waits
+        for changes
+    :param float linger: Number of seconds a batch waits for
+        another change
+    :param int sync_delay: Number of seconds between get_change calls
+    :param int sync_budget: Number of seconds a change is polled before
+        it is reported as it is
+    :param callable clock: Returns the current time in seconds
+    :param callable sleep: Sleeps for a number of seconds
+    '''
+    def __init__(self, max_changes=ROUTE53_MAX_CHANGES,
+                 window=ROUTE53_CHANGE_WINDOW, linger=ROUTE53_CHANGE_LINGER,
+                 sync_delay=ROUTE53_SYNC_DELAY,
+                 sync_budget=ROUTE53_SYNC_BUDGET,
+                 clock=time.time, sleep=time.sleep):
+        Batcher.__init__(self, window, linger, clock)
+        self.max_changes = max_changes
+        self.sync_delay = sync_delay
+        self.sync_budget = sync_budget
+        self.sleep = sleep
+
+    def submit(self, client, zone_id, changes, comment=None):
+        '''
+            Changes record sets, together with the concurrent changes
+            of the hosted zone, and waits until they are INSYNC
+
+        :param client: A Boto3 Route53 client
+        :param str zone_id: ID of the hosted zone
+        :param list changes: Changes, as in a ChangeBatch
+        :param str comment: Comment of the ChangeBatch, only changes
+            with the same comment are batched together
+        :returns: Tuple of the ChangeInfo of the call, None if no change
+            was needed, and a report dict with the number of changes sent
+            and skipped (UPSERTs which would not change anything) and of
+            requests of the batch, and its latency, the seconds from the
+            call until it was INSYNC
+        '''
+        weight = sum(_weight(change) for change in changes)
+        return self._submit((shared_client(client), zone_id, comment),
+                            (changes, weight))
+
+    def _new_batch(self, key):
+        return _ChangeBatch(key)
+
+    def _fits(self, batch, request):
+        # Otherwise the batch is sent now, these changes start a new one
+        return batch.weight + request[1] <= self.max_changes
+
+    def _change(self, client, zone_id, comment, changes):
+        '''Sends changes and polls them until they are INSYNC'''
+        change_batch = dict(Changes=changes)
+        if comment:
+            change_batch['Comment'] = comment
+        started = self.clock()
+        self.calls += 1
+        info = client.change_resource_record_sets(
+            HostedZoneId=zone_id, ChangeBatch=change_batch)[CHANGE_INFO]
+        while info.get('Status') != INSYNC and \
+                self.clock() - started < self.sync_budget:
+            self.sleep(self.sync_delay)
+            self.calls += 1
+            try:
+                info = client.get_change(Id=info['Id'])[CHANGE_INFO]
+            except Exception:
+                # The changes were accepted, never send them again. The
+                # change is reported as it is, as when the budget is spent
+                break
+        return info, self.clock() - started
+
+    def _noops(self, client, zone_id, changes):
+        '''
+            Finds the UPSERTs which would not change anything, seeking to
+            every record set of a few UPSERTs, or indexing the hosted zone
+            for many
+
+        :returns: Set of the ids of the no-op changes
+        '''
+        upserts = [change for change in changes
+                   if change.get('Action', '').upper() == 'UPSERT']
+        if not upserts:
+            return set()
+        try:
+            if len(upserts) > ROUTE53_SEEK_MAX_UPSERTS:
+                find = RecordIndex(list_record_sets(client, zone_id)).get
+            else:
+                def find(name, record_type, set_identifier):
+                    return find_record_set(client, zone_id, name,
+                                           record_type, set_identifier)
+            noops = set()
+            for change in upserts:
+                record = change.get(RECORD_SET, dict())
+                if is_noop_upsert(change, find(
+                        record.get('Name'), record.get('Type'),
+                        record.get('SetIdentifier'))):
+                    noops.add(id(change))
+            return noops
+        except ClientError:
+            # Without the listing permission, send all the changes
+            return set()
+
+    def _send(self, client, zone_id, comment, changes, noops):
+        '''Sends the changes which are not no-ops, returns the results'''
+        sent = [change for change in changes if id(change) not in noops]
+        if not sent:
+            return None, dict(changes=0, skipped=len(changes), latency=0)
+        info, latency = self._change(client, zone_id, comment, sent)
+        return info, dict(changes=len(sent),
+                          skipped=len(changes) - len(sent), latency=latency)
+
+    def _flush(self, batch):
+        client, zone_id, comment = batch.key
+        noops = set()
+        try:
+            noops = self._noops(client, zone_id, batch.changes)
+            info, report = \
+                self._send(client, zone_id, comment, batch.changes, noops)
+        except Exception as error:
+            if len(batch.requests) == 1 or not _invalid_change_batch(error):
+                # Nothing was changed, and sending the changes again
+                # would not get through either
+                for index in range(len(batch.requests)):
+                    batch.errors[index] = error
+                return
+
+            def send(changes):
+                info, report = \
+                    self._send(client, zone_id, comment, changes, noops)
+                report['requests'] = 1
+                return info, report
+            self._send_apart(batch, send)
+            return
+        report['requests'] = len(batch.requests)
+        for index in range(len(batch.requests)):
+            batch.results[index] = (info, report)
+
+
+CHANGE_BATCHER = ChangeBatcher()
 
 
 class Route53HostedZone(Route53Base):
@@ -77,16 +390,61 @@ class Route53HostedZone(Route53Base):
         self.logger.debug('Response: %s' % res)
         return res['ChangeInfo']
 
+    def change_record_sets(self, changes, comment=None):
+        '''
+            Changes AWS Route53 Resource Record Sets of the hosted zone,
+            batched with the changes of concurrent operations, and waits
+            until the changes are INSYNC.
+        '''
+        self.logger.debug(
+            'Changing Route53 Resource Record Sets in %s %s: %s'
+            % (self.type_name, self.resource_id, changes))
+        info, report = CHANGE_BATCHER.submit(
+            self.client, self.resource_id, changes, comment)
+        if not info:
+            self.logger.info('Route53 Resource Record Sets are up to date.')
+            return info
+        self.logger.info(
+            'Route53 change %s (%d changes of %d operations, %d up to '
+            'date) was %s after %.1f seconds.'
+            % (info.get('Id'), report['changes'], report['requests'],
+               report['skipped'], info.get('Status'), report['latency']))
+        return info
+
     def list_resource_record_sets(self, params):
         '''
-            Gets a list of all AWS Route53 Resource Record Sets.
+            Gets a list of all AWS Route53 Resource Record Sets, from
+            every page. MaxItems sets the number of records per call.
         '''
         self.logger.debug(
             'Listing Route53 Resource Record Sets in %s with parameters: %s'
             % (self.type_name, params))
-        res = self.client.list_resource_record_sets(**params)
-        self.logger.debug('Response: %s' % res)
-        return res['ResourceRecordSets']
+        params = params.copy()
+        zone_id = params.pop('HostedZoneId', self.resource_id)
+        page_size = params.pop('MaxItems', ROUTE53_LIST_PAGE_SIZE)
+        res = list(list_record_sets(self.client, zone_id,
+                                    page_size=page_size, **params))
+        self.logger.debug('Listed %d Resource Record Sets.' % len(res))
+        return res
+
+    def get_resource_record_set(self, name, record_type,
+                                set_identifier=None):
+        '''
+            Gets an AWS Route53 Resource Record Set, seeking to it
+            instead of listing the hosted zone.
+        '''
+        return find_record_set(self.client, self.resource_id, name,
+                               record_type, set_identifier)
+
+    def index_resource_record_sets(self):
+        '''
+            Indexes all AWS Route53 Resource Record Sets of the hosted
+            zone by name, type and set identifier.
+        '''
+        index = RecordIndex(list_record_sets(self.client, self.resource_id))
+        self.logger.debug('Indexed %d Resource Record Sets of %s %s.'
+                          % (len(index), self.type_name, self.resource_id))
+        return index
 
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
@@ -123,22 +481,28 @@ def delete(ctx, iface, resource_config, resource_type,
         ctx.logger.warn(
             'Attempting to purge all Resource Record Sets from the %s'
             % resource_type)
-        # Iterate over all Record Sets
+        # Delete all Record Sets, but the default types, in as few
+        # calls as the change limit allows
+        changes = list()
+        weight = 0
         for record in iface.list_resource_record_sets(dict(
                 HostedZoneId=iface.resource_id,
                 MaxItems='100')):
             # Skip default record types
             if record['Type'] in ['NS', 'SOA']:
                 continue
-            # Delete the Record Set
+            change = dict(Action='DELETE', ResourceRecordSet=record)
+            if changes and weight + _weight(change) > ROUTE53_MAX_CHANGES:
+                iface.change_resource_record_sets(dict(
+                    HostedZoneId=iface.resource_id,
+                    ChangeBatch=dict(Changes=changes)))
+                changes, weight = list(), 0
+            changes.append(change)
+            weight += _weight(change)
+        if changes:
             iface.change_resource_record_sets(dict(
                 HostedZoneId=iface.resource_id,
-                ChangeBatch=dict(
-                    Changes=[dict(
-                        Action='DELETE',
-                        ResourceRecordSet=record)])))
-            # Sleep to avoid hitting AWS throttling / limits
-            sleep(1)
+                ChangeBatch=dict(Changes=changes)))
     iface.delete(resource_config)
 
 
@@ -36,12 +36,15 @@ def prepare(ctx, resource_config, **_):
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
 def create(ctx, resource_config, **_):
     '''Creates an AWS Route53 Resource Record Set'''
+    params = ctx.instance.runtime_properties['resource_config'] or dict()
+    change_batch = params.get('ChangeBatch') or dict()
     Route53HostedZone(
         ctx.node,
-        resource_id=utils.get_resource_id(raise_on_missing=True),
+        resource_id=params.get('HostedZoneId') or
+        utils.get_resource_id(raise_on_missing=True),
         logger=ctx.logger
-    ).change_resource_record_sets(
-        ctx.instance.runtime_properties['resource_config'] or dict())
+    ).change_record_sets(
+        change_batch.get('Changes', list()), change_batch.get('Comment'))
 
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
@@ -62,14 +65,11 @@ def delete(ctx, resource_config, resource_type, **_):
         return
     Route53HostedZone(
         ctx.node,
-        resource_id=utils.get_resource_id(raise_on_missing=True),
+        resource_id=params['HostedZoneId'],
         logger=ctx.logger
-    ).change_resource_record_sets(dict(
-        HostedZoneId=params['HostedZoneId'],
-        ChangeBatch=dict(
-            Changes=[dict(
-                Action='DELETE',
-                ResourceRecordSet=change['ResourceRecordSet'])])))
+    ).change_record_sets([dict(
+        Action='DELETE',
+        ResourceRecordSet=change['ResourceRecordSet'])])
 
 
 @decorators.aws_relationship(resource_type=RESOURCE_TYPE)
@@ -14,10 +14,15 @@
 #    * limitations under the License.
 
 import unittest
+from functools import partial
 from mock import patch, MagicMock
-from cloudify_awssdk.common.tests.test_base import TestBase, mock_decorator
+from cloudify_awssdk.common.tests.test_base import (
+    TestBase,
+    mock_decorator,
+    run_concurrently)
 from cloudify_awssdk.route53.resources import hosted_zone
 from cloudify_awssdk.common import constants
+from botocore.exceptions import ClientError, EndpointConnectionError
 
 PATCH_PREFIX = 'cloudify_awssdk.route53.resources.hosted_zone.'
 
@@ -129,15 +134,99 @@ class TestHostedZone(TestBase):
         res = route.change_resource_record_sets(params)
         self.assertEqual(res, "changed")
 
+    def test_class_change_record_sets(self):
+        client = MagicMock()
+        client.change_resource_record_sets = self.mock_return(
+            {'ChangeInfo': {'Id': 'c1', 'Status': 'INSYNC'}})
+        route = hosted_zone.Route53HostedZone(None, 'zone', client,
+                                              MagicMock())
+        changes = [{'Action': 'CREATE', 'ResourceRecordSet': {}}]
+        with patch(PATCH_PREFIX + 'CHANGE_BATCHER',
+                   hosted_zone.ChangeBatcher(window=0)):
+            res = route.change_record_sets(changes, 'comment')
+        self.assertEqual(res, {'Id': 'c1', 'Status': 'INSYNC'})
+        client.change_resource_record_sets.assert_called_with(
+            HostedZoneId='zone',
+            ChangeBatch={'Changes': changes, 'Comment': 'comment'})
+        self.assertTrue(route.logger.info.called)
+
+    def test_weight(self):
+        record = {'ResourceRecords': [{'Value': '1'}, {'Value': '2'}]}
+        self.assertEqual(hosted_zone._weight(
+            {'Action': 'CREATE', 'ResourceRecordSet': record}), 2)
+        self.assertEqual(hosted_zone._weight(
+            {'Action': 'UPSERT', 'ResourceRecordSet': record}), 4)
+        self.assertEqual(hosted_zone._weight(
+            {'Action': 'DELETE', 'ResourceRecordSet': {}}), 1)
+
     def test_class_list_resource(self):
         res_id = "test_resource"
-        params = {'ResourceRecordSets': 'listed'}
-        client = self.make_client_function("list_resource_record_sets",
-                                           return_value=params)
+        client = MagicMock()
+        client.list_resource_record_sets = MagicMock(side_effect=[
+            {'ResourceRecordSets': [{'Name': 'a.'}], 'IsTruncated': True,
+             'NextRecordName': 'b.', 'NextRecordType': 'A'},
+            {'ResourceRecordSets': [{'Name': 'b.'}], 'IsTruncated': False}])
         route = hosted_zone.Route53HostedZone(None, res_id, client,
                                               MagicMock())
-        res = route.list_resource_record_sets(params)
-        self.assertEqual(res, "listed")
+        res = route.list_resource_record_sets(
+            {'HostedZoneId': 'zone', 'MaxItems': '1'})
+        self.assertEqual(res, [{'Name': 'a.'}, {'Name': 'b.'}])
+        client.list_resource_record_sets.assert_called_with(
+            HostedZoneId='zone', MaxItems='1', StartRecordName='b.',
+            StartRecordType='A')
+
+    def test_class_get_resource_record_set(self):
+        client = MagicMock()
+        client.list_resource_record_sets = self.mock_return(
+            {'ResourceRecordSets': [
+                {'Name': 'www.example.com.', 'Type': 'A',
+                 'SetIdentifier': 'blue'},
+                {'Name': 'www.example.com.', 'Type': 'A',
+                 'SetIdentifier': 'green'},
+                {'Name': 'www.example.com.', 'Type': 'AAAA'}],
+             'IsTruncated': False})
+        route = hosted_zone.Route53HostedZone(None, 'zone', client,
+                                              MagicMock())
+        res = route.get_resource_record_set('WWW.example.com', 'A', 'green')
+        self.assertEqual(res['SetIdentifier'], 'green')
+        client.list_resource_record_sets.assert_called_with(
+            HostedZoneId='zone', MaxItems='10',
+            StartRecordName='www.example.com.', StartRecordType='A')
+        # Listed past the name and type
+        self.assertIsNone(route.get_resource_record_set(
+            'www.example.com', 'A', 'red'))
+
+    def test_class_index_resource_record_sets(self):
+        client = MagicMock()
+        client.list_resource_record_sets = self.mock_return(
+            {'ResourceRecordSets': [
+                {'Name': '\\052.example.com.', 'Type': 'CNAME'},
+                {'Name': 'example.com.', 'Type': 'NS'}],
+             'IsTruncated': False})
+        route = hosted_zone.Route53HostedZone(None, 'zone', client,
+                                              MagicMock())
+        index = route.index_resource_record_sets()
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get('*.example.com', 'CNAME')['Type'],
+                         'CNAME')
+        self.assertIsNone(index.get('example.com', 'SOA'))
+
+    def test_is_noop_upsert(self):
+        existing = {'Name': 'www.example.com.', 'Type': 'A', 'TTL': 60,
+                    'ResourceRecords': [{'Value': '10.0.0.1'},
+                                        {'Value': '10.0.0.2'}]}
+        record = {'Name': 'www.example.com', 'Type': 'A', 'TTL': 60,
+                  'ResourceRecords': [{'Value': '10.0.0.2'},
+                                      {'Value': '10.0.0.1'}]}
+        self.assertTrue(hosted_zone.is_noop_upsert(
+            {'Action': 'UPSERT', 'ResourceRecordSet': record}, existing))
+        self.assertFalse(hosted_zone.is_noop_upsert(
+            {'Action': 'UPSERT', 'ResourceRecordSet': record}, None))
+        self.assertFalse(hosted_zone.is_noop_upsert(
+            {'Action': 'CREATE', 'ResourceRecordSet': record}, existing))
+        self.assertFalse(hosted_zone.is_noop_upsert(
+            {'Action': 'UPSERT',
+             'ResourceRecordSet': dict(record, TTL=300)}, existing))
 
     def test_prepare(self):
         ctx = self._get_ctx()
@@ -178,6 +267,18 @@ class TestHostedZone(TestBase):
         self.assertTrue(iface.delete.called)
         self.assertTrue(iface.change_resource_record_sets.called)
 
+        # deleted in as few calls as possible
+        iface.change_resource_record_sets = MagicMock()
+        iface.list_resource_record_sets = self.mock_return(
+            [{'Type': 'A'}, {'Type': 'NS'}, {'Type': 'CNAME'}])
+        hosted_zone.delete(ctx, iface, resource_config, 'rest_type', True)
+        iface.change_resource_record_sets.assert_called_once_with({
+            'HostedZoneId': iface.resource_id,
+            'ChangeBatch': {'Changes': [
+                {'Action': 'DELETE', 'ResourceRecordSet': {'Type': 'A'}},
+                {'Action': 'DELETE',
+                 'ResourceRecordSet': {'Type': 'CNAME'}}]}})
+
     def test_prepare_assoc(self):
         ctx = self._get_relationship_context()
         ctx.source.instance.runtime_properties['resource_config'] = {'VPC': {}}
@@ -219,5 +320,181 @@ class TestHostedZone(TestBase):
         self.assertEqual(res, 'regname')
 
 
+def _change(name, action='CREATE'):
+    return {'Action': action, 'ResourceRecordSet': {
+        'Name': name, 'ResourceRecords': [{'Value': '10.0.0.1'}]}}
+
+
+class TestChangeBatcher(unittest.TestCase):
+
+    def setUp(self):
+        super(TestChangeBatcher, self).setUp()
+        self.now = 0
+        self.client = MagicMock()
+        self.client.change_resource_record_sets = MagicMock(
+            return_value={'ChangeInfo': {'Id': 'c1', 'Status': 'PENDING'}})
+        self.client.get_change = MagicMock(side_effect=[
+            {'ChangeInfo': {'Id': 'c1', 'Status': 'PENDING'}},
+            {'ChangeInfo': {'Id': 'c1', 'Status': 'INSYNC'}}])
+        self.client.list_resource_record_sets = MagicMock(
+            return_value={'ResourceRecordSets': [], 'IsTruncated': False})
+
+    def _sleep(self, seconds):
+        self.now += seconds
+
+    def _submit_concurrently(self, batcher, requests):
+        return run_concurrently([
+            partial(batcher.submit, self.client, 'zone', changes)
+            for changes in requests])
+
+    def test_submit_waits_insync(self):
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, sync_delay=5, clock=lambda: self.now,
+            sleep=self._sleep)
+        info, report = batcher.submit(self.client, 'zone', [_change('a')])
+        self.assertEqual(info, {'Id': 'c1', 'Status': 'INSYNC'})
+        self.assertEqual(report, {'changes': 1, 'skipped': 0,
+                                  'requests': 1, 'latency': 10})
+        self.assertEqual(self.client.get_change.call_count, 2)
+        self.client.get_change.assert_called_with(Id='c1')
+
+    def test_submit_sync_budget(self):
+        self.client.get_change = MagicMock(
+            return_value={'ChangeInfo': {'Id': 'c1', 'Status': 'PENDING'}})
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, sync_delay=5, sync_budget=12, clock=lambda: self.now,
+            sleep=self._sleep)
+        info, _ = batcher.submit(self.client, 'zone', [_change('a')])
+        self.assertEqual(info['Status'], 'PENDING')
+        self.assertEqual(self.client.get_change.call_count, 3)
+
+    def test_submit_coalesces(self):
+        self.client.change_resource_record_sets = MagicMock(
+            return_value={'ChangeInfo': {'Id': 'c1', 'Status': 'INSYNC'}})
+        batcher = hosted_zone.ChangeBatcher(window=0.5, linger=0.5)
+        results = self._submit_concurrently(
+            batcher, [[_change('a')], [_change('b')], [_change('c')]])
+        self.assertEqual(self.client.change_resource_record_sets.call_count,
+                         1)
+        changes = self.client.change_resource_record_sets.call_args[1][
+            'ChangeBatch']['Changes']
+        self.assertEqual(sorted(c['ResourceRecordSet']['Name']
+                                for c in changes), ['a', 'b', 'c'])
+        for info, report in results.values():
+            self.assertEqual(info['Id'], 'c1')
+            self.assertEqual(report['requests'], 3)
+
+    def test_submit_max_changes(self):
+        self.client.change_resource_record_sets = MagicMock(
+            return_value={'ChangeInfo': {'Id': 'c1', 'Status': 'INSYNC'}})
+        # An UPSERT counts twice
+        batcher = hosted_zone.ChangeBatcher(max_changes=2, window=0.5,
+                                            linger=0.5)
+        self._submit_concurrently(
+            batcher, [[_change('a', 'UPSERT')], [_change('b', 'UPSERT')]])
+        self.assertEqual(self.client.change_resource_record_sets.call_count,
+                         2)
+
+    def test_submit_skips_noop_upserts(self):
+        self.client.list_resource_record_sets = MagicMock(return_value={
+            'ResourceRecordSets': [_change('a.')['ResourceRecordSet']],
+            'IsTruncated': False})
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, clock=lambda: self.now, sleep=self._sleep)
+        info, report = batcher.submit(
+            self.client, 'zone',
+            [_change('a', 'UPSERT'), _change('b', 'UPSERT')])
+        self.assertEqual(report['changes'], 1)
+        self.assertEqual(report['skipped'], 1)
+        changes = self.client.change_resource_record_sets.call_args[1][
+            'ChangeBatch']['Changes']
+        self.assertEqual([c['ResourceRecordSet']['Name'] for c in changes],
+                         ['b'])
+        # Nothing left to change
+        self.client.change_resource_record_sets.reset_mock()
+        info, report = batcher.submit(
+            self.client, 'zone', [_change('a', 'UPSERT')])
+        self.assertIsNone(info)
+        self.assertFalse(self.client.change_resource_record_sets.called)
+
+    @patch(PATCH_PREFIX + 'ROUTE53_SEEK_MAX_UPSERTS', 1)
+    def test_submit_indexes_many_upserts(self):
+        self.client.list_resource_record_sets = MagicMock(return_value={
+            'ResourceRecordSets': [_change('a.')['ResourceRecordSet']],
+            'IsTruncated': False})
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, clock=lambda: self.now, sleep=self._sleep)
+        _, report = batcher.submit(
+            self.client, 'zone',
+            [_change('a', 'UPSERT'), _change('b', 'UPSERT')])
+        self.assertEqual(report['skipped'], 1)
+        # A single scan of the hosted zone, no seek
+        self.client.list_resource_record_sets.assert_called_once_with(
+            HostedZoneId='zone', MaxItems='300')
+
+    def test_submit_without_list_permission(self):
+        self.client.list_resource_record_sets = MagicMock(
+            side_effect=ClientError({'Error': {}}, 'list'))
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, clock=lambda: self.now, sleep=self._sleep)
+        _, report = batcher.submit(
+            self.client, 'zone', [_change('a', 'UPSERT')])
+        self.assertEqual(report['changes'], 1)
+
+    def test_submit_invalid_change(self):
+        def change_resource_record_sets(HostedZoneId, ChangeBatch):
+            for change in ChangeBatch['Changes']:
+                if change['ResourceRecordSet']['Name'] == 'bad':
+                    raise ClientError(
+                        {'Error': {'Code': 'InvalidChangeBatch'}}, 'change')
+            return {'ChangeInfo': {'Id': 'c1', 'Status': 'INSYNC'}}
+        self.client.change_resource_record_sets = MagicMock(
+            side_effect=change_resource_record_sets)
+        batcher = hosted_zone.ChangeBatcher(window=0.5, linger=0.5)
+        results = self._submit_concurrently(
+            batcher, [[_change('a')], [_change('bad')]])
+        # The batch, then every request on its own
+        self.assertEqual(self.client.change_resource_record_sets.call_count,
+                         3)
+        self.assertEqual(results[0][1]['requests'], 1)
+        self.assertIsInstance(results[1], ClientError)
+
+    def test_submit_change_error(self):
+        error = ClientError({'Error': {'Code': 'Throttling'}}, 'change')
+        self.client.change_resource_record_sets = MagicMock(
+            side_effect=error)
+        batcher = hosted_zone.ChangeBatcher(window=0.5, linger=0.5)
+        results = self._submit_concurrently(
+            batcher, [[_change('a')], [_change('b')]])
+        # Not an invalid change, the changes are not sent on their own
+        self.assertEqual(self.client.change_resource_record_sets.call_count,
+                         1)
+        self.assertIs(results[0], error)
+        self.assertIs(results[1], error)
+
+    def test_submit_get_change_error(self):
+        self.client.get_change = MagicMock(side_effect=ClientError(
+            {'Error': {'Code': 'Throttling'}}, 'get_change'))
+        batcher = hosted_zone.ChangeBatcher(
+            window=0.5, linger=0.5, sync_delay=0)
+        results = self._submit_concurrently(
+            batcher, [[_change('a')], [_change('b')]])
+        # The accepted changes are never sent again
+        self.assertEqual(self.client.change_resource_record_sets.call_count,
+                         1)
+        for info, report in results.values():
+            self.assertEqual(info, {'Id': 'c1', 'Status': 'PENDING'})
+            self.assertEqual(report['requests'], 2)
+
+    def test_submit_list_error(self):
+        error = EndpointConnectionError(endpoint_url='https://route53')
+        self.client.list_resource_record_sets = MagicMock(side_effect=error)
+        batcher = hosted_zone.ChangeBatcher(
+            window=0, clock=lambda: self.now, sleep=self._sleep)
+        with self.assertRaises(EndpointConnectionError):
+            batcher.submit(self.client, 'zone', [_change('a', 'UPSERT')])
+        self.assertFalse(self.client.change_resource_record_sets.called)
+
+
 if __name__ == '__main__':
     unittest.main()
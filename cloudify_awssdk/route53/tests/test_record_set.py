@@ -75,6 +75,19 @@ class TestRecordSet(TestBase):
             record_set.create(ctx, {})
             self.assertTrue(zone.called)
 
+        ctx = self._get_ctx()
+        ctx.instance.runtime_properties['resource_config'] = {
+            'HostedZoneId': 'zid',
+            'ChangeBatch': {'Changes': [{'ResourceRecordSet': 'rec_set',
+                                         'Action': 'CREATE'}]}}
+        with patch(PATCH_PREFIX + 'utils'), \
+                patch(PATCH_PREFIX + 'Route53HostedZone') as zone:
+            record_set.create(ctx, {})
+            self.assertEqual(zone.call_args[1]['resource_id'], 'zid')
+            zone.return_value.change_record_sets.assert_called_with(
+                [{'ResourceRecordSet': 'rec_set', 'Action': 'CREATE'}],
+                None)
+
     def test_delete(self):
         ctx = self._get_ctx()
         with patch(PATCH_PREFIX + 'utils'), \
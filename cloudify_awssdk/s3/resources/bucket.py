@@ -17,8 +17,17 @@
     ~~~~~~~~~~~~~~
     AWS S3 Bucket interface
 """
+# Standard imports
+import time
+from concurrent import futures
+
 # Cloudify
+from cloudify.exceptions import NonRecoverableError, OperationRetry
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.constants import (
+    S3_DELETE_BATCH_SIZE,
+    S3_DELETE_THREADS,
+    S3_EMPTY_BUDGET)
 from cloudify_awssdk.s3 import S3Base
 # Boto
 from botocore.exceptions import ClientError
@@ -26,6 +35,7 @@ from botocore.exceptions import ClientError
 RESOURCE_TYPE = 'S3 Bucket'
 RESOURCE_NAME = 'Bucket'
 LOCATION = 'Location'
+DELETED_OBJECTS = 'deleted_objects'
 
 
 class S3Bucket(S3Base):
@@ -41,23 +51,20 @@ class S3Bucket(S3Base):
     @property
     def properties(self):
         """Gets the properties of an external resource"""
+        if not self.resource_id:
+            return None
         try:
-            resources = self.client.list_buckets()
+            self.client.head_bucket(Bucket=self.resource_id)
         except ClientError:
-            pass
-        else:
-            for resource in resources:
-                if resource.get(RESOURCE_NAME) is self.resource_id:
-                    return resource
             return None
+        return {RESOURCE_NAME: self.resource_id}
 
     @property
     def status(self):
         """Gets the status of an external resource"""
-        props = self.properties
-        if not props:
-            return None
-        return props['Status']
+        if self.properties:
+            return 'available'
+        return None
 
     def create(self, params):
         """
@@ -73,19 +80,93 @@ class S3Bucket(S3Base):
                           % (self.type_name, params))
         self.client.delete_bucket(**params)
 
-    def delete_objects(self, bucket):
-        list_objects = self.client.list_objects(Bucket=bucket)
-        for object in list_objects.get('Contents', []):
-            key = object.get('Key')
-            if key:
-                self.logger.debug(
-                    'Deleting object {0} from bucket {1}.'
-                    .format(key, bucket))
-                delete_object = \
-                    self.client.delete_object(
-                        Bucket=bucket, Key=key)
-                self.logger.debug(
-                    'Response {0}'.format(delete_object))
+    def list_object_batches(self, bucket):
+        """
+            Lists the objects of a bucket, including all object versions
+            and delete markers of versioned buckets.
+        :returns: Generator of lists of up to 1000 `ObjectIdentifier`
+        """
+        versioning = self.client.get_bucket_versioning(Bucket=bucket)
+        pagination = dict(PageSize=S3_DELETE_BATCH_SIZE)
+        if versioning.get('Status') in ['Enabled', 'Suspended']:
+            pages = self.client.get_paginator('list_object_versions') \
+                .paginate(Bucket=bucket, PaginationConfig=pagination)
+            for page in pages:
+                objects = [
+                    dict(Key=version['Key'], VersionId=version['VersionId'])
+                    for version in page.get('Versions', []) +
+                    page.get('DeleteMarkers', [])]
+                # A page holds up to 1000 versions and 1000 delete markers
+                for i in range(0, len(objects), S3_DELETE_BATCH_SIZE):
+                    yield objects[i:i + S3_DELETE_BATCH_SIZE]
+        else:
+            pages = self.client.get_paginator('list_objects_v2') \
+                .paginate(Bucket=bucket, PaginationConfig=pagination)
+            for page in pages:
+                objects = [dict(Key=content['Key'])
+                           for content in page.get('Contents', [])]
+                if objects:
+                    yield objects
+
+    def delete_object_batch(self, bucket, objects):
+        """
+            Deletes up to 1000 objects with a single call.
+        :returns: List of errors
+        """
+        response = self.client.delete_objects(
+            Bucket=bucket, Delete=dict(Objects=objects, Quiet=True))
+        return response.get('Errors', [])
+
+    def delete_objects(self, bucket, deadline=None, progress=None):
+        """
+            Empties a bucket. Objects are listed page by page and every
+            page is deleted with one call, spreading the calls over a
+            bounded thread pool.
+        :param str bucket: Bucket name
+        :param float deadline: Time after which no more objects are
+            deleted, so that the caller can retry later
+        :param callable progress: Called with the number of deleted
+            objects after every batch
+        :returns: `True` if the bucket was emptied, `False` if the
+            deadline was reached first
+        """
+        deleted = [0]
+        errors = []
+
+        def collect(done):
+            for future in done:
+                objects, batch_errors = future.result()
+                deleted[0] += objects - len(batch_errors)
+                errors.extend(batch_errors)
+                self.logger.debug('Deleted {0} objects from bucket {1}.'
+                                  .format(deleted[0], bucket))
+                if progress:
+                    progress(deleted[0])
+
+        def delete_batch(objects):
+            return len(objects), self.delete_object_batch(bucket, objects)
+
+        emptied = True
+        executor = futures.ThreadPoolExecutor(max_workers=S3_DELETE_THREADS)
+        pending = set()
+        try:
+            for objects in self.list_object_batches(bucket):
+                if deadline and time.time() > deadline:
+                    emptied = False
+                    break
+                if len(pending) >= S3_DELETE_THREADS:
+                    done, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(delete_batch, objects))
+            collect(futures.wait(pending)[0])
+        finally:
+            executor.shutdown(wait=True)
+        if errors:
+            raise NonRecoverableError(
+                'Failed to delete {0} objects from bucket {1}, first error: '
+                '{2}'.format(len(errors), bucket, errors[0]))
+        return emptied
 
 
 @decorators.aws_resource(resource_type=RESOURCE_TYPE)
@@ -134,6 +215,23 @@ def delete(ctx, iface, resource_config, **_):
         bucket = iface.resource_id
         params.update({RESOURCE_NAME: bucket})
 
+    # Empty the bucket first, carrying on over retries for large buckets
+    deleted = ctx.instance.runtime_properties.get(DELETED_OBJECTS, 0)
+
+    def progress(count):
+        ctx.instance.runtime_properties[DELETED_OBJECTS] = deleted + count
+
+    if not iface.delete_objects(bucket,
+                                deadline=time.time() + S3_EMPTY_BUDGET,
+                                progress=progress):
+        # Carry on right away, there is no resource state to wait for
+        raise OperationRetry(
+            '%s "%s" is still being emptied, %d objects deleted so far.'
+            % (iface.type_name, bucket,
+               ctx.instance.runtime_properties.get(DELETED_OBJECTS, 0)),
+            retry_after=1)
+
     # Actually delete the resource
-    iface.delete_objects(bucket)
     iface.delete(params)
+    if DELETED_OBJECTS in ctx.instance.runtime_properties:
+        del ctx.instance.runtime_properties[DELETED_OBJECTS]
@@ -18,14 +18,19 @@
     AWS S3 Bucket Object interface
 """
 # Standard Imports
+import hashlib
+import os
 import sys
-import tempfile
-import urllib
+from concurrent import futures
 
 # Third Party Imports
-from botocore.exceptions import ClientError
+import requests
+import six
+from botocore.exceptions import BotoCoreError, ClientError
+from requests.packages.urllib3.exceptions import HTTPError as Urllib3Error
 from cloudify.exceptions import (
     NonRecoverableError,
+    OperationRetry,
     HttpException,
 )
 from cloudify import ctx
@@ -34,7 +39,12 @@ from cloudify.utils import exception_to_error_cause
 # Local Imports
 from cloudify_awssdk.common import decorators, utils
 from cloudify_awssdk.s3 import S3Base
-from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ID
+from cloudify_awssdk.common.constants import (
+    EXTERNAL_RESOURCE_ID,
+    S3_MULTIPART_CONCURRENCY,
+    S3_MULTIPART_MIN_PART_SIZE,
+    S3_MULTIPART_PART_SIZE,
+    S3_READ_BUFFER_SIZE)
 
 RESOURCE_TYPE = 'S3 Bucket Object'
 BUCKET = 'Bucket'
@@ -47,6 +57,18 @@ OBJECT_SOURCE_TYPE = 'source_type'
 OBJECT_LOCAL_SOURCE = 'local'
 OBJECT_REMOTE_SOURCE = 'remote'
 OBJECT_BYTES_SOURCE = 'bytes'
+OBJECT_MULTIPART = 'multipart'
+
+# Runtime property holding the state of an unfinished multipart upload
+MULTIPART_UPLOAD = 'multipart_upload'
+UPLOAD_ID = 'UploadId'
+PART_SIZE = 'PartSize'
+PARTS = 'Parts'
+# Object metadata holding the checksum computed before the upload, for
+# objects whose ETag is not an MD5 digest (like SSE-KMS encrypted ones)
+CHECKSUM_METADATA = 'cloudify-checksum'
+# put_object parameters which create_multipart_upload does not take
+NOT_MULTIPART_PARAMS = [BUCKET_OBJECT_BODY, 'ContentLength', 'ContentMD5']
 
 
 class S3BucketObject(S3Base):
@@ -58,9 +80,9 @@ class S3BucketObject(S3Base):
         S3Base.__init__(self, ctx_node, aws_config,
                         resource_id, client, logger)
         self.type_name = RESOURCE_TYPE
-        self.resource_config = self.get_resource_config(ctx_node)
-        self._bucket_name = self.resource_config[BUCKET] if \
-            self.resource_config.get(BUCKET) else None
+        # Nodes of other types stage objects without a resource_config
+        self.resource_config = self.get_resource_config(ctx_node) or dict()
+        self._bucket_name = self.resource_config.get(BUCKET) or None
 
     def get_resource_config(self, node):
         return node.properties['resource_config']['kwargs'] if \
@@ -110,38 +132,228 @@ class S3BucketObject(S3Base):
                           .format(self.type_name, params))
         self.client.delete_object(**params)
 
+    def is_current(self, params, checksum):
+        """
+            Checks if the object already exists with the same content.
+        :param dict params: Parameters with the bucket and object key
+        :param str checksum: ETag the object would get when uploaded
+        :returns: `True` or `False`
+        """
+        try:
+            resource = self.client.head_object(
+                **{OBJECT_KEY: params[OBJECT_KEY], BUCKET: params[BUCKET]})
+        except ClientError:
+            return False
+        return checksum in [
+            resource.get('ETag', '').strip('"'),
+            resource.get('Metadata', dict()).get(CHECKSUM_METADATA)]
 
-def _read_file_chunks(file_object, chunk_size=1024):
-    while True:
-        response = file_object.read(chunk_size)
-        if not response:
+    def list_parts(self, params, upload_id):
+        """
+            Lists the uploaded parts of a multipart upload.
+        :returns: Dict of part number to ETag, or None if the upload
+            no longer exists
+        """
+        parts = dict()
+        try:
+            pages = self.client.get_paginator('list_parts').paginate(
+                Bucket=params[BUCKET], Key=params[OBJECT_KEY],
+                UploadId=upload_id)
+            for page in pages:
+                for part in page.get(PARTS, []):
+                    parts[part['PartNumber']] = part['ETag']
+        except ClientError as error:
+            if error.response['Error'].get('Code') == 'NoSuchUpload':
+                return None
+            raise
+        return parts
+
+    def upload_part(self, params, upload_id, number, data):
+        """
+            Uploads a part of a multipart upload.
+        :returns: ETag of the part
+        """
+        return self.client.upload_part(
+            Bucket=params[BUCKET], Key=params[OBJECT_KEY],
+            UploadId=upload_id, PartNumber=number, Body=data)['ETag']
+
+    def abort_upload(self, params, upload_id):
+        """
+            Aborts a multipart upload, dropping its uploaded parts.
+        """
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=params[BUCKET], Key=params[OBJECT_KEY],
+                UploadId=upload_id)
+        except ClientError:
+            pass
+
+    def upload(self, params, stream, state,
+               part_size=S3_MULTIPART_PART_SIZE,
+               concurrency=S3_MULTIPART_CONCURRENCY):
+        """
+            Uploads an object from a stream. Objects smaller than one part
+            are uploaded with put_object, others with a multipart upload
+            whose parts are read from the stream and uploaded
+            concurrently.
+        :param dict params: put_object parameters, without Body
+        :param stream: File-like object to read the object from
+        :param dict state: State of the multipart upload, updated as
+            parts are uploaded. Passing back the state of an unfinished
+            upload resumes it, skipping the uploaded parts.
+        :param int part_size: Size of every part but the last one
+        :param int concurrency: Maximum number of parts uploaded at once
+        """
+        upload_id = state.get(UPLOAD_ID)
+        done = self.list_parts(params, upload_id) if upload_id else None
+        first = None
+        if done is None:
+            # Start over
+            state.clear()
+            first = _read_part(stream, part_size)
+            if len(first) < part_size:
+                return self.create(dict(params, **{BUCKET_OBJECT_BODY: first}))
+            upload_id = self.client.create_multipart_upload(
+                **dict((k, v) for k, v in params.items()
+                       if k not in NOT_MULTIPART_PARAMS))[UPLOAD_ID]
+            state.update({UPLOAD_ID: upload_id, PART_SIZE: part_size,
+                          PARTS: list()})
+            done = dict()
+        else:
+            # Parts must keep their boundaries
+            part_size = state[PART_SIZE]
+            self.logger.debug('Resuming upload {0} of {1}, {2} parts done.'
+                              .format(upload_id, params[OBJECT_KEY],
+                                      len(done)))
+        state[PARTS] = [dict(PartNumber=number, ETag=etag)
+                        for number, etag in sorted(done.items())]
+
+        def collect(finished):
+            for future in finished:
+                state[PARTS].append(future.result())
+
+        def upload_part(number, data):
+            return dict(PartNumber=number,
+                        ETag=self.upload_part(params, upload_id, number, data))
+
+        executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+        pending = set()
+        number = 1
+        try:
+            while True:
+                if number in done:
+                    _skip(stream, part_size)
+                    number += 1
+                    continue
+                data = first if number == 1 and first is not None \
+                    else _read_part(stream, part_size)
+                if not data:
+                    break
+                if len(pending) >= concurrency:
+                    finished, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(executor.submit(upload_part, number, data))
+                number += 1
+                if len(data) < part_size:
+                    break
+            finished, pending = futures.wait(pending)
+            collect(finished)
+        finally:
+            executor.shutdown(wait=True)
+
+        response = self.client.complete_multipart_upload(
+            Bucket=params[BUCKET], Key=params[OBJECT_KEY],
+            UploadId=upload_id,
+            MultipartUpload={PARTS: sorted(
+                state[PARTS], key=lambda part: part['PartNumber'])})
+        state.clear()
+        return response
+
+
+def _read_part(stream, size):
+    """Reads `size` bytes from a stream, or less at the end of it"""
+    chunks = list()
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
             break
-        yield response
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
 
 
-def _download_remote_file(file_url):
+def _checksum(stream, part_size=None):
     """
-    Try to download the file provided by the blueprint so because
-    execution directory on a manager is not the blueprint root and want to
-    make sure file is accessible by manager context
+    Computes the ETag S3 gives an object uploaded by
+    `S3BucketObject.upload`: the MD5 digest of objects smaller than one
+    part, otherwise the MD5 digest of the MD5 digests of the parts
+    followed by the number of parts
+
+    :param stream: File-like object, read to the end
+    :param int part_size: Part size, or None for a single part
+    :return: ``str``: checksum
+    """
+    digests = list()
+    size = 0
+    while True:
+        digest = hashlib.md5()
+        part = 0
+        while part_size is None or part < part_size:
+            chunk = stream.read(S3_READ_BUFFER_SIZE if part_size is None
+                                else min(part_size - part,
+                                         S3_READ_BUFFER_SIZE))
+            if not chunk:
+                break
+            digest.update(chunk)
+            part += len(chunk)
+        if part or not digests:
+            digests.append(digest)
+        size += part
+        if part_size is None or part < part_size:
+            break
+    if part_size is None or size < part_size:
+        return digests[0].hexdigest()
+    return '{0}-{1}'.format(
+        hashlib.md5(b''.join(d.digest() for d in digests)).hexdigest(),
+        len(digests))
 
-    :param file_url: ``str``: file path under blueprint root,
-    :return: file path which can be accessed by cloudify manager
 
-    """
-    # Make temp file to write file to
-    _, file_path = tempfile.mkstemp()
+def _skip(stream, size):
+    """Skips `size` bytes of a stream"""
+    try:
+        stream.seek(size, os.SEEK_CUR)
+        return
+    except (AttributeError, IOError, ValueError):
+        pass
+    while size > 0:
+        chunk = stream.read(min(size, S3_READ_BUFFER_SIZE))
+        if not chunk:
+            break
+        size -= len(chunk)
+
 
-    # Try to download and read file url
-    target_file = urllib.urlopen(file_url)
+def _open_remote_file(file_url):
+    """
+    Opens a remote file as a stream, so that it is uploaded as it is
+    downloaded
 
-    # Open "file_path" for write
-    with open(file_path, 'w') as fh:
-        for output in _read_file_chunks(target_file):
-            fh.write(output)
+    :param file_url: ``str``: file URL
+    :return: file-like object
 
-    # Return file_path to be uploaded
-    return file_path
+    """
+    try:
+        response = requests.get(file_url, stream=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as error:
+        _, _, tb = sys.exc_info()
+        raise NonRecoverableError(
+            'Failed to download {0}.'.format(file_url),
+            causes=[exception_to_error_cause(error, tb)])
+    # Undo any content encoding of the transfer
+    response.raw.decode_content = True
+    return response.raw
 
 
 def _download_local_file(local_path):
@@ -185,13 +397,11 @@ def create(ctx, iface, resource_config, **_):
     utils.update_resource_id(ctx.instance, object_key)
     source_type = ctx.node.properties.get(OBJECT_SOURCE_TYPE)
 
-    cloudify_path = None
-    object_body = None
+    object_stream = None
 
-    # If "source_type" is either local or remote then we need to download
-    # the file from remote or local directory and then parse the data as
-    # bytes and prepared it to be sent on the "Body" param for "put_object"
-    # method
+    # If "source_type" is either local or remote then the object is read
+    # from a stream over the downloaded local file or the remote URL, and
+    # uploaded in parts
     if source_type in [OBJECT_LOCAL_SOURCE, OBJECT_REMOTE_SOURCE]:
         path = ctx.node.properties.get(OBJECT_PATH)
         if not path:
@@ -201,23 +411,18 @@ def create(ctx, iface, resource_config, **_):
 
         if source_type == OBJECT_LOCAL_SOURCE:
             cloudify_path = _download_local_file(path)
+            try:
+                object_stream = open(cloudify_path, 'rb')
+            except IOError as error:
+                _, _, tb = sys.exc_info()
+                raise NonRecoverableError(
+                    'Failed to open file {0},'
+                    ' with error message {1}'
+                    ''.format(path, error.strerror),
+                    causes=[exception_to_error_cause(error, tb)])
 
         elif source_type == OBJECT_REMOTE_SOURCE:
-            cloudify_path = _download_remote_file(path)
-
-        try:
-            object_body = open(cloudify_path, 'rb')
-        except IOError as error:
-            _, _, tb = sys.exc_info()
-            raise NonRecoverableError(
-                'Failed to open file {0},'
-                ' with error message {1}'
-                ''.format(path, error.strerror,
-                          causes=[exception_to_error_cause(error, tb)]))
-
-        # Set the updated path url so that it can
-        # be uploaded to the AWS S3 bucket
-        params[BUCKET_OBJECT_BODY] = object_body
+            object_stream = _open_remote_file(path)
 
     # If the "source_type" is "bytes" then the body should provided from the
     #  blueprint and follow the boto3 API documents
@@ -242,8 +447,62 @@ def create(ctx, iface, resource_config, **_):
     iface.bucket_name = bucket_name
     ctx.instance.runtime_properties[BUCKET] = bucket_name
 
-    # Actually create the resource
-    iface.create(params)
+    if not object_stream:
+        body = params.get(BUCKET_OBJECT_BODY)
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        if isinstance(body, six.binary_type) and \
+                iface.is_current(params, hashlib.md5(body).hexdigest()):
+            ctx.logger.info('{0} is unchanged, skipping upload.'.format(
+                object_key))
+            return
+        # Actually create the resource
+        iface.create(params)
+        return
+
+    multipart = ctx.node.properties.get(OBJECT_MULTIPART) or dict()
+    part_size = multipart.get('part_size') or S3_MULTIPART_PART_SIZE
+    if part_size < S3_MULTIPART_MIN_PART_SIZE:
+        raise NonRecoverableError(
+            'multipart part_size must be at least {0} bytes'.format(
+                S3_MULTIPART_MIN_PART_SIZE))
+    state = ctx.instance.runtime_properties.get(MULTIPART_UPLOAD) or dict()
+
+    # Local files are read once more to skip uploading unchanged objects.
+    # Remote sources can only be read once.
+    if source_type == OBJECT_LOCAL_SOURCE and not state:
+        checksum = _checksum(object_stream, part_size)
+        object_stream.seek(0)
+        if iface.is_current(params, checksum):
+            object_stream.close()
+            ctx.logger.info('{0} is unchanged, skipping upload.'.format(
+                object_key))
+            return
+        params['Metadata'] = dict(params.get('Metadata') or dict(),
+                                  **{CHECKSUM_METADATA: checksum})
+    try:
+        # Actually create the resource
+        iface.upload(
+            params, object_stream, state, part_size=part_size,
+            concurrency=multipart.get('concurrency') or
+            S3_MULTIPART_CONCURRENCY)
+    # Connection errors of the AWS calls, and of the remote source read
+    # through urllib3, are as transient as the AWS errors
+    except (BotoCoreError, ClientError, IOError, Urllib3Error,
+            requests.exceptions.RequestException) as error:
+        if not state.get(UPLOAD_ID):
+            raise
+        # Keep the uploaded parts, the retry resumes the upload
+        raise OperationRetry(
+            'Uploading {0} failed after {1} parts: {2}'.format(
+                object_key, len(state.get(PARTS, [])), error))
+    finally:
+        object_stream.close()
+        # Runtime properties only track changes of top level keys
+        if state:
+            ctx.instance.runtime_properties[MULTIPART_UPLOAD] = state
+        elif MULTIPART_UPLOAD in ctx.instance.runtime_properties:
+            del ctx.instance.runtime_properties[MULTIPART_UPLOAD]
 
 
 @decorators.check_swift_resource
@@ -269,5 +528,11 @@ def delete(ctx, iface, resource_config, **_):
 
     iface.bucket_name = bucket_name
 
+    # Drop the parts of an unfinished upload
+    state = ctx.instance.runtime_properties.get(MULTIPART_UPLOAD)
+    if state:
+        iface.abort_upload(params, state[UPLOAD_ID])
+        del ctx.instance.runtime_properties[MULTIPART_UPLOAD]
+
     # Actually delete the resource
     iface.delete(params)
@@ -16,8 +16,9 @@ import unittest
 from cloudify_awssdk.common.tests.test_base import \
     TestBase, mock_decorator
 from cloudify_awssdk.s3.resources.bucket import \
-    S3Bucket, RESOURCE_NAME, LOCATION
+    S3Bucket, RESOURCE_NAME, LOCATION, DELETED_OBJECTS
 from mock import patch, MagicMock
+from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.s3.resources import bucket
 
 
@@ -40,41 +41,93 @@ class TestS3Bucket(TestBase):
 
     def test_class_properties(self):
         effect = self.get_client_error_exception(name='S3 Bucket')
-        self.bucket.client = self.make_client_function('list_buckets',
+        self.bucket.client = self.make_client_function('head_bucket',
                                                        side_effect=effect)
         res = self.bucket.properties
         self.assertIsNone(res)
 
-        value = [{'Bucket': 'test_name'}]
-        self.bucket.client = self.make_client_function('list_buckets',
-                                                       return_value=value)
+        self.bucket.client = self.make_client_function('head_bucket',
+                                                       return_value={})
+        self.bucket.resource_id = None
         res = self.bucket.properties
         self.assertIsNone(res)
+        self.bucket.client.head_bucket.assert_not_called()
 
         self.bucket.resource_id = 'test_name'
         res = self.bucket.properties
         self.assertEqual(res['Bucket'], 'test_name')
+        self.bucket.client.head_bucket.assert_called_with(Bucket='test_name')
 
     def test_class_status(self):
-        value = [{'Bucket': 'test_name', 'Status': 'ok'}]
-        self.bucket.client = self.make_client_function('list_buckets',
-                                                       return_value=value)
+        effect = self.get_client_error_exception(name='S3 Bucket')
+        self.bucket.client = self.make_client_function('head_bucket',
+                                                       side_effect=effect)
         res = self.bucket.status
         self.assertIsNone(res)
 
+        self.bucket.client = self.make_client_function('head_bucket',
+                                                       return_value={})
         self.bucket.resource_id = 'test_name'
         res = self.bucket.status
-        self.assertEqual(res, 'ok')
+        self.assertEqual(res, 'available')
+
+    def _paginate(self, pages):
+        paginator = MagicMock()
+        paginator.paginate = MagicMock(return_value=iter(pages))
+        self.bucket.client.get_paginator = MagicMock(return_value=paginator)
 
     def test_class_delete_objects(self):
-        value = {'Contents': [{'Key': 'key_id'}]}
-        self.bucket.client = self.make_client_function('list_objects',
-                                                       return_value=value)
         self.bucket.client = self.make_client_function(
-            'delete_object', return_value={}, client=self.bucket.client
-        )
+            'delete_objects', return_value={})
+        self._paginate([{'Contents': [{'Key': 'key_%d' % i}
+                                      for i in range(1000)]},
+                        {'Contents': [{'Key': 'key_last'}]},
+                        {}])
+        progress = MagicMock()
         self.bucket.resource_id = 'test_name'
-        self.bucket.delete_objects('bucket_name')
+        self.assertTrue(
+            self.bucket.delete_objects('bucket_name', progress=progress))
+        self.bucket.client.get_paginator.assert_called_with(
+            'list_objects_v2')
+        self.assertEqual(self.bucket.client.delete_objects.call_count, 2)
+        self.bucket.client.delete_objects.assert_any_call(
+            Bucket='bucket_name',
+            Delete={'Objects': [{'Key': 'key_last'}], 'Quiet': True})
+        progress.assert_called_with(1001)
+
+    def test_class_delete_objects_versioned(self):
+        self.bucket.client = self.make_client_function(
+            'get_bucket_versioning', return_value={'Status': 'Enabled'})
+        self.bucket.client.delete_objects = MagicMock(return_value={})
+        self._paginate([{
+            'Versions': [{'Key': 'key', 'VersionId': 'v2'},
+                         {'Key': 'key', 'VersionId': 'v1'}],
+            'DeleteMarkers': [{'Key': 'gone', 'VersionId': 'v3'}]}])
+        self.assertTrue(self.bucket.delete_objects('bucket_name'))
+        self.bucket.client.get_paginator.assert_called_with(
+            'list_object_versions')
+        self.bucket.client.delete_objects.assert_called_with(
+            Bucket='bucket_name',
+            Delete={'Objects': [{'Key': 'key', 'VersionId': 'v2'},
+                                {'Key': 'key', 'VersionId': 'v1'},
+                                {'Key': 'gone', 'VersionId': 'v3'}],
+                    'Quiet': True})
+
+    def test_class_delete_objects_errors(self):
+        self.bucket.client = self.make_client_function(
+            'delete_objects', return_value={'Errors': [
+                {'Key': 'key', 'Code': 'AccessDenied'}]})
+        self._paginate([{'Contents': [{'Key': 'key'}]}])
+        with self.assertRaises(NonRecoverableError):
+            self.bucket.delete_objects('bucket_name')
+
+    def test_class_delete_objects_deadline(self):
+        self.bucket.client = self.make_client_function(
+            'delete_objects', return_value={})
+        self._paginate([{'Contents': [{'Key': 'key'}]}])
+        self.assertFalse(self.bucket.delete_objects('bucket_name',
+                                                    deadline=1))
+        self.assertFalse(self.bucket.client.delete_objects.called)
 
     def test_class_create(self):
         value = {'Location': 'test'}
@@ -114,6 +167,16 @@ class TestS3Bucket(TestBase):
         bucket.delete(ctx=ctx, iface=iface, resource_config={})
         self.assertTrue(iface.delete.called)
 
+    def test_delete_clears_progress(self):
+        ctx = self.get_mock_ctx(
+            "Backet", test_runtime_properties={DELETED_OBJECTS: 1000})
+        ctx.node.type = 'cloudify.nodes.aws.s3.Bucket'
+        iface = MagicMock()
+        iface.delete_objects = self.mock_return(True)
+        bucket.delete(ctx=ctx, iface=iface, resource_config={})
+        self.assertTrue(iface.delete.called)
+        self.assertNotIn(DELETED_OBJECTS, ctx.instance.runtime_properties)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,11 +15,16 @@
 # Standard Imports
 import unittest
 import datetime
+import hashlib
+import os
 import tempfile
+from io import BytesIO
 from dateutil.tz import tzutc
+from botocore.exceptions import ClientError, EndpointConnectionError
 
 # Third Party Imports
 from mock import patch, MagicMock
+from cloudify.exceptions import OperationRetry
 
 # Local Imports
 from cloudify_awssdk.common.tests.test_base import TestBase, mock_decorator
@@ -173,6 +178,107 @@ class TestS3BucketObject(TestBase):
         self.bucket_object.delete(params)
         self.assertTrue(self.bucket_object.client.delete_object.called)
 
+    def _upload_client(self, parts=None):
+        client = MagicMock()
+        client.create_multipart_upload.return_value = {'UploadId': 'id'}
+        client.upload_part.side_effect = \
+            lambda **kwargs: {'ETag': 'etag-%d' % kwargs['PartNumber']}
+        paginator = MagicMock()
+        paginator.paginate.return_value = [{'Parts': parts or []}]
+        client.get_paginator.return_value = paginator
+        self.bucket_object.client = client
+        return client
+
+    def test_class_upload_single_part(self):
+        client = self._upload_client()
+        state = {}
+        self.bucket_object.upload(
+            {'Bucket': 'bucket', 'Key': 'key'}, BytesIO(b'abc'), state,
+            part_size=4)
+        client.put_object.assert_called_with(
+            Bucket='bucket', Key='key', Body=b'abc')
+        self.assertFalse(client.create_multipart_upload.called)
+        self.assertEqual(state, {})
+
+    def test_class_upload_multipart(self):
+        client = self._upload_client()
+        state = {}
+        self.bucket_object.upload(
+            {'Bucket': 'bucket', 'Key': 'key', 'ContentMD5': 'md5',
+             'ContentType': 'text/plain'},
+            BytesIO(b'abcdefghij'), state, part_size=4, concurrency=2)
+        client.create_multipart_upload.assert_called_with(
+            Bucket='bucket', Key='key', ContentType='text/plain')
+        self.assertEqual(
+            sorted((call[1]['PartNumber'], call[1]['Body'])
+                   for call in client.upload_part.call_args_list),
+            [(1, b'abcd'), (2, b'efgh'), (3, b'ij')])
+        client.complete_multipart_upload.assert_called_with(
+            Bucket='bucket', Key='key', UploadId='id',
+            MultipartUpload={'Parts': [
+                {'PartNumber': 1, 'ETag': 'etag-1'},
+                {'PartNumber': 2, 'ETag': 'etag-2'},
+                {'PartNumber': 3, 'ETag': 'etag-3'}]})
+        self.assertEqual(state, {})
+
+    def test_class_upload_resume(self):
+        client = self._upload_client(
+            parts=[{'PartNumber': 1, 'ETag': 'etag-1'},
+                   {'PartNumber': 3, 'ETag': 'etag-3'}])
+        state = {'UploadId': 'id', 'PartSize': 4, 'Parts': []}
+        self.bucket_object.upload(
+            {'Bucket': 'bucket', 'Key': 'key'}, BytesIO(b'abcdefghij'),
+            state, part_size=8)
+        self.assertFalse(client.create_multipart_upload.called)
+        client.upload_part.assert_called_once_with(
+            Bucket='bucket', Key='key', UploadId='id', PartNumber=2,
+            Body=b'efgh')
+        self.assertEqual(
+            len(client.complete_multipart_upload.call_args[1][
+                'MultipartUpload']['Parts']), 3)
+
+    def test_class_upload_failure(self):
+        client = self._upload_client()
+        client.upload_part.side_effect = self.get_client_error_exception()
+        state = {}
+        with self.assertRaises(ClientError):
+            self.bucket_object.upload(
+                {'Bucket': 'bucket', 'Key': 'key'}, BytesIO(b'abcdefghij'),
+                state, part_size=4)
+        self.assertEqual(state['UploadId'], 'id')
+        self.assertFalse(client.complete_multipart_upload.called)
+
+    def test_checksum(self):
+        self.assertEqual(bucket_object._checksum(BytesIO(b'abc')),
+                         hashlib.md5(b'abc').hexdigest())
+        self.assertEqual(bucket_object._checksum(BytesIO(b'abc'), 4),
+                         hashlib.md5(b'abc').hexdigest())
+        parts = [hashlib.md5(b'abcd').digest(),
+                 hashlib.md5(b'efgh').digest(),
+                 hashlib.md5(b'ij').digest()]
+        self.assertEqual(
+            bucket_object._checksum(BytesIO(b'abcdefghij'), 4),
+            hashlib.md5(b''.join(parts)).hexdigest() + '-3')
+        self.assertEqual(
+            bucket_object._checksum(BytesIO(b'abcdefgh'), 4),
+            hashlib.md5(b''.join(parts[:2])).hexdigest() + '-2')
+
+    def test_class_is_current(self):
+        params = {'Bucket': 'bucket', 'Key': 'key'}
+        self.bucket_object.client = self.make_client_function(
+            'head_object', return_value={'ETag': '"abc-2"', 'Metadata': {}})
+        self.assertTrue(self.bucket_object.is_current(params, 'abc-2'))
+        self.assertFalse(self.bucket_object.is_current(params, 'abc'))
+
+        self.bucket_object.client = self.make_client_function(
+            'head_object', return_value={
+                'ETag': '"kms"', 'Metadata': {'cloudify-checksum': 'abc'}})
+        self.assertTrue(self.bucket_object.is_current(params, 'abc'))
+
+        self.bucket_object.client = self.make_client_function(
+            'head_object', side_effect=self.get_client_error_exception())
+        self.assertFalse(self.bucket_object.is_current(params, 'abc'))
+
     def test_prepare(self):
         ctx = self.get_mock_ctx("Backet")
         bucket_object.prepare(ctx, 'config')
@@ -206,6 +312,37 @@ class TestS3BucketObject(TestBase):
             self.ctx.instance.runtime_properties[EXTERNAL_RESOURCE_ID],
             'test-object.txt')
 
+    def test_create_resumable(self):
+        _, file_path = tempfile.mkstemp()
+        self.addCleanup(os.remove, file_path)
+        with open(file_path, 'wb') as local_file:
+            local_file.write(b'abcdefghij')
+        ctx = self.get_mock_ctx(
+            'Backet', test_properties={
+                'source_type': 'local', 'path': 'object.txt',
+                'multipart': {'part_size': 4, 'concurrency': 1}})
+        ctx.node.type = 'cloudify.nodes.aws.s3.BucketObject'
+        client = self._upload_client()
+        client.upload_part.side_effect = [
+            {'ETag': 'etag-1'},
+            EndpointConnectionError(endpoint_url='https://s3')]
+        self.bucket_object.is_current = MagicMock(return_value=False)
+
+        with patch(PATCH_PREFIX + '_download_local_file',
+                   return_value=file_path), \
+                patch(PATCH_PREFIX + 'S3_MULTIPART_MIN_PART_SIZE', 1):
+            with self.assertRaises(OperationRetry):
+                bucket_object.create(
+                    ctx=ctx, iface=self.bucket_object,
+                    resource_config={BUCKET: 'bucket', 'Key': 'key'})
+
+        # The retry resumes the upload from the uploaded parts
+        state = ctx.instance.runtime_properties['multipart_upload']
+        self.assertEqual(state['UploadId'], 'id')
+        self.assertEqual(state['Parts'],
+                         [{'PartNumber': 1, 'ETag': 'etag-1'}])
+        self.assertFalse(client.abort_multipart_upload.called)
+
     def test_delete(self):
         iface = MagicMock()
         iface.resource_id = 'test-object.txt'
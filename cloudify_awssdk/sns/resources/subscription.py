@@ -20,6 +20,7 @@
 # Cloudify
 from cloudify.exceptions import NonRecoverableError
 from cloudify_awssdk.common import decorators, utils
+from cloudify_awssdk.common.backoff import get_retry_after
 from cloudify_awssdk.sns import SNSBase
 from cloudify_awssdk.common.constants import EXTERNAL_RESOURCE_ARN
 from .topic import SNSTopic
@@ -44,16 +45,13 @@ class SNSSubscription(SNSBase):
     @property
     def properties(self):
         """Gets the properties of an external resource"""
+        if not self.resource_id:
+            return None
         try:
-            resources = \
-                self.client.list_subscriptions()
+            return self.client.get_subscription_attributes(
+                SubscriptionArn=self.resource_id)['Attributes']
         except ClientError:
-            pass
-        else:
-            for resource in resources:
-                if resource[SUB_ARN] == self.resource_id:
-                    return resource
-        return None
+            return None
 
     @property
     def status(self):
@@ -168,7 +166,8 @@ def start(ctx, iface, resource_config, **_):
 
     if CONFIRM_AUTHENTICATED not in sub_attributes:
         return ctx.operation.retry(
-            'Confirm has not been authenticated. Retrying...')
+            'Confirm has not been authenticated. Retrying...',
+            retry_after=get_retry_after(ctx))
 
 
 @decorators.aws_resource(SNSSubscription, RESOURCE_TYPE,
@@ -40,17 +40,13 @@ class SNSTopic(SNSBase):
     @property
     def properties(self):
         """Gets the properties of an external resource"""
+        if not self.resource_id:
+            return None
         try:
-            resources = \
-                self.client.list_topics()
+            self.client.get_topic_attributes(TopicArn=self.resource_id)
         except ClientError:
-            pass
-        else:
-            for resource in resources:
-                resource_arn = resource.get('TopicArn')
-                if self.resource_id == resource_arn:
-                    return resource_arn
             return None
+        return self.resource_id
 
     @property
     def status(self):
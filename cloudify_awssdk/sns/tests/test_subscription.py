@@ -40,32 +40,36 @@ class TestSNSSubscription(TestBase):
     def test_class_properties(self):
         effect = self.get_client_error_exception(name='S3 SNS')
         self.subscription.client = self.make_client_function(
-            'list_subscriptions',
+            'get_subscription_attributes',
             side_effect=effect)
         res = self.subscription.properties
         self.assertIsNone(res)
 
+        value = {'Attributes': {SUB_ARN: 'arn'}}
         self.subscription.client = self.make_client_function(
-            'list_subscriptions',
-            return_value={})
+            'get_subscription_attributes',
+            return_value=value)
+        self.subscription.resource_id = None
         res = self.subscription.properties
         self.assertIsNone(res)
 
-        value = [{SUB_ARN: 'arn'}]
-        self.subscription.client = self.make_client_function(
-            'list_subscriptions',
-            return_value=value)
         self.subscription.resource_id = 'arn'
         res = self.subscription.properties
-        self.assertEqual(res, value[0])
+        self.assertEqual(res, value['Attributes'])
+        self.subscription.client.get_subscription_attributes.\
+            assert_called_with(SubscriptionArn='arn')
 
     def test_class_status(self):
+        effect = self.get_client_error_exception(name='S3 SNS')
+        self.subscription.client = self.make_client_function(
+            'get_subscription_attributes',
+            side_effect=effect)
         res = self.subscription.status
         self.assertIsNone(res)
 
-        value = [{SUB_ARN: 'arn'}]
+        value = {'Attributes': {SUB_ARN: 'arn'}}
         self.subscription.client = self.make_client_function(
-            'list_subscriptions',
+            'get_subscription_attributes',
             return_value=value)
         self.subscription.resource_id = 'arn'
         res = self.subscription.status
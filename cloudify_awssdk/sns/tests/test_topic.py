@@ -39,32 +39,36 @@ class TestSNSTopic(TestBase):
     def test_class_properties(self):
         effect = self.get_client_error_exception(name='S3 SNS')
         self.topic.client = self.make_client_function(
-            'list_topics',
+            'get_topic_attributes',
             side_effect=effect)
         res = self.topic.properties
         self.assertIsNone(res)
 
+        value = {'Attributes': {TOPIC_ARN: 'arn'}}
         self.topic.client = self.make_client_function(
-            'list_topics',
-            return_value={})
+            'get_topic_attributes',
+            return_value=value)
+        self.topic.resource_id = None
         res = self.topic.properties
         self.assertIsNone(res)
 
-        value = [{TOPIC_ARN: 'arn'}]
-        self.topic.client = self.make_client_function(
-            'list_topics',
-            return_value=value)
         self.topic.resource_id = 'arn'
         res = self.topic.properties
         self.assertEqual(res, 'arn')
+        self.topic.client.get_topic_attributes.assert_called_with(
+            TopicArn='arn')
 
     def test_class_status(self):
+        effect = self.get_client_error_exception(name='S3 SNS')
+        self.topic.client = self.make_client_function(
+            'get_topic_attributes',
+            side_effect=effect)
         res = self.topic.status
         self.assertIsNone(res)
 
-        value = [{TOPIC_ARN: 'arn'}]
+        value = {'Attributes': {TOPIC_ARN: 'arn'}}
         self.topic.client = self.make_client_function(
-            'list_topics',
+            'get_topic_attributes',
             return_value=value)
         self.topic.resource_id = 'arn'
         res = self.topic.status
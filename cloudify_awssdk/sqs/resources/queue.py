@@ -43,16 +43,20 @@ class SQSQueue(SQSBase):
 
     @property
     def properties(self):
-        """Gets the properties of an external resource"""
+        """Gets the URL of an external resource"""
+        if not self.resource_id:
+            return None
         try:
-            resource = \
-                self.client.list_queues(
-                    QueueNamePrefix=self.resource_id)
+            # Queues are identified by their URL once created, or by
+            # their name when they are external resources
+            if '/' in self.resource_id:
+                self.client.get_queue_attributes(
+                    QueueUrl=self.resource_id, AttributeNames=[QUEUE_ARN])
+                return self.resource_id
+            return self.client.get_queue_url(
+                QueueName=self.resource_id)[QUEUE_URL]
         except ClientError:
-            pass
-        else:
-            return resource.get(QUEUE_URLS, [None])[0]
-        return None
+            return None
 
     @property
     def status(self):
@@ -254,14 +254,14 @@ class TestSQSQueue(TestBase):
 
         self.assertEqual(test_instance.properties, None)
 
-        self.fake_client.list_queues.assert_called_with(
-            QueueNamePrefix='queue_id'
+        self.fake_client.get_queue_url.assert_called_with(
+            QueueName='queue_id'
         )
 
-    def test_SQSQueueClass_properties_list_queue(self):
-        self.fake_client.list_queues = MagicMock(
+    def test_SQSQueueClass_properties_queue_name(self):
+        self.fake_client.get_queue_url = MagicMock(
             return_value={
-                'QueueUrls': ['c']
+                'QueueUrl': 'c'
             }
         )
 
@@ -272,10 +272,32 @@ class TestSQSQueue(TestBase):
 
         self.assertEqual(test_instance.properties, 'c')
 
-        self.fake_client.list_queues.assert_called_with(
-            QueueNamePrefix='queue_id'
+        self.fake_client.get_queue_url.assert_called_with(
+            QueueName='queue_id'
         )
 
+    def test_SQSQueueClass_properties_queue_url(self):
+        url = 'https://sqs.us-east-1.amazonaws.com/123456789012/queue_id'
+        test_instance = queue.SQSQueue(
+            "ctx_node", resource_id=url, client=self.fake_client,
+            logger=None
+        )
+
+        self.assertEqual(test_instance.properties, None)
+
+        self.fake_client.get_queue_attributes = MagicMock(
+            return_value={
+                'Attributes': {'QueueArn': 'arn'}
+            }
+        )
+
+        self.assertEqual(test_instance.properties, url)
+
+        self.fake_client.get_queue_attributes.assert_called_with(
+            QueueUrl=url, AttributeNames=['QueueArn']
+        )
+        self.fake_client.get_queue_url.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()